@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, WebSocket, Depends, BackgroundTasks, Request
-from fastapi.responses import FileResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
 from ...models.download import (
     DownloadRequest,
     DownloadResponse,
@@ -8,14 +8,15 @@ from ...models.download import (
     DownloadStatus
 )
 from ...services.download_manager import DownloadManager
+from ...services.registry import registry, get_download_manager
+from ...services.zip_stream import iter_zip
 from ..dependencies import check_rate_limit, check_download_limit, check_bulk_download_limit, get_quota
 from ...core.metrics import (
     DOWNLOAD_REQUESTS as download_requests_total,
-    DOWNLOAD_DURATION as download_duration_seconds,
-    ACTIVE_DOWNLOADS as active_downloads,
-    DOWNLOAD_ERRORS as download_errors_total
+    DOWNLOAD_DURATION as download_duration_seconds
 )
 from ...core.exceptions import DownloaderException
+from ...core.file_delivery import deliver_file
 import asyncio
 import os
 import time
@@ -26,7 +27,6 @@ from ...core.error_reporting import ErrorReporter
 from typing import Optional
 
 router = APIRouter()
-download_manager = DownloadManager()
 
 # Flag to track if cleanup task has been started
 cleanup_task_started = False
@@ -36,7 +36,7 @@ async def ensure_cleanup_task_started():
     """Ensure the cleanup task is started if it hasn't been already."""
     global cleanup_task_started
     if not cleanup_task_started:
-        await download_manager.start_cleanup_task()
+        await registry.get(DownloadManager).start_cleanup_task()
         cleanup_task_started = True
 
 
@@ -57,6 +57,7 @@ async def create_download(
     request: Request,
     download_request: DownloadRequest,
     background_tasks: BackgroundTasks,
+    download_manager: DownloadManager = Depends(get_download_manager),
     _: None = Depends(check_rate_limit),
     __: None = Depends(check_download_limit)
 ) -> DownloadResponse:
@@ -70,9 +71,6 @@ async def create_download(
             quality=download_request.quality.value
         ).inc()
 
-        # Increment active downloads gauge
-        active_downloads.labels(platform=download_request.platform.value).inc()
-
         # Record start time
         start_time = time.time()
 
@@ -106,22 +104,16 @@ async def create_download(
             message=str(e),
             context={
                 "endpoint": "/download",
-                "request_data": download_request.dict(),
+                "request_data": download_request,
                 "client_ip": request.client.host if request.client else None,
                 "user_agent": request.headers.get("user-agent")
             },
             platform=download_request.platform.value,
             url=str(download_request.url),
-            request_id=getattr(request.state, "request_id", None)
+            request_id=getattr(request.state, "request_id", None),
+            error=e
         )
 
-        # Increment error counter and decrement active downloads
-        download_errors_total.labels(
-            platform=download_request.platform.value,
-            error_type=type(e).__name__
-        ).inc()
-        active_downloads.labels(platform=download_request.platform.value).dec()
-
         if isinstance(e, DownloaderException):
             raise HTTPException(
                 status_code=e.status_code,
@@ -135,6 +127,7 @@ async def create_batch_download(
     request: Request,
     batch_request: BatchDownloadRequest,
     background_tasks: BackgroundTasks,
+    download_manager: DownloadManager = Depends(get_download_manager),
     _: None = Depends(check_rate_limit),
     __: None = Depends(check_bulk_download_limit)
 ) -> BatchDownloadResponse:
@@ -149,9 +142,6 @@ async def create_batch_download(
                 quality=batch_request.quality.value
             ).inc()
 
-        # Increment active downloads gauge
-        active_downloads.labels(platform=batch_request.platform.value).inc()
-
         # Create a new download session
         session_id = await download_manager.create_download(
             url=str(batch_request.urls[0]),  # Use first URL for session
@@ -181,23 +171,17 @@ async def create_batch_download(
             message=str(e),
             context={
                 "endpoint": "/batch-download",
-                "request_data": batch_request.dict(),
+                "request_data": batch_request,
                 "client_ip": request.client.host if request.client else None,
                 "user_agent": request.headers.get("user-agent")
             },
             platform=batch_request.platform.value,
             url=str(batch_request.urls[0]
                     ) if batch_request.urls else "unknown",
-            request_id=getattr(request.state, "request_id", None)
+            request_id=getattr(request.state, "request_id", None),
+            error=e
         )
 
-        # Increment error counter and decrement active downloads
-        download_errors_total.labels(
-            platform=batch_request.platform.value,
-            error_type=type(e).__name__
-        ).inc()
-        active_downloads.labels(platform=batch_request.platform.value).dec()
-
         if isinstance(e, DownloaderException):
             raise HTTPException(
                 status_code=e.status_code,
@@ -210,6 +194,7 @@ async def create_batch_download(
 async def get_download_status(
     request: Request,
     session_id: str,
+    download_manager: DownloadManager = Depends(get_download_manager),
     _: None = Depends(check_rate_limit)
 ) -> DownloadResponse:
     status = await download_manager.get_download_status(session_id)
@@ -220,7 +205,11 @@ async def get_download_status(
 
 
 @router.websocket("/ws/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: str):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    session_id: str,
+    download_manager: DownloadManager = Depends(get_download_manager)
+):
     await websocket.accept()
     try:
         # Ensure cleanup task is started
@@ -234,7 +223,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 break
 
             # Send the status to the client
-            await websocket.send_json(status.dict())
+            await websocket.send_json(status.model_dump(mode="json"))
 
             # If download is completed or failed, close the connection
             if status.status in [DownloadStatus.COMPLETED, DownloadStatus.FAILED]:
@@ -249,10 +238,11 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         await websocket.close(code=1000)
 
 
-@router.get("/file/{session_id}")
+@router.api_route("/file/{session_id}", methods=["GET", "HEAD"])
 async def download_file(
     request: Request,
     session_id: str,
+    download_manager: DownloadManager = Depends(get_download_manager),
     _: None = Depends(check_rate_limit)
 ):
     """Download a video file directly."""
@@ -289,18 +279,42 @@ async def download_file(
                 detail="File not found"
             )
 
+        # Object storage: send the client to a presigned URL instead
+        store = download_manager.store
+        if store.backend.remote:
+            if not await download_manager.is_stored(status.filename):
+                download_manager.forget_file(session_id, status.filename)
+                raise HTTPException(
+                    status_code=410,
+                    detail="Download has expired. Please request a new download."
+                )
+            await download_manager.record_access(session_id, status.filename)
+            return RedirectResponse(
+                store.url_for(status.filename, os.path.basename(status.filename)),
+                status_code=307
+            )
+
         file_path = os.path.join(
             download_manager.download_folder, status.filename)
 
         # Check if file exists
-        if not os.path.exists(file_path):
+        try:
+            stat_result = os.stat(file_path)
+        except FileNotFoundError:
+            if not await download_manager.is_stored(status.filename):
+                # Released by expiry or quota eviction since the last check
+                download_manager.forget_file(session_id, status.filename)
+                raise HTTPException(
+                    status_code=410,
+                    detail="Download has expired. Please request a new download."
+                )
             ErrorReporter.report_error(
                 error_type="FileNotFoundError",
                 message=f"File not found on disk: {file_path}",
                 context={
                     "session_id": session_id,
                     "filename": status.filename,
-                    "status": status.dict()
+                    "status": status
                 },
                 request_id=getattr(request.state, "request_id", None)
             )
@@ -309,14 +323,15 @@ async def download_file(
                 detail="File not found on server"
             )
 
-        # Return the file with appropriate headers for download
-        return FileResponse(
-            path=file_path,
-            filename=status.filename,
+        # Popular files have their expiry pushed back
+        await download_manager.record_access(session_id, status.filename)
+
+        # Serve ranges/revalidation in-process or hand off to the proxy
+        return deliver_file(
+            download_manager.download_folder,
+            status.filename,
             media_type="video/mp4",
-            headers={
-                "Content-Disposition": f'attachment; filename="{status.filename}"'
-            }
+            stat_result=stat_result
         )
 
     except HTTPException:
@@ -332,9 +347,61 @@ async def download_file(
                 "client_ip": request.client.host if request.client else None,
                 "user_agent": request.headers.get("user-agent")
             },
-            request_id=getattr(request.state, "request_id", None)
+            request_id=getattr(request.state, "request_id", None),
+            error=e
         )
         raise HTTPException(
             status_code=500,
             detail=f"Error downloading file: {str(e)}"
         )
+
+
+@router.get("/batch/{session_id}/zip")
+async def download_batch_zip(
+    request: Request,
+    session_id: str,
+    download_manager: DownloadManager = Depends(get_download_manager),
+    _: None = Depends(check_rate_limit)
+):
+    """Stream the completed files of a batch as a single ZIP archive."""
+    await ensure_cleanup_task_started()
+
+    status = await download_manager.get_download_status(session_id)
+    files = download_manager.get_batch_files(session_id)
+    if status is None or files is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Batch session not found"
+        )
+
+    if status.status == DownloadStatus.EXPIRED:
+        raise HTTPException(
+            status_code=410,
+            detail="Download has expired. Please request a new download."
+        )
+
+    if status.status not in (DownloadStatus.COMPLETED, DownloadStatus.FAILED):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch is not ready. Current status: {status.status}"
+        )
+
+    if not files:
+        raise HTTPException(
+            status_code=404,
+            detail="No completed files in this batch"
+        )
+
+    await download_manager.record_access(session_id, *files)
+    entries = [
+        (os.path.basename(filename),
+         os.path.join(download_manager.download_folder, filename))
+        for filename in files
+    ]
+    return StreamingResponse(
+        iter_zip(entries),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="batch_{session_id[:8]}.zip"'
+        }
+    )
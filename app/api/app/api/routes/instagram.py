@@ -7,13 +7,13 @@ from ...models.instagram import (
     InstagramMediaType
 )
 from ...services.instagram import InstagramDownloader
+from ...services.registry import get_instagram_downloader
 from ...core.exceptions import DownloaderException, DownloadError, InvalidURLError
 from ...services.rate_limiter import RateLimiter
 from ...core.config import settings
 from ...core.error_reporting import ErrorReporter
 
 router = APIRouter(prefix="/instagram", tags=["instagram"])
-downloader = InstagramDownloader()
 rate_limiter = RateLimiter()
 
 
@@ -21,7 +21,8 @@ rate_limiter = RateLimiter()
 async def download_instagram_content(
     request: Request,
     download_request: InstagramDownloadRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    downloader: InstagramDownloader = Depends(get_instagram_downloader)
 ):
     """
     Download content from Instagram (posts, reels, stories).
@@ -40,12 +41,13 @@ async def download_instagram_content(
             message=str(e),
             context={
                 "endpoint": "/instagram/download",
-                "request_data": download_request.dict(),
+                "request_data": download_request,
                 "client_ip": request.client.host if request.client else None,
                 "user_agent": request.headers.get("user-agent")
             },
             url=str(download_request.url),
-            request_id=getattr(request.state, "request_id", None)
+            request_id=getattr(request.state, "request_id", None),
+            error=e
         )
         if isinstance(e, InvalidURLError):
             raise HTTPException(status_code=400, detail=str(e))
@@ -57,12 +59,13 @@ async def download_instagram_content(
             message=str(e),
             context={
                 "endpoint": "/instagram/download",
-                "request_data": download_request.dict(),
+                "request_data": download_request,
                 "client_ip": request.client.host if request.client else None,
                 "user_agent": request.headers.get("user-agent")
             },
             url=str(download_request.url),
-            request_id=getattr(request.state, "request_id", None)
+            request_id=getattr(request.state, "request_id", None),
+            error=e
         )
         raise HTTPException(
             status_code=500, detail=f"An unexpected error occurred: {str(e)}")
@@ -73,7 +76,8 @@ async def batch_download_instagram(
     request: Request,
     urls: List[str],
     background_tasks: BackgroundTasks,
-    quality: InstagramQuality = InstagramQuality.HIGH
+    quality: InstagramQuality = InstagramQuality.HIGH,
+    downloader: InstagramDownloader = Depends(get_instagram_downloader)
 ):
     """
     Download multiple Instagram posts/reels/stories at once.
@@ -110,7 +114,8 @@ async def batch_download_instagram(
                     "user_agent": request.headers.get("user-agent")
                 },
                 url=url,
-                request_id=getattr(request.state, "request_id", None)
+                request_id=getattr(request.state, "request_id", None),
+                error=e
             )
             results.append({
                 "url": url,
@@ -147,7 +152,8 @@ async def validate_instagram_url(request: Request, url: str):
                 "user_agent": request.headers.get("user-agent")
             },
             url=url,
-            request_id=getattr(request.state, "request_id", None)
+            request_id=getattr(request.state, "request_id", None),
+            error=e
         )
         raise HTTPException(
             status_code=500,
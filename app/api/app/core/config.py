@@ -126,6 +126,47 @@ class Settings(BaseSettings):
         os.getenv("MAX_CONCURRENT_DOWNLOADS", "5"))
     DOWNLOAD_EXPIRY_MINUTES: int = int(os.getenv("DOWNLOAD_EXPIRY_MINUTES", "60"))
 
+    # Hand finished files to the reverse proxy (e.g. nginx X-Accel-Redirect)
+    # instead of streaming them from the API worker. Empty disables offload.
+    FILE_ACCEL_REDIRECT_PREFIX: str = os.getenv(
+        "FILE_ACCEL_REDIRECT_PREFIX", "")
+    FILE_ACCEL_REDIRECT_HEADER: str = os.getenv(
+        "FILE_ACCEL_REDIRECT_HEADER", "X-Accel-Redirect")
+
+    # Disk budget for downloaded media (0 disables quota eviction).
+    # Policy is "lru" or "size" (evicts large, long-idle files first).
+    STORAGE_MAX_BYTES: int = int(os.getenv("STORAGE_MAX_BYTES", "0"))
+    STORAGE_EVICTION_POLICY: str = os.getenv("STORAGE_EVICTION_POLICY", "lru")
+    # Files fetched again have their expiry pushed back, up to this age
+    STORAGE_MAX_LIFETIME_SECONDS: int = int(
+        os.getenv("STORAGE_MAX_LIFETIME_SECONDS", "86400"))
+
+    # Scratch area for in-progress downloads, published by rename when done.
+    # Empty picks /dev/shm if it has STAGING_TMPFS_MIN_FREE_BYTES free,
+    # otherwise <DOWNLOAD_FOLDER>/.staging.
+    STAGING_FOLDER: str = os.getenv("STAGING_FOLDER", "")
+    STAGING_TMPFS_MIN_FREE_BYTES: int = int(
+        os.getenv("STAGING_TMPFS_MIN_FREE_BYTES", str(4 * 1024 ** 3)))
+    # Partial downloads older than this are purged instead of resumed
+    STAGING_MAX_AGE_SECONDS: int = int(
+        os.getenv("STAGING_MAX_AGE_SECONDS", "21600"))
+
+    # Where finished media is served from: "local" or "s3" (any
+    # S3-compatible store such as MinIO). With s3, clients get presigned
+    # URLs against S3_PUBLIC_ENDPOINT_URL (defaults to S3_ENDPOINT_URL).
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")
+    S3_PUBLIC_ENDPOINT_URL: str = os.getenv("S3_PUBLIC_ENDPOINT_URL", "")
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_REGION: str = os.getenv("S3_REGION", "us-east-1")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    S3_PART_SIZE_BYTES: int = int(
+        os.getenv("S3_PART_SIZE_BYTES", str(8 * 1024 * 1024)))
+    S3_UPLOAD_CONCURRENCY: int = int(os.getenv("S3_UPLOAD_CONCURRENCY", "4"))
+    S3_PRESIGNED_URL_EXPIRY_SECONDS: int = int(
+        os.getenv("S3_PRESIGNED_URL_EXPIRY_SECONDS", "3600"))
+
     # Security settings
     VERIFY_SSL: bool = os.getenv(
         "VERIFY_SSL", "false").lower() in ("true", "1", "yes")
@@ -138,11 +179,44 @@ class Settings(BaseSettings):
     INSTAGRAM_TIMEOUT: int = int(os.getenv("INSTAGRAM_TIMEOUT", "30"))
     CONFIG_DIR: str = os.getenv("CONFIG_DIR", "config")
 
+    # Shared outbound HTTP client pool
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(
+        os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(
+        os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "30"))
+
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
     
     # Monitoring
     ENABLE_METRICS: bool = os.getenv("ENABLE_METRICS", "false").lower() == "true"
+    # Log records buffered per logger before new ones are dropped
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # Seconds between host/worker resource samples (0 disables the sampler)
+    SYSTEM_METRICS_INTERVAL_SECONDS: float = float(
+        os.getenv("SYSTEM_METRICS_INTERVAL_SECONDS", "15"))
+    # Period of the event loop lag probe (0 disables it), and how long the
+    # loop may be stuck in one callback before its stack is logged
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = float(
+        os.getenv("EVENT_LOOP_LAG_INTERVAL_SECONDS", "0.5"))
+    SLOW_CALLBACK_THRESHOLD_SECONDS: float = float(
+        os.getenv("SLOW_CALLBACK_THRESHOLD_SECONDS", "0.25"))
+    # Error logs are grouped by (platform, error type, stage) per window;
+    # past ERROR_REPORT_SAMPLES per group only a summary is logged (0 = off)
+    ERROR_REPORT_WINDOW_SECONDS: float = float(
+        os.getenv("ERROR_REPORT_WINDOW_SECONDS", "60"))
+    ERROR_REPORT_SAMPLES: int = int(os.getenv("ERROR_REPORT_SAMPLES", "5"))
+    # Trace export: "none", "file" (OTLP/JSON lines in TRACE_FILE) or
+    # "otlp" (POST to a collector); TRACE_SAMPLE_RATIO of new traces are kept
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none").lower()
+    TRACE_FILE: str = os.getenv("TRACE_FILE", "logs/traces.jsonl")
+    TRACE_OTLP_ENDPOINT: str = os.getenv(
+        "TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACE_SAMPLE_RATIO: float = float(os.getenv("TRACE_SAMPLE_RATIO", "0.1"))
+    # Longest sampling profile /debug/profile will run
+    PROFILE_MAX_SECONDS: int = int(os.getenv("PROFILE_MAX_SECONDS", "60"))
 
     @validator("API_SECRET_KEY", "JWT_SECRET_KEY")
     def validate_secrets(cls, v, values, **kwargs):
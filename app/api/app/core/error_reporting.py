@@ -1,8 +1,113 @@
 import logging
-from typing import Optional, Dict, Any
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
-from .metrics import DOWNLOAD_ERRORS
+from .config import settings
+from .metrics import DOWNLOAD_ERRORS, ERROR_REPORTS_SUPPRESSED
 from .logging_config import logger
+from .tracing import current_request_id, current_span
+
+
+class ErrorAggregator:
+    """
+    Deduplicate error logs over a time window.
+
+    Reports are grouped by ``(platform, error_type, stage)``. The first
+    ``samples`` reports of a group in each window are logged in full;
+    the rest are only counted. When the window closes, every group that
+    had reports left out is logged once as a summary with its count and
+    latest message, so an outage costs a few lines per window instead
+    of one per failed download. A window of 0 logs every report.
+    """
+
+    def __init__(self, window: float, samples: int):
+        self.window = window
+        self.samples = samples
+        self._groups: Dict[tuple, Dict[str, Any]] = {}
+        self._window_started = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def admit(self, key: tuple, message: str) -> bool:
+        """Count a report under ``key``; True if it should be logged in full"""
+        if self.window <= 0:
+            return True
+        summaries = None
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_started >= self.window:
+                summaries = self._rotate(now)
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = {"count": 0, "logged": 0}
+            group["count"] += 1
+            group["message"] = message
+            admitted = group["logged"] < self.samples
+            if admitted:
+                group["logged"] += 1
+        if summaries:
+            self._log(*summaries)
+        if not admitted:
+            ERROR_REPORTS_SUPPRESSED.inc()
+        return admitted
+
+    def flush(self) -> None:
+        """Close the current window and log its summaries"""
+        with self._lock:
+            summaries = self._rotate(time.monotonic())
+        self._log(*summaries)
+
+    def _rotate(self, now: float) -> Tuple[List[Tuple[tuple, Dict[str, Any]]], float]:
+        suppressed = [(key, group) for key, group in self._groups.items()
+                      if group["count"] > group["logged"]]
+        elapsed = now - self._window_started
+        self._groups = {}
+        self._window_started = now
+        return suppressed, elapsed
+
+    def _log(self, suppressed: List[Tuple[tuple, Dict[str, Any]]], elapsed: float) -> None:
+        for (platform, error_type, stage), group in suppressed:
+            logger.warning(
+                f"{group['count']} {error_type} errors "
+                f"(platform={platform}, stage={stage}) in the last {elapsed:.0f}s, "
+                f"{group['count'] - group['logged']} not logged individually; "
+                f"latest: {group['message']}",
+                extra={"error_summary": {
+                    "platform": platform,
+                    "error_type": error_type,
+                    "stage": stage,
+                    "count": group["count"],
+                    "suppressed": group["count"] - group["logged"],
+                    "window_seconds": round(elapsed, 1),
+                    "latest_message": group["message"]
+                }}
+            )
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.window):
+            self.flush()
+
+    def start(self) -> None:
+        """Flush summaries every window even when no new errors arrive"""
+        if self.window <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="error-aggregator", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        self.flush()
+
+
+error_aggregator = ErrorAggregator(
+    settings.ERROR_REPORT_WINDOW_SECONDS, settings.ERROR_REPORT_SAMPLES)
 
 
 class ErrorReporter:
@@ -14,41 +119,75 @@ class ErrorReporter:
         user_id: Optional[str] = None,
         request_id: Optional[str] = None,
         platform: Optional[str] = None,
-        url: Optional[str] = None
+        url: Optional[str] = None,
+        error: Optional[BaseException] = None
     ) -> None:
         """
         Comprehensive error reporting that includes:
         - Structured logging with context
         - Metric tracking
         - Request tracing
+
+        ``request_id`` defaults to the HTTP request the caller runs on
+        behalf of, which is still known in background jobs, and the
+        current trace ID is attached so the error can be found in traces.
+
+        Passing the exception as ``error`` makes later reports of the same
+        exception no-ops, so a failure reported by the stage, the job and
+        the route is counted and logged once. Logging is further sampled
+        by ``error_aggregator``; ``DOWNLOAD_ERRORS`` counts every failure.
+
+        Context is copied onto the logging queue as it is now; it is only
+        converted to JSON (and truncated) on the log listener thread.
         """
+        if error is not None:
+            if getattr(error, "_error_reported", False):
+                return
+            try:
+                error._error_reported = True
+            except AttributeError:
+                pass
+
+        span = current_span()
+        if span is not None:
+            span.set_attribute("error.type", error_type)
+
+        # Update error metrics
+        if platform:
+            DOWNLOAD_ERRORS.labels(
+                platform=platform,
+                error_type=error_type
+            ).inc()
+
+        if not logger.isEnabledFor(logging.ERROR):
+            return
+
+        context = context or {}
+        stage = context.get("stage") or context.get("endpoint")
+        if not error_aggregator.admit((platform, error_type, stage), message):
+            return
+
         error_data = {
             "timestamp": datetime.utcnow().isoformat(),
             "error_type": error_type,
             "message": message,
-            "context": context or {},
+            "context": context,
             "user_id": user_id,
-            "request_id": request_id,
+            "request_id": request_id or current_request_id(),
+            "trace_id": span.trace_id if span is not None else None,
             "platform": platform,
             "url": url
         }
 
         # Log the error with full context
         logger.error(
-            f"Error occurred: {message}",
+            "Error occurred: %s", message,
             extra={
                 "error_data": error_data,
                 "traceback": True  # Enable traceback logging
             }
         )
 
-        # Update error metrics
-        if platform:
-            DOWNLOAD_ERRORS.labels(
-                platform=platform,
-                error_type=error_type
-            ).inc()
-
     @staticmethod
     def report_download_error(
         error: Exception,
@@ -72,9 +211,9 @@ class ErrorReporter:
             error_type=type(error).__name__,
             message=str(error),
             context=error_context,
-            request_id=session_id,
             platform=platform,
-            url=url
+            url=url,
+            error=error
         )
 
     @staticmethod
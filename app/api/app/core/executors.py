@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from .metrics import EXECUTOR_ACTIVE_THREADS, EXECUTOR_QUEUE_LENGTH, EXECUTOR_TASK_WAIT
+
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    """
+    ``ThreadPoolExecutor`` that reports its saturation per ``name``.
+
+    Publishes the queue length, the number of busy threads and how long
+    each task waited for a thread. Executors sharing a name share series.
+    """
+
+    def __init__(self, name: str, max_workers: Optional[int] = None,
+                 thread_name_prefix: str = ""):
+        super().__init__(max_workers, thread_name_prefix=thread_name_prefix or name)
+        self.name = name
+        self._queued = EXECUTOR_QUEUE_LENGTH.labels(executor=name)
+        self._active = EXECUTOR_ACTIVE_THREADS.labels(executor=name)
+        self._wait = EXECUTOR_TASK_WAIT.labels(executor=name)
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        submitted = time.perf_counter()
+
+        def run() -> Any:
+            self._queued.dec()
+            self._wait.observe(time.perf_counter() - submitted)
+            self._active.inc()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._active.dec()
+
+        self._queued.inc()
+        try:
+            future = super().submit(run)
+        except BaseException:
+            self._queued.dec()
+            raise
+        # A task cancelled while queued never runs, so never dequeues itself
+        future.add_done_callback(
+            lambda f: f.cancelled() and self._queued.dec())
+        return future
@@ -0,0 +1,300 @@
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from .config import settings
+
+
+CHUNK_SIZE = 256 * 1024
+
+# ASGI extension that lets the server hand the file to os.sendfile
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised when a Range header lies entirely outside the file"""
+
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """Build a strong ETag from the file's modification time and size"""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into inclusive ``(start, end)`` offsets.
+
+    Returns None for headers that should be ignored (malformed, other
+    units or multiple ranges), in which case the whole file is served.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_text, sep, end_text = spec.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        start = int(start_text) if start_text else None
+        end = int(end_text) if end_text else None
+    except ValueError:
+        return None
+
+    if start is None:
+        # Suffix range: the last N bytes
+        if end is None:
+            return None
+        if end <= 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - end, 0), size - 1
+
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if end is None or end >= size:
+        end = size - 1
+    return start, end
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag"""
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def _unmodified_since(header: str, stat_result: os.stat_result) -> bool:
+    """Whether the file is no newer than an If-Modified-Since date"""
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since is None or since.tzinfo is None:
+        return False
+    # Last-Modified has whole-second precision
+    return int(stat_result.st_mtime) <= since.timestamp()
+
+
+class FileDeliveryResponse(Response):
+    """
+    File response with ETag revalidation and single byte-range support.
+
+    Status and length are decided when the response is sent, from the
+    request's ``If-None-Match`` (or, without it, ``If-Modified-Since``),
+    ``Range`` and ``If-Range`` headers. When
+    the server advertises the ASGI zero-copy extension the file descriptor
+    is handed over for ``sendfile``; otherwise the file is streamed in
+    chunks from a worker thread.
+    """
+
+    chunk_size = CHUNK_SIZE
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: Optional[os.stat_result] = None,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self.path = path
+        self.stat_result = stat_result or os.stat(path)
+        self.status_code = 200
+        self.background = None
+        if media_type is None:
+            media_type = mimetypes.guess_type(filename or path)[0] or "text/plain"
+        self.media_type = media_type
+        self.etag = make_etag(self.stat_result)
+        self.last_modified = formatdate(self.stat_result.st_mtime, usegmt=True)
+
+        # Content-Length depends on the requested range and is set on send
+        self.init_headers(headers)
+        self.headers.setdefault("etag", self.etag)
+        self.headers.setdefault("last-modified", self.last_modified)
+        self.headers.setdefault("accept-ranges", "bytes")
+        if filename is not None:
+            self.headers.setdefault(
+                "content-disposition", _content_disposition(filename))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        size = self.stat_result.st_size
+        raw_headers = list(self.raw_headers)
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            not_modified = _etag_matches(if_none_match, self.etag)
+        else:
+            # Only consulted without If-None-Match (RFC 9110, 13.1.3)
+            if_modified_since = request_headers.get("if-modified-since")
+            not_modified = (
+                if_modified_since is not None
+                and scope["method"] in ("GET", "HEAD")
+                and _unmodified_since(if_modified_since, self.stat_result)
+            )
+        if not_modified:
+            await self._send_empty(send, 304, raw_headers)
+            return
+
+        byte_range = None
+        range_header = request_headers.get("range")
+        if range_header and scope["method"] in ("GET", "HEAD"):
+            if_range = request_headers.get("if-range")
+            if if_range is None or if_range in (self.etag, self.last_modified):
+                try:
+                    byte_range = parse_range(range_header, size)
+                except RangeNotSatisfiable:
+                    raw_headers.append(
+                        (b"content-range", f"bytes */{size}".encode("latin-1")))
+                    await self._send_empty(send, 416, raw_headers)
+                    return
+
+        if byte_range is None:
+            status_code, offset, count = self.status_code, 0, size
+        else:
+            start, end = byte_range
+            status_code, offset, count = 206, start, end - start + 1
+            raw_headers.append((
+                b"content-range",
+                f"bytes {start}-{end}/{size}".encode("latin-1"),
+            ))
+        raw_headers.append((b"content-length", str(count).encode("latin-1")))
+
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": raw_headers,
+        })
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+        elif ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            await self._send_zerocopy(send, offset, count)
+        else:
+            await self._send_chunks(send, offset, count)
+
+        if self.background is not None:
+            await self.background()
+
+    async def _send_empty(self, send: Send, status_code: int, raw_headers) -> None:
+        raw_headers = [
+            (key, value) for key, value in raw_headers
+            if key not in (b"content-type", b"content-disposition")
+        ]
+        if status_code != 304:
+            raw_headers.append((b"content-length", b"0"))
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": raw_headers,
+        })
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _send_zerocopy(self, send: Send, offset: int, count: int) -> None:
+        file = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            await send({
+                "type": ZEROCOPY_EXTENSION,
+                "file": file,
+                "offset": offset,
+                "count": count,
+                "more_body": False,
+            })
+        finally:
+            await anyio.to_thread.run_sync(file.close)
+
+    async def _send_chunks(self, send: Send, offset: int, count: int) -> None:
+        remaining = count
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if offset:
+                await file.seek(offset)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+        if remaining > 0 or count == 0:
+            # Empty or truncated file, close the body explicitly
+            await send({"type": "http.response.body", "body": b""})
+
+
+class DeliveryStaticFiles(StaticFiles):
+    """StaticFiles that serves byte ranges and revalidates by ETag"""
+
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        # Hidden entries (the content store's blobs) are not public
+        if any(part.startswith(".") for part in path.split("/") if part):
+            return "", None
+        return super().lookup_path(path)
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = FileDeliveryResponse(full_path, stat_result=stat_result)
+        response.status_code = status_code
+        return response
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def deliver_file(
+    directory: str,
+    filename: str,
+    media_type: Optional[str] = None,
+    stat_result: Optional[os.stat_result] = None,
+) -> Response:
+    """
+    Build the response for an authorized download of ``directory/filename``.
+
+    With ``FILE_ACCEL_REDIRECT_PREFIX`` set, the worker only returns an
+    internal redirect header and the reverse proxy streams the file itself
+    (including ranges and ETags). Otherwise the file is served in-process.
+    """
+    # ``filename`` may be a sharded relative path; clients only see the name
+    download_name = os.path.basename(filename)
+    if settings.FILE_ACCEL_REDIRECT_PREFIX:
+        location = settings.FILE_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + \
+            quote(filename)
+        return Response(
+            media_type=media_type or mimetypes.guess_type(download_name)[0],
+            headers={
+                settings.FILE_ACCEL_REDIRECT_HEADER: location,
+                "Content-Disposition": _content_disposition(download_name),
+            },
+        )
+
+    return FileDeliveryResponse(
+        os.path.join(directory, filename),
+        stat_result=stat_result,
+        filename=download_name,
+        media_type=media_type,
+    )
@@ -1,21 +1,96 @@
-import os
+import atexit
+import copy
 import logging.config
+import logging.handlers
 import json
+import queue
 from datetime import datetime
+from enum import Enum
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
+
+from .config import settings
+from .metrics import LOG_RECORDS_DROPPED
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
 
 # Create logs directory if it doesn't exist
 LOGS_DIR = Path("logs")
 LOGS_DIR.mkdir(exist_ok=True)
 
+# Longest list and string kept from extra context when serializing
+MAX_CONTEXT_ITEMS = 20
+MAX_CONTEXT_STRING = 2000
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize objects json/orjson can't handle natively"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _truncate(value: Any, depth: int = 0) -> Any:
+    """Bound the size of extra context such as full format lists"""
+    if depth > 5:
+        return str(value)[:MAX_CONTEXT_STRING]
+    if isinstance(value, dict):
+        return {k: _truncate(v, depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = [_truncate(v, depth + 1) for v in list(value)[:MAX_CONTEXT_ITEMS]]
+        if len(value) > MAX_CONTEXT_ITEMS:
+            items.append(f"... {len(value) - MAX_CONTEXT_ITEMS} more")
+        return items
+    if isinstance(value, str) and len(value) > MAX_CONTEXT_STRING:
+        return value[:MAX_CONTEXT_STRING] + "..."
+    return value
+
+
+def _snapshot(value: Any, depth: int = 0) -> Any:
+    """
+    Copy the dicts and lists of extra context, so the listener logs them
+    as they were when logged even if the caller keeps mutating them
+    """
+    if depth > 5:
+        return value
+    if isinstance(value, dict):
+        # list() copies in one step, without yielding to other threads
+        return {k: _snapshot(v, depth + 1) for k, v in list(value.items())}
+    if isinstance(value, (list, tuple, set)):
+        return [_snapshot(v, depth + 1) for v in list(value)]
+    return value
+
+
+def dumps(data: Dict[str, Any]) -> str:
+    """Serialize a log entry, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(
+            data, default=_json_default, option=orjson.OPT_NON_STR_KEYS
+        ).decode()
+    return json.dumps(data, default=_json_default)
+
 
 class JSONFormatter(logging.Formatter):
-    """Custom JSON formatter for structured logging"""
+    """
+    Custom JSON formatter for structured logging.
+
+    Runs on the queue listener thread, so extra context passed by callers is
+    only serialized (and truncated) there, never on the request path.
+    """
 
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat(),
             "level": record.levelname,
             "message": record.getMessage(),
             "module": record.module,
@@ -24,14 +99,77 @@ class JSONFormatter(logging.Formatter):
         }
 
         # Add extra fields if they exist
-        if hasattr(record, "extra"):
-            log_data.update(record.extra)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                log_data[key] = _truncate(value)
 
         # Add exception info if present
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data["exception"] = record.exc_text
+
+        return dumps(log_data)
 
-        return json.dumps(log_data)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller.
+
+    Each logger's queue gets its own copy of the record, with a copy of
+    its extra context; formatting and file I/O happen on the listener
+    thread. When the queue is full the record is dropped and counted in
+    ``log_records_dropped_total``.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A record propagating to a parent logger reaches that logger's
+        # queue too, and two listeners must not format one object at once.
+        # Merge args and copy extra context now since they may be mutated
+        # after the call returns; JSON encoding and tracebacks are left
+        # for the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        for key, value in list(record.__dict__.items()):
+            if key not in _RECORD_ATTRS and isinstance(value, (dict, list, tuple, set)):
+                record.__dict__[key] = _snapshot(value)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(logger=record.name).inc()
+
+
+# Listeners started by setup_logging, stopped by shutdown_logging
+_listeners: List[logging.handlers.QueueListener] = []
+
+
+def _queue_logger_handlers(logger_names: List[str]) -> None:
+    """Move each logger's handlers behind a queue drained by its own thread"""
+    for name in logger_names:
+        target = logging.getLogger(name)
+        handlers = list(target.handlers)
+        if not handlers:
+            continue
+
+        log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+
+        for handler in handlers:
+            target.removeHandler(handler)
+        target.addHandler(NonBlockingQueueHandler(log_queue))
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener threads"""
+    while _listeners:
+        _listeners.pop().stop()
 
 
 def setup_logging() -> None:
@@ -105,7 +243,12 @@ def setup_logging() -> None:
         }
     }
 
+    shutdown_logging()
     logging.config.dictConfig(logging_config)
+    _queue_logger_handlers(list(logging_config["loggers"]))
+
+
+atexit.register(shutdown_logging)
 
 
 # Create logger instances
@@ -0,0 +1,101 @@
+import asyncio
+import inspect
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from .metrics import EVENT_LOOP_BLOCKED, EVENT_LOOP_LAG
+
+logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """
+    Measure event loop lag and report what is blocking the loop.
+
+    A heartbeat task sleeps for ``interval`` and records how late it
+    woke up into ``EVENT_LOOP_LAG``. A watchdog thread checks the
+    heartbeat; once it is ``threshold`` seconds overdue the loop is
+    stuck in a callback, and the watchdog logs the loop thread's stack,
+    named after the task coroutine at its base, while it is still blocked. Each stall is logged
+    once.
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._beat = time.monotonic()
+        self._reported = 0.0
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(loop.time() - expected, 0.0))
+            self._beat = time.monotonic()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(min(self.interval, self.threshold) / 2):
+            beat = self._beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue >= self.threshold and beat != self._reported:
+                self._reported = beat
+                self._report(overdue)
+
+    def _report(self, overdue: float) -> None:
+        EVENT_LOOP_BLOCKED.inc()
+        # The loop is stuck, so nothing can be scheduled on it; read its
+        # thread's stack from here instead
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = "".join(traceback.format_stack(frame, limit=20)) if frame else ""
+        where = _task_coroutine(frame) or "a callback"
+        logger.warning(
+            f"Event loop blocked for over {overdue:.3f}s in {where}\n{stack}",
+            extra={"blocked_seconds": round(overdue, 3), "task": where})
+
+    def start(self) -> None:
+        """Start monitoring the running loop; an interval of 0 disables it"""
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = self._loop.create_task(self._heartbeat())
+        if self.threshold > 0:
+            self._thread = threading.Thread(
+                target=self._watch, name="loop-monitor", daemon=True)
+            self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+
+def _task_coroutine(frame) -> Optional[str]:
+    """Name of the outermost coroutine on a stack, i.e. the running task's"""
+    name = None
+    while frame is not None:
+        code = frame.f_code
+        if code.co_flags & inspect.CO_COROUTINE:
+            name = getattr(code, "co_qualname", code.co_name)
+        frame = frame.f_back
+    return name
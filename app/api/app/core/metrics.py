@@ -1,4 +1,22 @@
-from prometheus_client import Counter, Histogram, Gauge
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+# With several uvicorn workers, PROMETHEUS_MULTIPROC_DIR makes every worker
+# write its samples to files there, merged at scrape time by
+# ``generate_metrics``. Gauges declare how their per-worker values merge:
+# "livesum" for in-flight counts, "liveall" for per-worker resources (with
+# a pid label) and "livemostrecent" for host-wide readings. "live" modes
+# drop a worker's values once it exits, see ``mark_worker_dead``.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
 
 # Counter for total download requests
 DOWNLOAD_REQUESTS = Counter(
@@ -7,19 +25,34 @@ DOWNLOAD_REQUESTS = Counter(
     ['platform', 'quality']
 )
 
+# Buckets for download timings; long YouTube jobs run well past a minute
+DOWNLOAD_BUCKETS = [
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+    120.0, 300.0, 600.0, 1200.0, 1800.0
+]
+
 # Histogram for download duration
 DOWNLOAD_DURATION = Histogram(
     'download_duration_seconds',
     'Time spent processing downloads',
     ['platform', 'quality'],
-    buckets=[0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0]
+    buckets=DOWNLOAD_BUCKETS
+)
+
+# Histogram for each stage of the download pipeline (see core/stage_timer.py)
+DOWNLOAD_STAGE_DURATION = Histogram(
+    'download_stage_duration_seconds',
+    'Time a download spent in each pipeline stage',
+    ['platform', 'stage'],
+    buckets=DOWNLOAD_BUCKETS
 )
 
 # Gauge for current active downloads
 ACTIVE_DOWNLOADS = Gauge(
     'active_downloads',
     'Number of downloads currently in progress',
-    ['platform']
+    ['platform'],
+    multiprocess_mode='livesum'
 )
 
 # Counter for download errors
@@ -28,3 +61,185 @@ DOWNLOAD_ERRORS = Counter(
     'Total number of failed downloads',
     ['platform', 'error_type']
 )
+
+# Error reports counted but not logged individually, see ErrorAggregator
+ERROR_REPORTS_SUPPRESSED = Counter(
+    'error_reports_suppressed_total',
+    'Error reports left out of the logs and folded into a summary'
+)
+
+# Rate limit hits and errors recorded by core/monitoring.MetricsCollector
+RATE_LIMIT_HITS = Counter(
+    'rate_limit_hits_total',
+    'Total number of rate limit hits',
+    ['endpoint']
+)
+
+ERRORS = Counter(
+    'errors_total',
+    'Total number of errors',
+    ['type']
+)
+
+# Request metrics recorded by RequestContextMiddleware
+REQUEST_COUNT = Counter(
+    'request_count', 'App Request Count',
+    ['app_name', 'method', 'endpoint', 'http_status']
+)
+
+REQUEST_LATENCY = Histogram(
+    'request_latency_seconds', 'Request latency',
+    ['app_name', 'endpoint']
+)
+
+ACTIVE_CONNECTIONS = Gauge(
+    'active_connections', 'Active connections',
+    ['app_name'],
+    multiprocess_mode='livesum'
+)
+
+# Counter for log records dropped because the logging queue was full
+LOG_RECORDS_DROPPED = Counter(
+    'log_records_dropped_total',
+    'Log records dropped because the logging queue was full',
+    ['logger']
+)
+
+# Download storage usage and eviction
+STORAGE_BYTES_USED = Gauge(
+    'storage_bytes_used',
+    'Bytes of downloaded media on disk, counting shared blobs once',
+    multiprocess_mode='livemostrecent'
+)
+
+STORAGE_BYTES_BUDGET = Gauge(
+    'storage_bytes_budget',
+    'Configured byte budget for downloaded media (0 means unlimited)',
+    multiprocess_mode='livemax'
+)
+
+STORAGE_BYTES_EVICTED = Counter(
+    'storage_bytes_evicted_total',
+    'Bytes of downloaded media freed by cleanup',
+    ['reason']
+)
+
+# Host and worker resources, published by core/system_metrics.py
+SYSTEM_CPU_USAGE = Gauge(
+    'system_cpu_usage_percent',
+    'Host CPU usage over the last sampling interval',
+    multiprocess_mode='livemostrecent'
+)
+
+SYSTEM_MEMORY_USAGE = Gauge(
+    'system_memory_usage_bytes',
+    'Host memory in use',
+    multiprocess_mode='livemostrecent'
+)
+
+WORKER_CPU_USAGE = Gauge(
+    'worker_cpu_usage_percent',
+    'CPU used by this worker over the last sampling interval (100 = one core)',
+    multiprocess_mode='liveall'
+)
+
+WORKER_RESIDENT_MEMORY = Gauge(
+    'worker_resident_memory_bytes',
+    'Resident memory of this worker',
+    multiprocess_mode='liveall'
+)
+
+WORKER_OPEN_FDS = Gauge(
+    'worker_open_fds',
+    'Open file descriptors of this worker',
+    multiprocess_mode='liveall'
+)
+
+VOLUME_BYTES = Gauge(
+    'download_volume_bytes',
+    'Size and usage of the filesystems holding downloads and staging',
+    ['volume', 'kind'],
+    multiprocess_mode='livemostrecent'
+)
+
+EXECUTOR_THREADS = Gauge(
+    'executor_threads',
+    'Threads started by each executor',
+    ['executor'],
+    multiprocess_mode='livesum'
+)
+
+DOWNLOAD_SESSIONS = Gauge(
+    'download_sessions_tracked',
+    'Download sessions held in DownloadManager.active_downloads',
+    multiprocess_mode='livesum'
+)
+
+# Event loop and executor saturation, see core/loop_monitor.py and core/executors.py
+LAG_BUCKETS = [
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+]
+
+EVENT_LOOP_LAG = Histogram(
+    'event_loop_lag_seconds',
+    'How late a periodic event loop timer fired',
+    buckets=LAG_BUCKETS
+)
+
+EVENT_LOOP_BLOCKED = Counter(
+    'event_loop_blocked_total',
+    'Times the event loop was blocked past the slow-callback threshold'
+)
+
+EXECUTOR_QUEUE_LENGTH = Gauge(
+    'executor_queue_length',
+    'Tasks submitted to an executor and not yet started',
+    ['executor'],
+    multiprocess_mode='livesum'
+)
+
+EXECUTOR_ACTIVE_THREADS = Gauge(
+    'executor_active_threads',
+    'Executor threads currently running a task',
+    ['executor'],
+    multiprocess_mode='livesum'
+)
+
+EXECUTOR_TASK_WAIT = Histogram(
+    'executor_task_wait_seconds',
+    'Time a task waited in an executor queue before starting',
+    ['executor'],
+    buckets=LAG_BUCKETS
+)
+
+# Tracing, see core/tracing.py
+TRACE_SPANS_DROPPED = Counter(
+    'trace_spans_dropped_total',
+    'Sampled spans dropped because the export queue was full or export failed'
+)
+
+
+def generate_metrics() -> bytes:
+    """Exposition of every worker's metrics, or just this process's"""
+    if MULTIPROC_DIR is None:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, MULTIPROC_DIR)
+    return generate_latest(registry)
+
+
+def mark_worker_dead(pid: int) -> None:
+    """Drop the live gauge values of a worker that is shutting down"""
+    if MULTIPROC_DIR is not None:
+        multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
+
+
+def reset_multiproc_dir() -> None:
+    """Clear samples of a previous run; call before starting workers"""
+    if MULTIPROC_DIR is None:
+        return
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    for name in os.listdir(MULTIPROC_DIR):
+        if name.endswith(".db"):
+            os.remove(os.path.join(MULTIPROC_DIR, name))
+
@@ -0,0 +1,203 @@
+import time
+import uuid
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import ACTIVE_CONNECTIONS, REQUEST_COUNT, REQUEST_LATENCY
+from .tracing import (
+    SERVER,
+    STATUS_ERROR,
+    activate,
+    deactivate,
+    parse_traceparent,
+    tracer
+)
+
+
+APP_NAME = "tiktok_downloader"
+
+# Path prefixes that don't require API key verification
+OPEN_API_PATHS = (
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/health",
+    "/api/v1/auth",
+)
+
+# Metric label buckets used instead of raw request paths
+UNMATCHED_ENDPOINT = "<unmatched>"
+OVERFLOW_ENDPOINT = "<overflow>"
+OTHER_METHOD = "OTHER"
+MAX_ENDPOINT_LABELS = 200
+
+HTTP_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+)
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware handling request IDs, API key checks and timing.
+
+    Replaces the stacked ``@app.middleware("http")`` functions and the
+    ``BaseHTTPMiddleware`` subclass so that each request pays for a single
+    function call instead of a task and a wrapped response stream. The
+    request ID is generated once and stored on ``request.state``.
+
+    Each request also gets a server span, continuing the caller's trace
+    if it sent a ``traceparent`` header. The span and request ID stay
+    current for ``BackgroundTasks``, which run after the response; the
+    span itself ends once the response body is sent.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        api_keys: Iterable[Optional[str]] = (),
+        header_name: str = "X-API-Key",
+        require_api_key: bool = True,
+        open_paths: Iterable[str] = OPEN_API_PATHS,
+        max_endpoint_labels: int = MAX_ENDPOINT_LABELS,
+    ) -> None:
+        self.app = app
+        # Precompute everything the hot path needs
+        self.api_keys = frozenset(key for key in api_keys if key)
+        self.header_name = header_name.lower()
+        self.require_api_key = require_api_key
+        self.open_paths = tuple(open_paths)
+        self.max_endpoint_labels = max_endpoint_labels
+        self.endpoint_labels = set()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        request_id = str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+        request_id_header = request_id.encode("latin-1")
+
+        span = tracer.start_span(
+            scope["method"],
+            parent=parse_traceparent(Headers(scope=scope).get("traceparent")),
+            kind=SERVER,
+            attributes={"http.request.method": scope["method"],
+                        "url.path": scope["path"],
+                        "request_id": request_id})
+        tokens = activate(span, request_id)
+
+        ACTIVE_CONNECTIONS.labels(app_name=APP_NAME).inc()
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                process_time = time.perf_counter() - start_time
+                # A new list: the response's own raw_headers stay untouched
+                message = {**message, "headers": [
+                    *message.get("headers", ()),
+                    (b"x-request-id", request_id_header),
+                    (b"x-process-time", str(process_time).encode("latin-1")),
+                    (b"traceparent", span.context.traceparent.encode("latin-1")),
+                ]}
+            await send(message)
+            if (message["type"] == "http.response.body"
+                    and not message.get("more_body", False)):
+                self._end_span(span, scope, root_path, status_code)
+
+        try:
+            rejection = self._check_api_key(scope)
+            if rejection is not None:
+                await rejection(scope, receive, send_wrapper)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            deactivate(tokens)
+            self._end_span(span, scope, root_path, status_code)
+            endpoint = self._endpoint_label(scope, root_path)
+            method = scope["method"]
+            if method not in HTTP_METHODS:
+                method = OTHER_METHOD
+            REQUEST_LATENCY.labels(
+                app_name=APP_NAME,
+                endpoint=endpoint
+            ).observe(time.perf_counter() - start_time)
+            REQUEST_COUNT.labels(
+                app_name=APP_NAME,
+                method=method,
+                endpoint=endpoint,
+                http_status=status_code
+            ).inc()
+            ACTIVE_CONNECTIONS.labels(app_name=APP_NAME).dec()
+
+    def _end_span(self, span, scope: Scope, root_path: str, status_code: int) -> None:
+        if span.end_ns is not None:
+            return
+        route = scope.get("route")
+        if route is not None:
+            span.name = f"{scope['method']} {route.path}"
+            span.set_attribute("http.route", route.path)
+        span.set_attribute("http.response.status_code", status_code)
+        if status_code >= 500:
+            span.set_status(STATUS_ERROR)
+        span.end()
+
+    def _endpoint_label(self, scope: Scope, root_path: str) -> str:
+        """
+        Get the metrics label for a handled request.
+
+        Uses the matched route template (``/api/v1/status/{session_id}``)
+        rather than the raw path so that the number of time series stays
+        bounded. Requests that matched no route share one bucket, and any
+        templates beyond ``max_endpoint_labels`` share an overflow bucket.
+        """
+        route = scope.get("route")
+        if route is not None:
+            label = route.path
+        elif scope.get("root_path", root_path) != root_path:
+            # Mounted apps such as StaticFiles only expose their mount point
+            label = scope["root_path"][len(root_path):] + "/{path}"
+        else:
+            return UNMATCHED_ENDPOINT
+
+        if label not in self.endpoint_labels:
+            if len(self.endpoint_labels) >= self.max_endpoint_labels:
+                return OVERFLOW_ENDPOINT
+            self.endpoint_labels.add(label)
+        return label
+
+    def _check_api_key(self, scope: Scope) -> Optional[JSONResponse]:
+        """Return an error response if the request fails the API key check"""
+        if not self.require_api_key or scope["method"] == "OPTIONS":
+            return None
+
+        if scope["path"].startswith(self.open_paths):
+            return None
+
+        # Check session for stored API key first, then the header
+        api_key = scope.get("session", {}).get("api_key")
+        if not api_key:
+            api_key = Headers(scope=scope).get(self.header_name)
+
+        if not api_key:
+            return JSONResponse(
+                status_code=401,
+                content={"detail": "API key is missing"},
+                headers={"WWW-Authenticate": "ApiKey"},
+            )
+
+        if api_key not in self.api_keys:
+            return JSONResponse(
+                status_code=403,
+                content={"detail": "Invalid API key"},
+                headers={"WWW-Authenticate": "ApiKey"},
+            )
+
+        return None
@@ -0,0 +1,118 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
+
+# Leaf frames of threads waiting for work: the event loop in select(),
+# pool workers blocked on their queue, and anything in Condition.wait()
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("selectors.py", "EpollSelector.select"),
+    ("selectors.py", "KqueueSelector.select"),
+    ("thread.py", "_worker"),
+    ("threading.py", "wait"),
+    ("threading.py", "Condition.wait"),
+}
+
+
+class ProfilerBusy(RuntimeError):
+    """A profile is already running in this worker"""
+
+
+def _thread_group(name: str) -> str:
+    # Pool workers share a root so a pool shows up as one tower
+    return re.sub(r"_\d+$", "", name)
+
+
+def _name(code) -> str:
+    return getattr(code, "co_qualname", code.co_name)
+
+
+def _is_idle(code) -> bool:
+    return (os.path.basename(code.co_filename), _name(code)) in IDLE_FRAMES
+
+
+def _frame_label(code) -> str:
+    return f"{_name(code)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler over every thread of the process.
+
+    A daemon thread wakes every ``interval`` seconds and records the
+    Python stack of each other thread from ``sys._current_frames()``, so
+    the event loop and executor threads are covered without tracing
+    hooks. Nothing runs between profiles; one profile runs at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def start(self, seconds: float, interval: float = 0.01, idle: bool = False) -> Future:
+        """
+        Profile for ``seconds`` in the background.
+
+        The future resolves to ``(collapsed, samples)``; see ``collapse``.
+        Raises ``ProfilerBusy`` if a profile is already running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        future: Future = Future()
+
+        def run() -> None:
+            try:
+                future.set_result(self._sample(seconds, interval, idle))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self._lock.release()
+
+        threading.Thread(target=run, name="sampling-profiler", daemon=True).start()
+        return future
+
+    def _sample(self, seconds: float, interval: float, idle: bool) -> Tuple[str, int]:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        labels: Dict[object, str] = {}
+        deadline = time.monotonic() + seconds
+        samples = 0
+
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if not idle and _is_idle(frame.f_code):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(_thread_group(names.get(ident, f"thread-{ident}")))
+                stacks[";".join(reversed(stack))] += 1
+            samples += 1
+            time.sleep(interval)
+
+        return self.collapse(stacks), samples
+
+    @staticmethod
+    def collapse(stacks: Counter) -> str:
+        """Brendan Gregg's collapsed format: ``root;caller;callee count`` per line"""
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+profiler = SamplingProfiler()
+
+
+def profile_filename(started: Optional[float] = None) -> str:
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(started or time.time()))
+    return f"profile-{os.getpid()}-{stamp}.collapsed"
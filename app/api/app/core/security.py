@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Any, Dict, Optional, Union
 
 from jose import jwt
@@ -13,18 +14,26 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl="api/v1/auth/login", auto_error=False)
 
-# Simulated user database for development
-# In production, replace with actual database logic
-FAKE_USERS_DB = {
-    "admin@example.com": {
-        "id": "admin123",
-        "email": "admin@example.com",
-        "full_name": "Admin User",
-        "hashed_password": pwd_context.hash("adminPassword123"),
-        "is_active": True,
-        "role": "admin"
+
+@lru_cache(maxsize=None)
+def get_fake_users_db() -> Dict[str, Dict[str, Any]]:
+    """
+    Simulated user database for development.
+    In production, replace with actual database logic.
+
+    Built on first use because bcrypt hashing is deliberately slow and
+    should not run at import time.
+    """
+    return {
+        "admin@example.com": {
+            "id": "admin123",
+            "email": "admin@example.com",
+            "full_name": "Admin User",
+            "hashed_password": pwd_context.hash("adminPassword123"),
+            "is_active": True,
+            "role": "admin"
+        }
     }
-}
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -39,8 +48,9 @@ def get_password_hash(password: str) -> str:
 
 def get_user(email: str) -> Optional[UserInDB]:
     """Get a user by email."""
-    if email in FAKE_USERS_DB:
-        user_dict = FAKE_USERS_DB[email]
+    users_db = get_fake_users_db()
+    if email in users_db:
+        user_dict = users_db[email]
         return UserInDB(**user_dict)
     return None
 
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .metrics import DOWNLOAD_STAGE_DURATION
+from .tracing import Span, current_span, tracer
+
+# Stage labels shared by DownloadManager and the platform services
+RESOLVE = "resolve"            # URL parsing, option building, output allocation
+QUEUE_WAIT = "queue_wait"      # waiting for a free executor thread
+EXTRACT_INFO = "extract_info"  # yt-dlp metadata extraction
+TRANSFER = "transfer"          # media bytes over the network
+POSTPROCESS = "postprocess"    # FFmpeg convert, merge and remux steps
+FINALIZE = "finalize"          # publish: rename or copy, hash, dedupe, upload
+
+STAGES = (RESOLVE, QUEUE_WAIT, EXTRACT_INFO, TRANSFER, POSTPROCESS, FINALIZE)
+
+
+class StageTimer:
+    """
+    Time one download job stage by stage.
+
+    Durations accumulate per stage (a job may wait for the executor
+    several times, transfer a video and an audio stream, or run several
+    post-processors) and are observed into ``DOWNLOAD_STAGE_DURATION``
+    once per job by ``observe``. Transfer and post-processing are timed
+    from yt-dlp's hooks, since both happen inside one ``download`` call.
+
+    When ``span`` (by default the span current at creation) is sampled,
+    every stage occurrence is also exported as a child span of it.
+    """
+
+    def __init__(self, platform: str, span: Optional[Span] = None):
+        self.platform = platform
+        self.durations: Dict[str, float] = {}
+        # yt-dlp hooks fire on executor threads
+        self._lock = threading.Lock()
+        self._started: Dict[tuple, float] = {}
+        self._last = time.perf_counter()
+        self._observed = False
+        self.span = span or current_span()
+        self._wall_offset = time.time_ns() - int(self._last * 1e9)
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    def _record(self, stage: str, started: float, ended: float, key: Any = None) -> None:
+        self.add(stage, ended - started)
+        if self.span is not None and self.span.sampled:
+            attributes = {"download.stage": stage, "platform": self.platform}
+            if key is not None:
+                attributes["download.part"] = str(key)
+            tracer.record(
+                f"download.{stage}", self.span,
+                self._wall_offset + int(started * 1e9),
+                self._wall_offset + int(ended * 1e9), attributes)
+
+    def lap(self, stage: str) -> None:
+        """Attribute the time since the previous lap (or ``run``) to ``stage``"""
+        now = time.perf_counter()
+        self._record(stage, self._last, now)
+        self._last = now
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as ``stage``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._last = time.perf_counter()
+            self._record(stage, started, self._last)
+
+    async def run(
+        self,
+        stage: Optional[str],
+        executor: Optional[Executor],
+        func: Callable[..., Any],
+        *args: Any,
+    ) -> Any:
+        """
+        ``run_in_executor`` that records the queue wait separately.
+
+        With ``stage`` None only the wait is recorded, for calls whose
+        time is attributed by hooks instead (yt-dlp ``download``).
+        """
+        submitted = time.perf_counter()
+
+        def call() -> Any:
+            started = time.perf_counter()
+            self._record(QUEUE_WAIT, submitted, started)
+            try:
+                return func(*args)
+            finally:
+                if stage is not None:
+                    self._record(stage, started, time.perf_counter())
+
+        try:
+            return await asyncio.get_event_loop().run_in_executor(executor, call)
+        finally:
+            self._last = time.perf_counter()
+
+    def hook(self, ydl_opts: dict) -> dict:
+        """Add the transfer and post-processing hooks to yt-dlp options"""
+        ydl_opts['progress_hooks'] = list(
+            ydl_opts.get('progress_hooks', [])) + [self._on_progress]
+        ydl_opts['postprocessor_hooks'] = list(
+            ydl_opts.get('postprocessor_hooks', [])) + [self._on_postprocess]
+        return ydl_opts
+
+    def _mark(self, stage: str, key: Any, status: str, start: str, ends: tuple) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            if status == start:
+                self._started.setdefault((stage, key), now)
+                return
+            if status not in ends:
+                return
+            started = self._started.pop((stage, key), None)
+        if started is not None:
+            self._record(stage, started, now, key)
+
+    def _on_progress(self, d: dict) -> None:
+        self._mark(TRANSFER, d.get('filename'), d.get('status'),
+                   'downloading', ('finished', 'error'))
+
+    def _on_postprocess(self, d: dict) -> None:
+        self._mark(POSTPROCESS, d.get('postprocessor'), d.get('status'),
+                   'started', ('finished',))
+
+    def observe(self) -> None:
+        """Record the accumulated stage durations, once"""
+        if self._observed:
+            return
+        self._observed = True
+        with self._lock:
+            durations = dict(self.durations)
+        for stage, seconds in durations.items():
+            DOWNLOAD_STAGE_DURATION.labels(
+                platform=self.platform, stage=stage).observe(seconds)
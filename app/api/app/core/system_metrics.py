@@ -0,0 +1,113 @@
+import logging
+import os
+import threading
+from concurrent.futures import Executor
+from typing import Callable, Dict, Optional
+
+import psutil
+
+from .metrics import (
+    DOWNLOAD_SESSIONS,
+    EXECUTOR_THREADS,
+    SYSTEM_CPU_USAGE,
+    SYSTEM_MEMORY_USAGE,
+    VOLUME_BYTES,
+    WORKER_CPU_USAGE,
+    WORKER_OPEN_FDS,
+    WORKER_RESIDENT_MEMORY
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SystemMetricsSampler:
+    """
+    Publish host and worker resource gauges every ``interval`` seconds.
+
+    Sampling runs on its own daemon thread, so it neither blocks the
+    event loop nor waits behind a busy executor. CPU percentages come
+    from psutil's ``interval=None`` mode, which measures since the
+    previous call instead of sleeping.
+
+    ``volumes`` maps a label to a folder whose filesystem is reported;
+    ``executors`` and ``sessions`` are called on every sample, so they
+    may refer to objects created after the sampler starts.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        volumes: Dict[str, str],
+        executors: Callable[[], Dict[str, Optional[Executor]]] = dict,
+        sessions: Optional[Callable[[], int]] = None,
+    ):
+        self.interval = interval
+        self.volumes = volumes
+        self.executors = executors
+        self.sessions = sessions
+        self.process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> None:
+        """Take one sample; each source fails independently"""
+        for name, collect in (
+            ("cpu", self._sample_cpu),
+            ("memory", self._sample_memory),
+            ("volumes", self._sample_volumes),
+            ("executors", self._sample_executors),
+        ):
+            try:
+                collect()
+            except Exception as e:
+                logger.warning(f"System metrics: could not sample {name}: {e}")
+
+    def _sample_cpu(self) -> None:
+        SYSTEM_CPU_USAGE.set(psutil.cpu_percent(interval=None))
+        WORKER_CPU_USAGE.set(self.process.cpu_percent(interval=None))
+
+    def _sample_memory(self) -> None:
+        SYSTEM_MEMORY_USAGE.set(psutil.virtual_memory().used)
+        WORKER_RESIDENT_MEMORY.set(self.process.memory_info().rss)
+        if hasattr(self.process, "num_fds"):
+            WORKER_OPEN_FDS.set(self.process.num_fds())
+        else:
+            WORKER_OPEN_FDS.set(self.process.num_handles())
+
+    def _sample_volumes(self) -> None:
+        for volume, folder in self.volumes.items():
+            if not os.path.isdir(folder):
+                continue
+            usage = psutil.disk_usage(folder)
+            VOLUME_BYTES.labels(volume=volume, kind="total").set(usage.total)
+            VOLUME_BYTES.labels(volume=volume, kind="used").set(usage.used)
+            VOLUME_BYTES.labels(volume=volume, kind="free").set(usage.free)
+
+    def _sample_executors(self) -> None:
+        for name, executor in self.executors().items():
+            if executor is not None:
+                EXECUTOR_THREADS.labels(executor=name).set(
+                    len(getattr(executor, "_threads", ())))
+        if self.sessions is not None:
+            DOWNLOAD_SESSIONS.set(self.sessions())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self) -> None:
+        """Start sampling; an interval of 0 disables the sampler"""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        # The first CPU reading only sets psutil's baseline
+        self.sample()
+        self._thread = threading.Thread(
+            target=self._run, name="system-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
@@ -0,0 +1,381 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Union
+
+import httpx
+
+from .config import settings
+from .metrics import TRACE_SPANS_DROPPED
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "social-media-downloader"
+
+# OTLP span kinds
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+class SpanContext(NamedTuple):
+    """Identity of a span, possibly one from another process"""
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+    @property
+    def traceparent(self) -> str:
+        """W3C ``traceparent`` header value"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """Parse a W3C ``traceparent`` header; None if absent or malformed"""
+    match = TRACEPARENT.match((value or "").strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+def _attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    """
+    One timed operation of a trace.
+
+    Spans that were not sampled still carry IDs, so logs can reference
+    the trace, but they record nothing and are never exported.
+    """
+
+    __slots__ = (
+        "tracer", "name", "context", "parent_id", "kind", "start_ns",
+        "end_ns", "attributes", "events", "status", "status_message",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        context: SpanContext,
+        parent_id: Optional[str],
+        kind: int,
+        start_ns: int,
+        attributes: Optional[Dict[str, Any]],
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.events: List[dict] = []
+        self.status = 0
+        self.status_message = ""
+
+    @property
+    def sampled(self) -> bool:
+        return self.context.sampled
+
+    @property
+    def trace_id(self) -> str:
+        return self.context.trace_id
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.context.sampled and value is not None:
+            self.attributes[key] = value
+
+    def set_status(self, code: int, message: str = "") -> None:
+        self.status = code
+        self.status_message = message
+
+    def record_exception(self, error: BaseException) -> None:
+        self.set_status(STATUS_ERROR, str(error))
+        if self.context.sampled:
+            self.events.append({
+                "name": "exception",
+                "timeUnixNano": str(time.time_ns()),
+                "attributes": [
+                    _attribute("exception.type", type(error).__name__),
+                    _attribute("exception.message", str(error)),
+                ],
+            })
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        """End the span and queue it for export; later calls are ignored"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if self.context.sampled:
+            self.tracer._export(self)
+
+    def to_otlp(self) -> dict:
+        """The span in OTLP/JSON form"""
+        span = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.events:
+            span["events"] = self.events
+        if self.status:
+            span["status"] = {"code": self.status, "message": self.status_message}
+        return span
+
+
+class FileSpanExporter:
+    """Append OTLP/JSON export requests to a file, one per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, payload: dict) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+    def shutdown(self) -> None:
+        pass
+
+
+class OTLPHttpExporter:
+    """POST OTLP/JSON export requests to a collector's ``/v1/traces``"""
+
+    def __init__(self, endpoint: str, timeout: float = 10):
+        self.endpoint = endpoint
+        self.client = httpx.Client(timeout=timeout)
+
+    def export(self, payload: dict) -> None:
+        self.client.post(self.endpoint, json=payload).raise_for_status()
+
+    def shutdown(self) -> None:
+        self.client.close()
+
+
+class Tracer:
+    """
+    Minimal OpenTelemetry-compatible tracer.
+
+    Trace context lives in a ``ContextVar``, so it follows a request
+    into its ``BackgroundTasks`` and into tasks it creates. Spans are
+    exported in OTLP/JSON from a background thread in batches; when the
+    queue is full spans are dropped rather than slowing requests down.
+
+    Sampling is decided once per trace from its ID (``sample_ratio`` of
+    new traces are kept) and inherited by child spans, including the
+    flag of an incoming ``traceparent``. Without an exporter nothing is
+    sampled, and spans cost little more than generating their IDs.
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[Union[FileSpanExporter, OTLPHttpExporter]] = None,
+        sample_ratio: float = 1.0,
+        max_queue_size: int = 2048,
+        batch_size: int = 512,
+        flush_interval: float = 2.0,
+    ):
+        self.configure(exporter, sample_ratio)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+
+    def configure(
+        self,
+        exporter: Optional[Union[FileSpanExporter, OTLPHttpExporter]],
+        sample_ratio: float,
+    ) -> None:
+        """Set the exporter and the share of new traces that are sampled"""
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self._threshold = int(max(0.0, min(sample_ratio, 1.0)) * (1 << 64))
+
+    def start_span(
+        self,
+        name: str,
+        parent: Union["Span", SpanContext, None] = None,
+        kind: int = INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        start_ns: Optional[int] = None,
+    ) -> Span:
+        """Start a span under ``parent``, or under the current span if None"""
+        if parent is None:
+            parent = _current_span.get()
+        if isinstance(parent, Span):
+            parent = parent.context
+        span_id = f"{random.getrandbits(64):016x}"
+        if parent is not None:
+            context = SpanContext(
+                parent.trace_id, span_id,
+                parent.sampled and self.exporter is not None)
+            parent_id = parent.span_id
+        else:
+            trace_bits = random.getrandbits(128)
+            # Same rule as OpenTelemetry's TraceIdRatioBased sampler
+            sampled = (self.exporter is not None
+                       and (trace_bits & ((1 << 64) - 1)) < self._threshold)
+            context = SpanContext(f"{trace_bits:032x}", span_id, sampled)
+            parent_id = None
+        return Span(self, name, context, parent_id, kind,
+                    start_ns or time.time_ns(), attributes)
+
+    @contextmanager
+    def span(self, name: str, kind: int = INTERNAL, **attributes: Any) -> Iterator[Span]:
+        """Run the enclosed block as the current span"""
+        span = self.start_span(name, kind=kind, attributes=attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def record(
+        self,
+        name: str,
+        parent: Span,
+        start_ns: int,
+        end_ns: int,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Export an already finished child span of a sampled ``parent``"""
+        if parent.sampled:
+            self.start_span(name, parent, attributes=attributes,
+                            start_ns=start_ns).end(end_ns)
+
+    def _export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            TRACE_SPANS_DROPPED.inc()
+
+    def payload(self, spans: List[Span]) -> dict:
+        """An OTLP ``ExportTraceServiceRequest`` holding ``spans``"""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _attribute("service.name", SERVICE_NAME),
+                    _attribute("process.pid", os.getpid()),
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+
+    def _flush(self, spans: List[Span]) -> None:
+        try:
+            self.exporter.export(self.payload(spans))
+        except Exception as e:
+            TRACE_SPANS_DROPPED.inc(len(spans))
+            logger.warning(f"Could not export {len(spans)} spans: {e}")
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                self._flush(batch)
+
+    def start(self) -> None:
+        """Start the export thread; does nothing without an exporter"""
+        if self.exporter is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        """Export what is queued and stop the export thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=self.flush_interval + 5)
+        self._thread = None
+        self.exporter.shutdown()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_request_id() -> Optional[str]:
+    """ID of the HTTP request this code runs on behalf of, if any"""
+    return _request_id.get()
+
+
+def activate(span: Span, request_id: Optional[str] = None) -> tuple:
+    """Make ``span`` current until ``deactivate`` is called with the result"""
+    return _current_span.set(span), _request_id.set(request_id)
+
+
+def deactivate(tokens: tuple) -> None:
+    span_token, request_token = tokens
+    _request_id.reset(request_token)
+    _current_span.reset(span_token)
+
+
+def build_tracer() -> Tracer:
+    """Tracer configured from TRACE_EXPORTER and related settings"""
+    exporter = None
+    if settings.TRACE_EXPORTER == "file":
+        exporter = FileSpanExporter(settings.TRACE_FILE)
+    elif settings.TRACE_EXPORTER == "otlp":
+        exporter = OTLPHttpExporter(settings.TRACE_OTLP_ENDPOINT)
+    elif settings.TRACE_EXPORTER not in ("", "none"):
+        logger.warning(f"Unknown TRACE_EXPORTER {settings.TRACE_EXPORTER!r}, tracing disabled")
+    return Tracer(exporter, settings.TRACE_SAMPLE_RATIO)
+
+
+tracer = build_tracer()
@@ -1,11 +1,10 @@
-from fastapi import FastAPI, Request, Depends, HTTPException, status
+from fastapi import FastAPI, Request, Depends, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import APIKeyHeader
 import uvicorn
 import os
-import uuid
+import asyncio
 from .api.routes import downloads
 from .core.error_handlers import setup_error_handlers
 from .core.config import settings
@@ -13,20 +12,29 @@ from . import routes_test
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import CONTENT_TYPE_LATEST
 from starlette.responses import Response
 import logging
 import time
 import json
 from .core.logging_config import setup_logging
 from .core.exceptions import DownloaderException
+from .core.file_delivery import DeliveryStaticFiles
+from .core.metrics import generate_metrics, mark_worker_dead, reset_multiproc_dir
+from .core.middleware import RequestContextMiddleware
+from .core.profiler import ProfilerBusy, profile_filename, profiler
+from .core.error_reporting import error_aggregator
+from .core.executors import InstrumentedExecutor
+from .core.loop_monitor import LoopMonitor
+from .core.system_metrics import SystemMetricsSampler
+from .core.tracing import tracer
+from .services.download_manager import DownloadManager
+from .services.registry import registry
+from .services.storage import content_store
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from contextlib import asynccontextmanager
-import prometheus_client
-from prometheus_client import Counter, Histogram, Gauge
 import secrets
 from .routes import tiktok as tiktok_routes
 from .routes import youtube as youtube_routes
@@ -54,26 +62,51 @@ limiter = Limiter(key_func=get_remote_address)
 api_key_header = APIKeyHeader(
     name=settings.API_KEY_HEADER_NAME, auto_error=False)
 
-# Create metrics
-REQUEST_COUNT = Counter(
-    'request_count', 'App Request Count',
-    ['app_name', 'method', 'endpoint', 'http_status']
-)
-REQUEST_LATENCY = Histogram(
-    'request_latency_seconds', 'Request latency',
-    ['app_name', 'endpoint']
-)
-ACTIVE_CONNECTIONS = Gauge(
-    'active_connections', 'Active connections',
-    ['app_name']
-)
-
 
 @asynccontextmanager
 async def lifespan(app):
-    # Startup logic (if any)
+    # Open the shared HTTP client pool for this worker
+    await registry.startup()
+    # Export sampled trace spans in the background
+    tracer.start()
+    # An explicit default executor, so its threads and queue can be reported
+    default_executor = InstrumentedExecutor(
+        "default", thread_name_prefix="asyncio-default")
+    asyncio.get_running_loop().set_default_executor(default_executor)
+    # Measure event loop lag and log whatever blocks the loop
+    loop_monitor = LoopMonitor(
+        settings.EVENT_LOOP_LAG_INTERVAL_SECONDS,
+        settings.SLOW_CALLBACK_THRESHOLD_SECONDS)
+    loop_monitor.start()
+    # Reconcile the download index with what survived on disk
+    await asyncio.get_running_loop().run_in_executor(None, content_store.recover)
+    # Publish host and worker resource gauges in the background
+    sampler = SystemMetricsSampler(
+        settings.SYSTEM_METRICS_INTERVAL_SECONDS,
+        volumes={
+            "downloads": content_store.root,
+            "staging": content_store.staging.folder,
+        },
+        # The download manager is built on first use, not to be sampled
+        executors=lambda: {
+            "default": default_executor,
+            "download_manager": getattr(registry.peek(DownloadManager), "executor", None),
+        },
+        sessions=lambda: len(getattr(registry.peek(DownloadManager), "active_downloads", {})),
+    )
+    sampler.start()
+    # Log error summaries each window even once errors stop
+    error_aggregator.start()
     yield
-    # Shutdown logic (if any)
+    error_aggregator.stop()
+    sampler.stop()
+    await loop_monitor.stop()
+    # Close pooled connections and service executors
+    await registry.shutdown()
+    content_store.close()
+    tracer.shutdown()
+    # Stop reporting this worker's in-flight gauges
+    mark_worker_dead(os.getpid())
 
 app = FastAPI(
     title="Social Media Downloader API",
@@ -94,6 +127,15 @@ logger.info(f"API KEY REQUIRED: {settings.REQUIRE_API_KEY}")
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Request ID, API key and timing middleware. Added first so it sits inside
+# the session middleware and can read session-stored API keys.
+app.add_middleware(
+    RequestContextMiddleware,
+    api_keys=(settings.ADMIN_API_KEY, settings.WEBSITE_API_KEY),
+    header_name=settings.API_KEY_HEADER_NAME,
+    require_api_key=settings.REQUIRE_API_KEY,
+)
+
 # Add session middleware BEFORE CORS middleware
 app.add_middleware(
     SessionMiddleware,
@@ -116,7 +158,7 @@ os.makedirs(settings.DOWNLOAD_FOLDER, exist_ok=True)
 
 # Mount the downloads directory as a static file directory
 app.mount("/downloads",
-          StaticFiles(directory=settings.DOWNLOAD_FOLDER), name="downloads")
+          DeliveryStaticFiles(directory=settings.DOWNLOAD_FOLDER), name="downloads")
 
 # Setup error handlers
 setup_error_handlers(app)
@@ -190,78 +232,6 @@ async def verify_api_key(api_key: str = Depends(api_key_header)):
         headers={"WWW-Authenticate": "ApiKey"},
     )
 
-# Request ID middleware
-
-
-@app.middleware("http")
-async def add_request_id(request: Request, call_next):
-    request.state.request_id = str(uuid.uuid4())
-    response = await call_next(request)
-    response.headers["X-Request-ID"] = request.state.request_id
-    return response
-
-# Path patterns that don't require API key verification
-OPEN_API_PATHS = [
-    "/docs",
-    "/redoc",
-    "/openapi.json",
-    "/health",
-]
-
-# API Key middleware
-
-
-@app.middleware("http")
-async def api_key_middleware(request: Request, call_next):
-    # Skip authentication for OPTIONS requests (CORS preflight)
-    if request.method == "OPTIONS":
-        return await call_next(request)
-
-    # Skip authentication for open paths
-    for path in OPEN_API_PATHS:
-        if request.url.path.startswith(path):
-            return await call_next(request)
-
-    # Skip authentication for auth endpoints
-    if request.url.path.startswith("/api/v1/auth"):
-        return await call_next(request)
-
-    # Skip API key check in development mode if configured
-    if settings.ENV == "development" and not settings.REQUIRE_API_KEY:
-        return await call_next(request)
-
-    # Check session for stored API key first
-    try:
-        session_api_key = request.session.get("api_key")
-    except:
-        session_api_key = None
-
-    # Then check header
-    api_key = session_api_key or request.headers.get(
-        settings.API_KEY_HEADER_NAME)
-
-    # If no API key is provided and it's required
-    if not api_key and settings.REQUIRE_API_KEY:
-        return JSONResponse(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            content={"detail": "API key is missing"},
-            headers={"WWW-Authenticate": "ApiKey"},
-        )
-
-    # If API key is provided, validate it
-    if api_key and settings.REQUIRE_API_KEY:
-        if (settings.ADMIN_API_KEY and api_key == settings.ADMIN_API_KEY) or \
-           (settings.WEBSITE_API_KEY and api_key == settings.WEBSITE_API_KEY):
-            return await call_next(request)
-
-        return JSONResponse(
-            status_code=status.HTTP_403_FORBIDDEN,
-            content={"detail": "Invalid API key"},
-            headers={"WWW-Authenticate": "ApiKey"},
-        )
-
-    return await call_next(request)
-
 # Health check endpoint
 
 
@@ -317,48 +287,37 @@ async def root(request: Request):
 @app.get("/metrics")
 async def metrics(api_key: str = Depends(verify_admin_api_key)):
     """Endpoint for Prometheus metrics - admin access only"""
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
-
-# Middleware for request ID and timing
-
-
-class RequestMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-
-        # Track metrics
-        ACTIVE_CONNECTIONS.labels(app_name="tiktok_downloader").inc()
-        start_time = time.time()
-
-        try:
-            response = await call_next(request)
-
-            # Record metrics
-            process_time = time.time() - start_time
-            REQUEST_LATENCY.labels(
-                app_name="tiktok_downloader",
-                endpoint=request.url.path
-            ).observe(process_time)
-
-            REQUEST_COUNT.labels(
-                app_name="tiktok_downloader",
-                method=request.method,
-                endpoint=request.url.path,
-                http_status=response.status_code
-            ).inc()
-
-            response.headers["X-Process-Time"] = str(process_time)
-            response.headers["X-Request-ID"] = request_id
-            return response
-        except Exception as exc:
-            logger.error(f"Error occurred: {exc}", exc_info=True)
-            return JSONResponse(
-                status_code=500,
-                content={"detail": "Internal server error"}
-            )
-        finally:
-            ACTIVE_CONNECTIONS.labels(app_name="tiktok_downloader").dec()
+    # Merging every worker's files is blocking I/O, keep it off the loop
+    body = await asyncio.get_running_loop().run_in_executor(None, generate_metrics)
+    return Response(body, media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/debug/profile")
+async def debug_profile(
+    seconds: float = Query(10, gt=0, le=settings.PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(10, ge=1, le=1000),
+    idle: bool = False,
+    api_key: str = Depends(verify_admin_api_key)
+):
+    """
+    Sample every thread of this worker for ``seconds`` - admin access only.
+
+    Returns collapsed stacks for flamegraph.pl or speedscope. Each call
+    profiles whichever worker process served it.
+    """
+    started = time.time()
+    try:
+        future = profiler.start(seconds, interval_ms / 1000, idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    collapsed, samples = await asyncio.wrap_future(future)
+    return PlainTextResponse(
+        collapsed,
+        headers={
+            "Content-Disposition": f'attachment; filename="{profile_filename(started)}"',
+            "X-Profile-Samples": str(samples),
+        },
+    )
 
 # Exception handler for custom exceptions
 
@@ -383,6 +342,7 @@ async def generic_exception_handler(request: Request, exc: Exception):
     )
 
 if __name__ == "__main__":
+    reset_multiproc_dir()
     uvicorn.run(
         "app.main:app",
         host=settings.HOST,
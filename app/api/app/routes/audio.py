@@ -1,20 +1,25 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from typing import List
 from ..models.audio import AudioExtractRequest, AudioBatchExtractRequest, AudioExtractResponse
 from ..services.audio_extractor import AudioExtractorService
+from ..services.registry import get_audio_extractor
 
 router = APIRouter(prefix="/api/v1/audio", tags=["audio"])
 
 
 @router.post("/extract", response_model=AudioExtractResponse)
-async def extract_audio(request: AudioExtractRequest):
+async def extract_audio(
+    request: AudioExtractRequest,
+    service: AudioExtractorService = Depends(get_audio_extractor)
+):
     """Extract audio from any supported platform video URL"""
-    service = AudioExtractorService()
     return await service.extract_audio(request.url)
 
 
 @router.post("/batch-extract", response_model=List[AudioExtractResponse])
-async def batch_extract_audio(request: AudioBatchExtractRequest):
+async def batch_extract_audio(
+    request: AudioBatchExtractRequest,
+    service: AudioExtractorService = Depends(get_audio_extractor)
+):
     """Extract audio from multiple video URLs"""
-    service = AudioExtractorService()
     return await service.batch_extract_audio(request.urls)
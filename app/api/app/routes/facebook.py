@@ -1,25 +1,26 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from typing import List
 from ..models.base import DownloadRequest, BatchDownloadRequest, DownloadResponse, DownloadStatus
 from ..models.facebook import FacebookDownloadRequest, FacebookDownloadResponse, FacebookBatchDownloadRequest
 from ..services.facebook import FacebookService
+from ..services.registry import get_facebook_service
 
 router = APIRouter(prefix="/api/v1/facebook", tags=["facebook"])
 
 @router.post("/download", response_model=DownloadResponse)
 async def download_video(
-    request: DownloadRequest
+    request: DownloadRequest,
+    service: FacebookService = Depends(get_facebook_service)
 ):
     """Download a single Facebook video"""
-    service = FacebookService()
     return await service.download_video(request.url, request.quality)
 
 @router.post("/download-advanced", response_model=FacebookDownloadResponse)
 async def download_video_advanced(
-    request: FacebookDownloadRequest
+    request: FacebookDownloadRequest,
+    service: FacebookService = Depends(get_facebook_service)
 ):
     """Download Facebook video with advanced options"""
-    service = FacebookService()
     result = await service.download_video(request.url, request.quality.value)
     
     return FacebookDownloadResponse(
@@ -33,18 +34,18 @@ async def download_video_advanced(
 
 @router.post("/batch", response_model=List[DownloadResponse])
 async def batch_download(
-    request: BatchDownloadRequest
+    request: BatchDownloadRequest,
+    service: FacebookService = Depends(get_facebook_service)
 ):
     """Download multiple Facebook videos"""
-    service = FacebookService()
     return await service.batch_download(request.urls, request.quality)
 
 @router.post("/batch-advanced", response_model=List[FacebookDownloadResponse])
 async def batch_download_advanced(
-    request: FacebookBatchDownloadRequest
+    request: FacebookBatchDownloadRequest,
+    service: FacebookService = Depends(get_facebook_service)
 ):
     """Download multiple Facebook videos with advanced options"""
-    service = FacebookService()
     results = await service.batch_download(request.urls, request.quality.value)
     
     # Convert to FacebookDownloadResponse format
@@ -64,18 +65,18 @@ async def batch_download_advanced(
 
 @router.get("/status/{session_id}", response_model=DownloadStatus)
 async def get_status(
-    session_id: str
+    session_id: str,
+    service: FacebookService = Depends(get_facebook_service)
 ):
     """Get the status of a Facebook download"""
-    service = FacebookService()
     return await service.get_status(session_id)
 
 @router.get("/reel-info/{video_id}")
 async def get_reel_info(
-    video_id: str
+    video_id: str,
+    service: FacebookService = Depends(get_facebook_service)
 ):
     """Get information about a Facebook Reel video without downloading"""
-    service = FacebookService()
     # This would extract info about a Reel video
     # Implementation would go here
     return {"video_id": video_id, "is_reel": True}
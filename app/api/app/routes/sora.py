@@ -4,15 +4,13 @@ from typing import List, Optional
 import logging
 
 from ..services.sora import SoraService
+from ..services.registry import get_sora_service
 from ..core.exceptions import DownloadFailedException, InvalidURLException
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/sora", tags=["sora"])
 
-# Initialize Sora service
-sora_service = SoraService()
-
 
 class SoraDownloadRequest(BaseModel):
     url: HttpUrl
@@ -31,7 +29,10 @@ class SoraTestRequest(BaseModel):
 
 
 @router.post("/download")
-async def download_sora_video(request: SoraDownloadRequest):
+async def download_sora_video(
+    request: SoraDownloadRequest,
+    sora_service: SoraService = Depends(get_sora_service)
+):
     """
     Download a single Sora video without watermark
     """
@@ -48,7 +49,10 @@ async def download_sora_video(request: SoraDownloadRequest):
 
 
 @router.post("/batch")
-async def batch_download_sora_videos(request: SoraBatchDownloadRequest):
+async def batch_download_sora_videos(
+    request: SoraBatchDownloadRequest,
+    sora_service: SoraService = Depends(get_sora_service)
+):
     """
     Download multiple Sora videos
     """
@@ -62,7 +66,10 @@ async def batch_download_sora_videos(request: SoraBatchDownloadRequest):
 
 
 @router.post("/test")
-async def test_sora_extraction(request: SoraTestRequest):
+async def test_sora_extraction(
+    request: SoraTestRequest,
+    sora_service: SoraService = Depends(get_sora_service)
+):
     """
     Test Sora video extraction to see available formats
     This is useful for debugging and understanding what yt-dlp can extract
@@ -81,7 +88,10 @@ async def test_sora_extraction(request: SoraTestRequest):
 
 
 @router.get("/status/{session_id}")
-async def get_sora_download_status(session_id: str):
+async def get_sora_download_status(
+    session_id: str,
+    sora_service: SoraService = Depends(get_sora_service)
+):
     """
     Get the status of a Sora download
     """
@@ -94,7 +104,9 @@ async def get_sora_download_status(session_id: str):
 
 
 @router.get("/health")
-async def sora_health_check():
+async def sora_health_check(
+    sora_service: SoraService = Depends(get_sora_service)
+):
     """
     Health check for Sora service
     """
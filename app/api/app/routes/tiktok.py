@@ -3,6 +3,7 @@ from typing import Optional, List
 from ..models.base import DownloadRequest, BatchDownloadRequest, DownloadResponse, DownloadStatus
 from ..core.exceptions import InvalidURLException, DownloadFailedException, UnauthorizedException
 from ..services.tiktok import TikTokService
+from ..services.registry import get_tiktok_service
 from ..core.config import settings
 
 router = APIRouter(prefix="/api/v1/tiktok", tags=["tiktok"])
@@ -19,9 +20,11 @@ def verify_api_key(x_api_key: Optional[str] = Header(None)):
 
 
 @router.post("/download")
-async def download_video(url: str, api_key: str = Depends(verify_api_key)):
+async def download_video(
+    url: str, api_key: str = Depends(verify_api_key),
+    service: TikTokService = Depends(get_tiktok_service)
+):
     """Download a single TikTok video"""
-    service = TikTokService()
     try:
         result = await service.download_video(url)
         return {
@@ -38,9 +41,11 @@ async def download_video(url: str, api_key: str = Depends(verify_api_key)):
 
 
 @router.post("/batch")
-async def batch_download(urls: List[str], api_key: str = Depends(verify_api_key)):
+async def batch_download(
+    urls: List[str], api_key: str = Depends(verify_api_key),
+    service: TikTokService = Depends(get_tiktok_service)
+):
     """Download multiple TikTok videos"""
-    service = TikTokService()
     try:
         results = await service.batch_download(urls)
         return {
@@ -57,8 +62,8 @@ async def batch_download(urls: List[str], api_key: str = Depends(verify_api_key)
 @router.get("/status/{session_id}", response_model=DownloadStatus)
 async def get_status(
     session_id: str,
-    api_key: str = Depends(verify_api_key)
+    api_key: str = Depends(verify_api_key),
+    service: TikTokService = Depends(get_tiktok_service)
 ):
     """Get the status of a download"""
-    service = TikTokService()
     return await service.get_status(session_id)
@@ -1,16 +1,18 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse
 import os
 import time
 from .models.download import DownloadStatus, Platform
 from .services.download_manager import DownloadManager
+from .services.registry import get_download_manager
 
 router = APIRouter()
-download_manager = DownloadManager()
 
 
 @router.get("/create-test-session")
-async def create_test_session():
+async def create_test_session(
+    download_manager: DownloadManager = Depends(get_download_manager)
+):
     """Create a test download session for debugging."""
     try:
         # Ensure the downloads directory exists
@@ -1,4 +1,3 @@
-import yt_dlp
 import os
 import uuid
 import logging
@@ -6,8 +5,9 @@ import time
 from typing import List
 from pydantic import HttpUrl
 from ..core.config import settings
+from .storage import content_store
+from ..core.stage_timer import FINALIZE, RESOLVE, StageTimer
 from ..core.exceptions import DownloadFailedException, InvalidURLException
-import asyncio
 
 logger = logging.getLogger(__name__)
 
@@ -30,16 +30,21 @@ class AudioExtractorService:
 
     async def extract_audio(self, url: HttpUrl) -> dict:
         """Extract audio from video URL"""
+        import yt_dlp
+        timer = StageTimer("audio")
         session_id = str(uuid.uuid4())
-        filename = f"audio_{uuid.uuid4().hex[:8]}.m4a"
+        filename = content_store.allocate(
+            f"audio_{uuid.uuid4().hex[:8]}.m4a")
         file_path = os.path.join(self.download_path, filename)
+        staged = content_store.staging.stage(
+            filename, key=f"audio|{url}")
 
         try:
             platform = self._detect_platform(str(url))
 
             ydl_opts = {
                 'format': 'bestaudio/best',
-                'outtmpl': file_path.replace('.m4a', '.%(ext)s'),
+                'outtmpl': staged.path.replace('.m4a', '.%(ext)s'),
                 'quiet': True,
                 'no_warnings': True,
                 'postprocessors': [{
@@ -51,11 +56,13 @@ class AudioExtractorService:
                 'retries': 3,
             }
 
-            loop = asyncio.get_event_loop()
+            # Run yt-dlp off the event loop, timing each stage
+            timer.hook(ydl_opts)
+            timer.lap(RESOLVE)
 
             # Extract info and download
-            info_dict = await loop.run_in_executor(
-                None,
+            info_dict = await timer.run(
+                None, None,
                 lambda: yt_dlp.YoutubeDL(ydl_opts).extract_info(
                     str(url), download=True)
             )
@@ -64,20 +71,25 @@ class AudioExtractorService:
                 raise DownloadFailedException("Could not extract audio")
 
             # Verify file exists
-            if not os.path.exists(file_path):
+            if not os.path.exists(staged.path):
                 raise DownloadFailedException(
                     "Audio extraction completed but file not found")
 
-            # Update file timestamp to current time for better organization on mobile devices
+            # Update file timestamp to current time for better organization on mobile devices;
+            # before publishing, as a deduplicated file shares its blob's inode
             current_time = time.time()
-            os.utime(file_path, (current_time, current_time))
+            os.utime(staged.path, (current_time, current_time))
             logger.info(f"Updated audio file timestamp to current time for: {file_path}")
 
+            # Move into the public folder in one rename, then deduplicate
+            await timer.run(
+                FINALIZE, None, content_store.publish_staged, staged.path, filename)
+
             return {
                 "session_id": session_id,
                 "status": "completed",
                 "message": "Audio extracted successfully",
-                "audio_url": f"/downloads/{filename}",
+                "audio_url": content_store.url_for(filename),
                 "title": info_dict.get('title', ''),
                 "duration": info_dict.get('duration'),
                 "platform": platform
@@ -94,6 +106,9 @@ class AudioExtractorService:
                 "duration": None,
                 "platform": platform
             }
+        finally:
+            staged.close()
+            timer.observe()
 
     async def batch_extract_audio(self, urls: List[HttpUrl]) -> List[dict]:
         """Extract audio from multiple video URLs"""
@@ -0,0 +1,585 @@
+"""
+Concurrent, resumable batch downloads for the command-line tools.
+
+URLs are downloaded by a pool of worker threads, each with its own
+``YoutubeDL``. Two files make a run restartable:
+
+* the download archive records ``<extractor> <id>`` for every video
+  downloaded completely, in the format of yt-dlp's ``--download-archive``.
+  Archived videos are skipped on any later run, from any URL list.
+* the checkpoint records the outcome of each URL of one list, so a
+  rerun skips finished URLs without a request even when the video ID
+  can't be read from the URL (e.g. short links).
+
+Interrupted downloads keep their ``.part`` files, which yt-dlp resumes.
+
+Usage (from app/api):
+    python -m app.services.batch_engine tiktok_urls.txt --platform tiktok --workers 8
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO
+
+import yt_dlp
+from yt_dlp.extractor import gen_extractor_classes
+from yt_dlp.utils import DownloadCancelled, make_archive_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+
+# Outcomes of one URL
+DONE = "done"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+# yt-dlp options of the command-line downloaders, per platform
+PRESETS: Dict[str, Dict[str, Any]] = {
+    "tiktok": {
+        'format': 'mp4',
+        'noplaylist': True,
+    },
+    "instagram": {
+        'format': 'best',
+        'noplaylist': False,  # Carousel posts are playlists
+        'cookiefile': 'instagram_cookies.txt',  # Optional for private content
+        'extract_flat': False,
+        'ignoreerrors': True,  # Keep the other items of a carousel
+    },
+}
+
+DEFAULT_OUTPUT_DIRS = {
+    "tiktok": "downloads",
+    "instagram": "downloads/instagram",
+}
+
+# Titles repeat (and TikTok's are often empty), so concurrent downloads
+# need the ID in the name not to write to the same file
+OUTPUT_TEMPLATE = '%(title).150B [%(id)s].%(ext)s'
+
+_extractors: Optional[List[type]] = None
+
+
+def url_archive_key(url: str) -> Optional[str]:
+    """
+    Archive key of the video at ``url``, if the URL alone identifies it.
+
+    Same lookup yt-dlp does before extracting: the first suitable
+    extractor and the ID in its URL pattern.
+    """
+    global _extractors
+    if _extractors is None:
+        _extractors = list(gen_extractor_classes())
+    for ie in _extractors:
+        if ie.suitable(url):
+            video_id = ie.get_temp_id(url)
+            return make_archive_id(ie, video_id) if video_id else None
+    return None
+
+
+def read_urls(file_path: str) -> List[str]:
+    """URLs of a list file in order, without blank lines and repeats"""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return list(dict.fromkeys(line.strip() for line in file if line.strip()))
+
+
+class DownloadArchive:
+    """
+    IDs of completely downloaded videos, optionally persisted to a file.
+
+    yt-dlp is given the archive object itself as ``download_archive``:
+    it checks it before and after extraction and calls ``add`` when a
+    download finishes, so all workers share one in-memory set and each
+    key is appended to the file once.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._ids = set()
+        self._lock = threading.Lock()
+        self._file: Optional[TextIO] = None
+        if path is not None:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._ids.update(line.strip() for line in f if line.strip())
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(path, 'a', encoding='utf-8')
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            if key in self._ids:
+                return
+            self._ids.add(key)
+            if self._file is not None:
+                self._file.write(key + '\n')
+                self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Checkpoint:
+    """
+    Outcome of each URL of a list, appended as JSON lines.
+
+    The last line for a URL wins, so a failed URL that succeeds on a
+    rerun is finished from then on. A line cut short by a crash is
+    ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.outcomes: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.outcomes[entry["url"]] = entry["status"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def finished(self, url: str) -> bool:
+        return self.outcomes.get(url) in (DONE, SKIPPED)
+
+    def record(self, url: str, status: str, error: Optional[str] = None) -> None:
+        entry = {"url": url, "status": status, "at": time.time()}
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self.outcomes[url] = status
+            self._file.write(json.dumps(entry) + '\n')
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one URL; ``info`` is yt-dlp's info dict when downloaded"""
+    url: str
+    status: str
+    error: Optional[str] = None
+    info: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class BatchProgress:
+    """Aggregate state of a batch run"""
+    total: int = 0
+    done: int = 0
+    skipped: int = 0
+    failed: int = 0
+    active: int = 0
+    bytes_downloaded: int = 0
+    started: float = 0.0
+
+    @property
+    def finished(self) -> int:
+        return self.done + self.skipped + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started if self.started else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds left at the rate URLs were attempted so far"""
+        attempted = self.done + self.failed
+        if not attempted:
+            return None
+        return (self.total - self.finished) * self.elapsed / attempted
+
+
+class _Client:
+    """A worker thread's ``YoutubeDL``, also its logger and progress hook"""
+
+    def __init__(self, engine: "BatchDownloader"):
+        self.engine = engine
+        self.files: Dict[str, int] = {}
+        self.errors: List[str] = []
+        self.ydl = yt_dlp.YoutubeDL({
+            **engine.ydl_opts,
+            'logger': self,
+            'progress_hooks': [self.hook],
+        })
+
+    def debug(self, msg: str) -> None:
+        pass
+
+    def info(self, msg: str) -> None:
+        pass
+
+    def warning(self, msg: str) -> None:
+        pass
+
+    def error(self, msg: str) -> None:
+        self.errors.append(msg)
+
+    def hook(self, status: Dict[str, Any]) -> None:
+        if self.engine.stopping:
+            # Leaves the .part file for the next run to resume
+            raise DownloadCancelled()
+        downloaded = status.get('downloaded_bytes') or 0
+        filename = status.get('filename') or ''
+        delta = downloaded - self.files.get(filename, 0)
+        self.files[filename] = downloaded
+        if delta > 0:
+            self.engine._add_bytes(delta)
+
+
+def _downloaded(info: Optional[Dict[str, Any]]) -> bool:
+    """Whether yt-dlp downloaded (or found on disk) anything for ``info``"""
+    if not info:
+        return False
+    if info.get('requested_downloads'):
+        return True
+    return any(_downloaded(entry) for entry in info.get('entries') or ())
+
+
+class BatchDownloader:
+    """
+    Download a list of URLs with a pool of ``workers`` threads.
+
+    ``on_result`` is called with each URL's ``BatchResult`` as it
+    finishes; calls come from worker threads but never overlap.
+    ``progress()`` can be polled from any thread, and ``stop()`` cancels
+    the run: queued URLs are not started and active downloads are
+    aborted, to be resumed by the next run. An engine runs once; it
+    closes its files when ``run`` returns.
+    """
+
+    def __init__(
+        self,
+        ydl_opts: Dict[str, Any],
+        output_dir: str = "downloads",
+        workers: int = DEFAULT_WORKERS,
+        archive: Optional[str] = None,
+        checkpoint: Optional[str] = None,
+        on_result: Optional[Callable[[BatchResult], None]] = None,
+    ):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.archive = DownloadArchive(archive)
+        self.checkpoint = Checkpoint(checkpoint) if checkpoint else None
+        self.on_result = on_result
+        self.ydl_opts = {
+            'outtmpl': os.path.join(output_dir, OUTPUT_TEMPLATE),
+            **ydl_opts,
+            'quiet': True,
+            'noprogress': True,
+            'download_archive': self.archive,
+        }
+        self._progress = BatchProgress()
+        self._lock = threading.Lock()
+        self._result_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._local = threading.local()
+        self._clients: List[_Client] = []
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping.is_set()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def progress(self) -> BatchProgress:
+        """A snapshot of the run's progress"""
+        with self._lock:
+            return replace(self._progress)
+
+    def _add_bytes(self, count: int) -> None:
+        with self._lock:
+            self._progress.bytes_downloaded += count
+
+    def _client(self) -> _Client:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = _Client(self)
+            with self._lock:
+                self._clients.append(client)
+        return client
+
+    def download(self, url: str) -> Optional[BatchResult]:
+        """Download one URL on the calling thread; None if cancelled"""
+        if self.checkpoint is not None and self.checkpoint.finished(url):
+            return BatchResult(url, SKIPPED)
+        key = url_archive_key(url)
+        if key is not None and key in self.archive:
+            return BatchResult(url, SKIPPED)
+
+        client = self._client()
+        client.files.clear()
+        client.errors.clear()
+        try:
+            info = client.ydl.extract_info(url, download=True)
+        except DownloadCancelled:
+            return None
+        except Exception as e:
+            return BatchResult(url, FAILED, error=str(e))
+        if self.stopping:
+            return None
+        if _downloaded(info):
+            return BatchResult(url, DONE, info=info)
+        if info is not None:
+            # yt-dlp found the extracted video in the archive
+            return BatchResult(url, SKIPPED)
+        return BatchResult(
+            url, FAILED, error=client.errors[-1] if client.errors else "Nothing was downloaded")
+
+    def _run_one(self, url: str) -> None:
+        if self.stopping:
+            return
+        with self._lock:
+            self._progress.active += 1
+        try:
+            result = self.download(url)
+        finally:
+            with self._lock:
+                self._progress.active -= 1
+        if result is None:
+            return
+
+        with self._lock:
+            if result.status == DONE:
+                self._progress.done += 1
+            elif result.status == SKIPPED:
+                self._progress.skipped += 1
+            else:
+                self._progress.failed += 1
+        if self.checkpoint is not None and not (
+                result.status == SKIPPED and self.checkpoint.finished(url)):
+            self.checkpoint.record(url, result.status, result.error)
+        if self.on_result is not None:
+            with self._result_lock:
+                try:
+                    self.on_result(result)
+                except Exception as e:
+                    logger.warning(f"Result callback failed for {url}: {e}")
+
+    def run(self, urls: Iterable[str]) -> BatchProgress:
+        """Download ``urls`` and return the final progress"""
+        urls = list(dict.fromkeys(urls))
+        os.makedirs(self.output_dir, exist_ok=True)
+        with self._lock:
+            self._progress = BatchProgress(total=len(urls), started=time.monotonic())
+        self._stopping.clear()
+
+        pool = ThreadPoolExecutor(self.workers, thread_name_prefix="batch-download")
+        try:
+            futures = [pool.submit(self._run_one, url) for url in urls]
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            # Ctrl-C or a bug: don't start anything else, abort the rest
+            self.stop()
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            self.close()
+        return self.progress()
+
+    def close(self) -> None:
+        """Close the workers' clients and flush the archive and checkpoint"""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.ydl.close()
+        self._local = threading.local()
+        self.archive.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+
+
+def _size(count: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024:
+            return f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} TB"
+
+
+def _duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+class ProgressView:
+    """
+    One aggregate status line for a running batch.
+
+    On a terminal the line is redrawn in place every ``interval``
+    seconds and failures are printed above it; otherwise (e.g. output
+    redirected to a log) a line is written every ``log_interval``.
+    """
+
+    def __init__(
+        self,
+        engine: BatchDownloader,
+        stream: TextIO = sys.stderr,
+        interval: float = 0.5,
+        log_interval: float = 30.0,
+    ):
+        self.engine = engine
+        self.stream = stream
+        self.tty = stream.isatty()
+        self.interval = interval if self.tty else log_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last = (time.monotonic(), 0)
+        self._lock = threading.Lock()
+
+    def render(self, progress: BatchProgress, rate: float) -> str:
+        percent = 100 * progress.finished / progress.total if progress.total else 100
+        eta = progress.eta
+        return (
+            f"[{progress.finished:,}/{progress.total:,}] {percent:5.1f}%"
+            f"  ok {progress.done:,}  skipped {progress.skipped:,}"
+            f"  failed {progress.failed:,}  active {progress.active}"
+            f"  {_size(rate)}/s  {_size(progress.bytes_downloaded)}"
+            f"  ETA {_duration(eta) if eta is not None else '-'}"
+        )
+
+    def _rate(self, progress: BatchProgress) -> float:
+        now = time.monotonic()
+        last_time, last_bytes = self._last
+        self._last = (now, progress.bytes_downloaded)
+        return (progress.bytes_downloaded - last_bytes) / max(now - last_time, 1e-6)
+
+    def draw(self) -> None:
+        progress = self.engine.progress()
+        line = self.render(progress, self._rate(progress))
+        with self._lock:
+            if self.tty:
+                self.stream.write("\r\x1b[K" + line)
+            else:
+                self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def report(self, result: BatchResult) -> None:
+        """Print a failed URL, above the status line on a terminal"""
+        if result.status != FAILED:
+            return
+        with self._lock:
+            prefix = "\r\x1b[K" if self.tty else ""
+            self.stream.write(f"{prefix}❌ {result.url} — {result.error}\n")
+            self.stream.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.draw()
+
+    def start(self) -> None:
+        self._last = (time.monotonic(), 0)
+        self._thread = threading.Thread(target=self._run, name="batch-progress", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.draw()
+        if self.tty:
+            self.stream.write("\n")
+            self.stream.flush()
+
+
+def batch_download(
+    file_path: str,
+    platform: str,
+    output_dir: Optional[str] = None,
+    workers: int = DEFAULT_WORKERS,
+    archive: Optional[str] = None,
+    checkpoint: Optional[str] = None,
+    on_result: Optional[Callable[[BatchResult], None]] = None,
+) -> Optional[BatchProgress]:
+    """
+    Download every URL in ``file_path`` with the ``platform`` preset,
+    showing progress on stderr.
+
+    The archive defaults to ``archive.txt`` in the output directory and
+    the checkpoint to ``<file_path>.progress.jsonl``.
+    """
+    if not os.path.exists(file_path):
+        print(f"❌ File not found: {file_path}")
+        return None
+    urls = read_urls(file_path)
+    if not urls:
+        print("⚠️ No URLs found.")
+        return None
+
+    output_dir = output_dir or DEFAULT_OUTPUT_DIRS[platform]
+    view: Optional[ProgressView] = None
+
+    def report(result: BatchResult) -> None:
+        view.report(result)
+        if on_result is not None:
+            on_result(result)
+
+    engine = BatchDownloader(
+        PRESETS[platform],
+        output_dir=output_dir,
+        workers=workers,
+        archive=archive or os.path.join(output_dir, "archive.txt"),
+        checkpoint=checkpoint or f"{file_path}.progress.jsonl",
+        on_result=report,
+    )
+    view = ProgressView(engine)
+    print(f"🔽 Downloading {len(urls):,} URLs with {workers} workers into {output_dir}")
+    view.start()
+    try:
+        progress = engine.run(urls)
+    except KeyboardInterrupt:
+        view.stop()
+        print("⏹️ Stopped; run again to resume where this run left off.")
+        return engine.progress()
+    view.stop()
+    print(f"✅ {progress.done:,} downloaded, {progress.skipped:,} skipped, "
+          f"{progress.failed:,} failed in {_duration(progress.elapsed)}")
+    return progress
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("file", help="text file with one URL per line")
+    parser.add_argument("--platform", choices=sorted(PRESETS), default="tiktok")
+    parser.add_argument("--output", help="output directory (default: per platform)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="concurrent downloads")
+    parser.add_argument("--archive",
+                        help="download archive (default: archive.txt in the output directory)")
+    parser.add_argument("--checkpoint",
+                        help="resume checkpoint (default: <file>.progress.jsonl)")
+    args = parser.parse_args(argv)
+
+    progress = batch_download(
+        args.file, args.platform, output_dir=args.output, workers=args.workers,
+        archive=args.archive, checkpoint=args.checkpoint)
+    return 0 if progress is not None and not progress.failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,8 @@
 import os
-import yt_dlp
 import uuid
 import asyncio
 import time
 from typing import Dict, Optional, List, Any
-from concurrent.futures import ThreadPoolExecutor
 from ..core.exceptions import (
     DownloadError,
     VideoNotFoundError,
@@ -20,15 +18,20 @@ from ..models.download import (
 )
 from ..core.metrics import DOWNLOAD_DURATION as download_duration_seconds, ACTIVE_DOWNLOADS as active_downloads
 from ..core.error_reporting import ErrorReporter
+from ..core.executors import InstrumentedExecutor
+from ..core.tracing import tracer
+from ..core.stage_timer import EXTRACT_INFO, FINALIZE, RESOLVE, StageTimer
 from .tiktok import TikTokService
+from .storage import content_store
 
 
 class DownloadManager:
     def __init__(self):
         self.active_downloads: Dict[str, Dict[str, Any]] = {}
-        self.download_folder = "downloads"
-        self.executor = ThreadPoolExecutor(
-            max_workers=5)  # Limit concurrent downloads
+        self.store = content_store
+        self.download_folder = self.store.root
+        self.executor = InstrumentedExecutor(
+            "download_manager", max_workers=5)  # Limit concurrent downloads
         self.file_expiry_seconds = 300  # 5 minutes
         self.cleanup_task = None
         self.tiktok_service = TikTokService()  # Add this line
@@ -44,15 +47,23 @@ class DownloadManager:
         """Background task to clean up expired files."""
         while True:
             try:
-                current_time = time.time()
-                # Check all active downloads
-                for session_id, download in list(self.active_downloads.items()):
-                    if (
-                        download.get("status") == DownloadStatus.COMPLETED
-                        and download.get("created_at")
-                        and current_time - download["created_at"] >= self.file_expiry_seconds
-                    ):
-                        await self._cleanup_download(session_id)
+                # Expiry lives in the storage index, where fetches can extend
+                # it; quota eviction runs here too in case publishes raced
+                loop = asyncio.get_event_loop()
+                removed = await loop.run_in_executor(
+                    self.executor, self.store.expire)
+                removed += await loop.run_in_executor(
+                    self.executor, self.store.enforce_budget)
+                for filename, session_id in removed:
+                    self.forget_file(session_id, filename)
+
+                # Drop blobs whose last link was released elsewhere
+                await loop.run_in_executor(
+                    self.executor, self.store.collect_garbage)
+
+                # Purge partial downloads left in staging past their resume window
+                await loop.run_in_executor(
+                    self.executor, self.store.staging.recover)
 
                 # Sleep for 30 seconds before next check
                 await asyncio.sleep(30)
@@ -60,22 +71,44 @@ class DownloadManager:
                 print(f"Error in cleanup loop: {str(e)}")
                 await asyncio.sleep(30)  # Sleep even if there's an error
 
-    async def _cleanup_download(self, session_id: str):
-        """Clean up a specific download."""
-        try:
-            download = self.active_downloads.get(session_id)
-            if download and download.get("filename"):
-                file_path = os.path.join(
-                    self.download_folder, download["filename"])
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                # Update status to indicate file is no longer available
-                download["status"] = DownloadStatus.EXPIRED
-                download["file_expired"] = True
-        except Exception as e:
-            print(f"Error cleaning up download {session_id}: {str(e)}")
-
-    def _get_ydl_opts(self, platform: Platform, quality: VideoQuality, filename: str) -> dict:
+    def forget_file(self, session_id: Optional[str], filename: str) -> None:
+        """Mark a session's file as gone after expiry or quota eviction."""
+        download = self.active_downloads.get(session_id)
+        if download is None:
+            return
+        files = download.get("files")
+        if files is not None and filename in files:
+            # A batch stays available while any of its files remain
+            files.remove(filename)
+            if files:
+                return
+        elif download.get("filename") != filename:
+            return
+        download["status"] = DownloadStatus.EXPIRED
+        download["file_expired"] = True
+
+    async def _index_call(self, func, *args):
+        """Run a call that reads or writes the SQLite index off the event loop"""
+        # The default executor: these are short and mustn't queue behind downloads
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def is_stored(self, filename: str) -> bool:
+        """Whether a file is still in the storage index."""
+        return await self._index_call(self.store.index.get_file, filename) is not None
+
+    async def record_access(self, session_id: str, *filenames: str) -> None:
+        """Extend the expiry of fetched files so popular downloads stay available."""
+        def touch() -> List[Optional[float]]:
+            return [self.store.touch(filename, self.file_expiry_seconds)
+                    for filename in filenames]
+
+        expiries = [e for e in await self._index_call(touch) if e is not None]
+        download = self.active_downloads.get(session_id)
+        if download is not None and expiries:
+            download["expires_at"] = max(
+                download.get("expires_at") or 0, *expiries)
+
+    def _get_ydl_opts(self, platform: Platform, quality: VideoQuality, output_path: str) -> dict:
         format_opts = {
             VideoQuality.HIGH: 'bestvideo+bestaudio/best',
             VideoQuality.MEDIUM: 'bestvideo[height<=720]+bestaudio/best[height<=720]',
@@ -84,7 +117,7 @@ class DownloadManager:
 
         base_opts = {
             'format': format_opts[quality],
-            'outtmpl': os.path.join(self.download_folder, filename),
+            'outtmpl': output_path,
             'quiet': True,
             'no_warnings': True,
             'extract_flat': False,
@@ -149,17 +182,17 @@ class DownloadManager:
         }
         return session_id
 
-    async def _extract_video_info(self, url: str, ydl_opts: dict) -> dict:
+    async def _extract_video_info(self, url: str, ydl_opts: dict, timer: StageTimer) -> dict:
         """Extract video information asynchronously"""
+        import yt_dlp
         try:
             # Modify options to extract thumbnails without downloading
             info_opts = ydl_opts.copy()
             info_opts['extract_flat'] = False
             info_opts['skip_download'] = True
 
-            loop = asyncio.get_event_loop()
-            return await loop.run_in_executor(
-                self.executor,
+            return await timer.run(
+                EXTRACT_INFO, self.executor,
                 lambda: yt_dlp.YoutubeDL(
                     info_opts).extract_info(url, download=False)
             )
@@ -170,8 +203,15 @@ class DownloadManager:
         except Exception as e:
             raise NetworkError(url, str(e))
 
-    async def _download_video_async(self, url: str, ydl_opts: dict, session_id: str) -> None:
+    async def _download_video_async(
+        self,
+        url: str,
+        ydl_opts: dict,
+        session_id: str,
+        timer: StageTimer
+    ) -> None:
         """Download video asynchronously with progress tracking"""
+        import yt_dlp
         try:
             def progress_hook(d):
                 if d['status'] == 'downloading':
@@ -184,10 +224,11 @@ class DownloadManager:
                     self.active_downloads[session_id]["progress"] = 100
 
             ydl_opts['progress_hooks'] = [progress_hook]
+            timer.hook(ydl_opts)
 
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                self.executor,
+            # Transfer and FFmpeg time come from the hooks
+            await timer.run(
+                None, self.executor,
                 lambda: yt_dlp.YoutubeDL(ydl_opts).download([url])
             )
 
@@ -205,9 +246,27 @@ class DownloadManager:
         start_time: float
     ) -> DownloadResponse:
         """Process a single download with improved error handling"""
+        # Child of the request span when run from BackgroundTasks
+        with tracer.span("download.job", session_id=session_id,
+                         platform=platform.value, quality=quality.value,
+                         url=url), \
+                active_downloads.labels(platform=platform.value).track_inprogress():
+            return await self._process_download(
+                session_id, url, platform, quality, start_time)
+
+    async def _process_download(
+        self,
+        session_id: str,
+        url: str,
+        platform: Platform,
+        quality: VideoQuality,
+        start_time: float
+    ) -> DownloadResponse:
         if session_id not in self.active_downloads:
             raise ValueError("Invalid session ID")
 
+        timer = StageTimer(platform.value)
+        staged = None
         try:
             self.active_downloads[session_id]["status"] = DownloadStatus.PROCESSING
 
@@ -216,14 +275,17 @@ class DownloadManager:
                 try:
                     # Get video info using TikTok service
                     tiktok_result = await self.tiktok_service.download_video(url, quality.value)
+                    filename = tiktok_result["filename"]
+                    expires_at = time.time() + self.file_expiry_seconds
+                    await self._index_call(
+                        self.store.claim, filename, session_id, expires_at)
 
                     # Update status with the result
                     self.active_downloads[session_id].update({
                         "status": DownloadStatus.COMPLETED,
-                        # Extract filename
-                        "filename": tiktok_result["download_url"].split("/")[-1],
+                        "filename": filename,
                         "created_at": time.time(),
-                        "expires_at": time.time() + self.file_expiry_seconds,
+                        "expires_at": expires_at,
                         "title": tiktok_result.get("description", "TikTok Video"),
                         "author": tiktok_result.get("author", "Unknown"),
                         "progress": 100
@@ -242,7 +304,7 @@ class DownloadManager:
                         status=DownloadStatus.COMPLETED,
                         progress=100,
                         url=url,
-                        filename=tiktok_result["download_url"].split("/")[-1],
+                        filename=filename,
                         expires_at=self.active_downloads[session_id]["expires_at"],
                         title=tiktok_result.get("description", "TikTok Video"),
                         author=tiktok_result.get("author", "Unknown"),
@@ -259,12 +321,16 @@ class DownloadManager:
                     raise
 
             # For other platforms, continue with the normal download process
-            filename = f"{platform.value}_{uuid.uuid4().hex[:8]}.mp4"
-            ydl_opts = self._get_ydl_opts(platform, quality, filename)
+            filename = self.store.allocate(
+                f"{platform.value}_{uuid.uuid4().hex[:8]}.mp4")
+            staged = self.store.staging.stage(
+                filename, key=f"{platform.value}|{url}|{quality.value}")
+            ydl_opts = self._get_ydl_opts(platform, quality, staged.path)
+            timer.lap(RESOLVE)
 
             # First, check if video exists and quality is available
             try:
-                info = await self._extract_video_info(url, ydl_opts)
+                info = await self._extract_video_info(url, ydl_opts, timer)
                 if not info:
                     error = VideoNotFoundError(url)
                     ErrorReporter.report_download_error(
@@ -330,7 +396,10 @@ class DownloadManager:
 
             # Download the video
             try:
-                await self._download_video_async(url, ydl_opts, session_id)
+                await self._download_video_async(url, ydl_opts, session_id, timer)
+                await self._publish(
+                    staged.path, filename, session_id, timer,
+                    time.time() + self.file_expiry_seconds)
             except Exception as e:
                 ErrorReporter.report_download_error(
                     error=e,
@@ -387,8 +456,22 @@ class DownloadManager:
                 )
             raise
         finally:
-            # Decrement active downloads counter
-            active_downloads.labels(platform=platform.value).dec()
+            if staged is not None:
+                staged.close()
+            timer.observe()
+
+    async def _publish(
+        self,
+        staged_path: str,
+        filename: str,
+        session_id: str,
+        timer: StageTimer,
+        expires_at: Optional[float] = None
+    ) -> None:
+        """Move a finished file out of staging into the content store off the event loop"""
+        await timer.run(
+            FINALIZE, self.executor, self.store.publish_staged,
+            staged_path, filename, session_id, expires_at)
 
     def _matches_quality(self, format_info: dict, quality: VideoQuality) -> bool:
         """Check if format matches requested quality"""
@@ -428,6 +511,20 @@ class DownloadManager:
         quality: VideoQuality
     ) -> BatchDownloadResponse:
         """Process multiple downloads with improved error handling"""
+        with tracer.span("download.batch", session_id=session_id,
+                         platform=platform.value, quality=quality.value,
+                         total_urls=len(urls)), \
+                active_downloads.labels(platform=platform.value).track_inprogress():
+            return await self._process_batch_download(
+                session_id, urls, platform, quality)
+
+    async def _process_batch_download(
+        self,
+        session_id: str,
+        urls: List[str],
+        platform: Platform,
+        quality: VideoQuality
+    ) -> BatchDownloadResponse:
         if session_id not in self.active_downloads:
             raise ValueError("Invalid session ID")
 
@@ -436,7 +533,9 @@ class DownloadManager:
             "total_urls": total_urls,
             "processed_urls": 0,
             "status": DownloadStatus.PROCESSING,
-            "errors": []
+            "errors": [],
+            # Filenames of completed entries, used by the ZIP bundle endpoint
+            "files": []
         })
 
         try:
@@ -457,19 +556,23 @@ class DownloadManager:
                                 "url": urls[i] if i < len(urls) else "unknown",
                                 "error": result.get("message", "Unknown error")
                             })
+                        elif result.get("filename"):
+                            self.active_downloads[session_id]["files"].append(
+                                result["filename"])
 
                     # Set final status based on errors
                     has_errors = bool(
                         self.active_downloads[session_id]["errors"])
                     final_status = DownloadStatus.COMPLETED if not has_errors else DownloadStatus.FAILED
-                    self.active_downloads[session_id]["status"] = final_status
+                    await self._finish_batch(session_id, final_status)
 
                     return BatchDownloadResponse(
                         session_id=session_id,
                         total_urls=total_urls,
                         processed_urls=self.active_downloads[session_id]["processed_urls"],
                         status=final_status,
-                        progress=100
+                        progress=100,
+                        expires_at=self.active_downloads[session_id]["expires_at"]
                     )
                 except Exception as e:
                     self.active_downloads[session_id]["status"] = DownloadStatus.FAILED
@@ -478,21 +581,36 @@ class DownloadManager:
 
             # For other platforms, continue with the normal batch download process
             for i, url in enumerate(urls, 1):
+                item = tracer.start_span("download.item", attributes={"url": url})
                 try:
-                    filename = f"{platform.value}_batch_{uuid.uuid4().hex[:8]}.mp4"
-                    ydl_opts = self._get_ydl_opts(platform, quality, filename)
-
-                    # Check video availability
-                    await self._extract_video_info(url, ydl_opts)
-
-                    # Download video
-                    await self._download_video_async(url, ydl_opts, session_id)
+                    timer = StageTimer(platform.value, item)
+                    filename = self.store.allocate(
+                        f"{platform.value}_batch_{uuid.uuid4().hex[:8]}.mp4")
+                    with self.store.staging.stage(
+                            filename, key=f"{platform.value}|{url}|{quality.value}") as staged:
+                        ydl_opts = self._get_ydl_opts(
+                            platform, quality, staged.path)
+                        timer.lap(RESOLVE)
+
+                        # Check video availability
+                        await self._extract_video_info(url, ydl_opts, timer)
+
+                        # Download video
+                        await self._download_video_async(
+                            url, ydl_opts, session_id, timer)
+                        await self._publish(
+                            staged.path, filename, session_id, timer)
+                    self.active_downloads[session_id]["files"].append(filename)
 
                 except Exception as e:
+                    item.record_exception(e)
                     self.active_downloads[session_id]["errors"].append({
                         "url": url,
                         "error": str(e)
                     })
+                finally:
+                    timer.observe()
+                    item.end()
 
                 self.active_downloads[session_id]["processed_urls"] = i
                 self.active_downloads[session_id]["progress"] = int(
@@ -501,17 +619,41 @@ class DownloadManager:
             # Set final status based on errors
             has_errors = bool(self.active_downloads[session_id]["errors"])
             final_status = DownloadStatus.COMPLETED if not has_errors else DownloadStatus.FAILED
-            self.active_downloads[session_id]["status"] = final_status
+            await self._finish_batch(session_id, final_status)
 
             return BatchDownloadResponse(
                 session_id=session_id,
                 total_urls=total_urls,
                 processed_urls=self.active_downloads[session_id]["processed_urls"],
                 status=final_status,
-                progress=100
+                progress=100,
+                expires_at=self.active_downloads[session_id]["expires_at"]
             )
 
         except Exception as e:
             self.active_downloads[session_id]["status"] = DownloadStatus.FAILED
             self.active_downloads[session_id]["error"] = str(e)
             raise
+
+    async def _finish_batch(self, session_id: str, final_status: DownloadStatus) -> None:
+        """Mark a batch as finished and start the expiry clock for its files."""
+        expires_at = time.time() + self.file_expiry_seconds
+        files = list(self.active_downloads[session_id]["files"])
+
+        def claim() -> None:
+            for filename in files:
+                self.store.claim(filename, session_id, expires_at)
+
+        await self._index_call(claim)
+        self.active_downloads[session_id].update({
+            "status": final_status,
+            "created_at": time.time(),
+            "expires_at": expires_at
+        })
+
+    def get_batch_files(self, session_id: str) -> Optional[List[str]]:
+        """Return the completed filenames of a batch, or None if not a batch."""
+        download = self.active_downloads.get(session_id)
+        if download is None or "files" not in download:
+            return None
+        return list(download["files"])
@@ -1,13 +1,13 @@
-import yt_dlp
 import os
 import uuid
-import asyncio
 import logging
 import re
 import time
 from typing import List, Dict, Any
 from pydantic import HttpUrl
 from ..core.config import settings
+from .storage import content_store
+from ..core.stage_timer import EXTRACT_INFO, FINALIZE, RESOLVE, StageTimer
 from ..core.exceptions import DownloadFailedException, InvalidURLException
 from ..models.facebook import (
     FacebookDownloadRequest,
@@ -84,9 +84,14 @@ class FacebookService:
 
     async def download_video(self, url: HttpUrl, quality: str = "high") -> dict:
         """Download a Facebook video"""
+        import yt_dlp
+        timer = StageTimer("facebook")
         session_id = str(uuid.uuid4())
-        filename = f"facebook_{uuid.uuid4().hex[:8]}.mp4"
+        filename = content_store.allocate(
+            f"facebook_{uuid.uuid4().hex[:8]}.mp4")
         file_path = os.path.join(self.download_path, filename)
+        staged = content_store.staging.stage(
+            filename, key=f"facebook|{url}|{quality}")
 
         try:
             # Quality mapping - handle 'best' as 'high'
@@ -98,7 +103,7 @@ class FacebookService:
 
             ydl_opts = {
                 'format': format_string,
-                'outtmpl': file_path,
+                'outtmpl': staged.path,
                 'quiet': True,
                 'no_warnings': True,
                 'extract_flat': False,
@@ -138,13 +143,14 @@ class FacebookService:
                 'cookiefile': None,  # Can be configured if needed
             }
 
-            # Use asyncio to run yt-dlp in a separate thread (non-blocking)
-            loop = asyncio.get_event_loop()
+            # Run yt-dlp off the event loop, timing each stage
+            timer.hook(ydl_opts)
+            timer.lap(RESOLVE)
 
             # Extract info first to get metadata
             logger.info(f"Extracting Facebook video info for URL: {url}")
-            info_dict = await loop.run_in_executor(
-                None,
+            info_dict = await timer.run(
+                EXTRACT_INFO, None,
                 lambda: yt_dlp.YoutubeDL(ydl_opts).extract_info(
                     str(url), download=False)
             )
@@ -160,21 +166,26 @@ class FacebookService:
             # Now download with the configuration
             logger.info(
                 f"Downloading Facebook {'Reel' if content_type == FacebookContentType.REEL else 'video'} from URL: {url}")
-            await loop.run_in_executor(
-                None,
+            await timer.run(
+                None, None,
                 lambda: yt_dlp.YoutubeDL(ydl_opts).download([str(url)])
             )
 
             # Check if file was downloaded successfully
-            if not os.path.exists(file_path):
+            if not os.path.exists(staged.path):
                 raise DownloadFailedException(
                     "Download completed but file not found")
 
-            # Update file timestamp to current time for better organization on mobile devices
+            # Update file timestamp to current time for better organization on mobile devices;
+            # before publishing, as a deduplicated file shares its blob's inode
             current_time = time.time()
-            os.utime(file_path, (current_time, current_time))
+            os.utime(staged.path, (current_time, current_time))
             logger.info(f"Updated file timestamp to current time for: {file_path}")
 
+            # Move into the public folder in one rename, then deduplicate
+            await timer.run(
+                FINALIZE, None, content_store.publish_staged, staged.path, filename)
+
             logger.info(
                 f"Successfully downloaded Facebook video to: {file_path}")
 
@@ -185,7 +196,7 @@ class FacebookService:
                 "session_id": session_id,
                 "status": "completed",
                 "message": f"Facebook {'Reel' if content_type == FacebookContentType.REEL else 'video'} downloaded successfully",
-                "download_url": f"/downloads/{filename}",
+                "download_url": content_store.url_for(filename),
                 "title": info_dict.get('title', ''),
                 "author": info_dict.get('uploader', 'unknown'),
                 "duration": info_dict.get('duration', 0),
@@ -197,6 +208,9 @@ class FacebookService:
         except Exception as e:
             logger.error(f"Facebook download failed for URL {url}: {str(e)}")
             raise DownloadFailedException(str(e))
+        finally:
+            staged.close()
+            timer.observe()
 
     async def batch_download(self, urls: List[HttpUrl], quality: str = "high") -> List[dict]:
         """Download multiple Facebook videos"""
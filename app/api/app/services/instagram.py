@@ -1,11 +1,11 @@
-import yt_dlp
 import os
 import uuid
-import asyncio
 import logging
 from typing import List
 from pydantic import HttpUrl
 from ..core.config import settings
+from .storage import content_store
+from ..core.stage_timer import EXTRACT_INFO, FINALIZE, RESOLVE, StageTimer
 from ..core.exceptions import DownloadFailedException, InvalidURLException
 
 logger = logging.getLogger(__name__)
@@ -26,14 +26,17 @@ class InstagramService:
 
     async def download_content(self, url: HttpUrl, quality: str = "best") -> dict:
         """Download Instagram content (post, reel, or story)"""
+        import yt_dlp
+        timer = StageTimer("instagram")
         session_id = str(uuid.uuid4())
-        filename = f"instagram_{uuid.uuid4().hex[:8]}"
-        file_path = os.path.join(self.download_path, filename)
+        filename = content_store.allocate(f"instagram_{uuid.uuid4().hex[:8]}")
+        staged = content_store.staging.stage_dir(
+            key=f"instagram|{url}|{quality}")
 
         try:
             ydl_opts = {
                 'format': quality,
-                'outtmpl': file_path + '.%(ext)s',
+                'outtmpl': os.path.join(staged.path, 'item.%(ext)s'),
                 'quiet': True,
                 'no_warnings': True,
                 'noplaylist': False,  # Allow playlists for carousel posts
@@ -43,12 +46,13 @@ class InstagramService:
                 'socket_timeout': settings.INSTAGRAM_TIMEOUT
             }
 
-            # Use asyncio to run yt-dlp in a separate thread (non-blocking)
-            loop = asyncio.get_event_loop()
+            # Run yt-dlp off the event loop, timing each stage
+            timer.hook(ydl_opts)
+            timer.lap(RESOLVE)
 
             # Extract info first to get metadata
-            info_dict = await loop.run_in_executor(
-                None,
+            info_dict = await timer.run(
+                EXTRACT_INFO, None,
                 lambda: yt_dlp.YoutubeDL(ydl_opts).extract_info(
                     str(url), download=False)
             )
@@ -62,19 +66,26 @@ class InstagramService:
                 # This is a carousel post
                 files = []
                 for idx, entry in enumerate(info_dict['entries']):
-                    entry_file_path = file_path + f"_{idx}.%(ext)s"
                     entry_ydl_opts = ydl_opts.copy()
-                    entry_ydl_opts['outtmpl'] = entry_file_path
+                    entry_ydl_opts['outtmpl'] = os.path.join(
+                        staged.path, f"item_{idx}.%(ext)s")
 
-                    await loop.run_in_executor(
-                        None,
+                    await timer.run(
+                        None, None,
                         lambda e=entry['url'], opts=entry_ydl_opts: yt_dlp.YoutubeDL(opts).download([
                             e])
                     )
 
                     # Get the downloaded file name
-                    entry_filename = f"{filename}_{idx}.{entry.get('ext', 'mp4')}"
-                    files.append(f"/downloads/{entry_filename}")
+                    ext = entry.get('ext', 'mp4')
+                    entry_filename = f"{filename}_{idx}.{ext}"
+                    await timer.run(
+                        FINALIZE, None, content_store.publish_staged,
+                        os.path.join(staged.path, f"item_{idx}.{ext}"),
+                        entry_filename)
+                    files.append(content_store.url_for(entry_filename))
+
+                staged.discard()
 
                 return {
                     "session_id": session_id,
@@ -86,19 +97,24 @@ class InstagramService:
                 }
             else:
                 # Single post/reel/story
-                await loop.run_in_executor(
-                    None,
+                await timer.run(
+                    None, None,
                     lambda: yt_dlp.YoutubeDL(ydl_opts).download([str(url)])
                 )
 
                 # Get the real filename with extension
-                real_filename = f"{filename}.{info_dict.get('ext', 'mp4')}"
+                ext = info_dict.get('ext', 'mp4')
+                real_filename = f"{filename}.{ext}"
+                await timer.run(
+                    FINALIZE, None, content_store.publish_staged,
+                    os.path.join(staged.path, f"item.{ext}"), real_filename)
+                staged.discard()
 
                 return {
                     "session_id": session_id,
                     "status": "completed",
                     "message": "Download completed successfully",
-                    "download_url": f"/downloads/{real_filename}",
+                    "download_url": content_store.url_for(real_filename),
                     "description": info_dict.get('title', ''),
                     "author": info_dict.get('uploader', 'unknown')
                 }
@@ -106,6 +122,9 @@ class InstagramService:
         except Exception as e:
             logger.error(f"Instagram download failed for URL {url}: {str(e)}")
             raise DownloadFailedException(str(e))
+        finally:
+            staged.close()
+            timer.observe()
 
     async def batch_download(self, urls: List[HttpUrl], quality: str = "best") -> List[dict]:
         """Download multiple Instagram posts"""
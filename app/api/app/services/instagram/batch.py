@@ -1,5 +1,4 @@
 import os
-import yt_dlp
 from typing import List, Dict, Any
 from .downloader import InstagramDownloader
 from ...models.instagram import InstagramDownloadRequest, InstagramQuality
@@ -17,6 +16,7 @@ def read_urls_from_file(file_path):
 
 
 def download_instagram_video(url, output_dir="downloads/instagram"):
+    import yt_dlp
     os.makedirs(output_dir, exist_ok=True)
 
     ydl_opts = {
@@ -38,14 +38,10 @@ def download_instagram_video(url, output_dir="downloads/instagram"):
         print(f"❌ Failed to download {url} — Error: {e}")
 
 
-def batch_download(file_path="instagram_urls.txt"):
-    urls = read_urls_from_file(file_path)
-    if not urls:
-        print("⚠️ No URLs found.")
-        return
-
-    for url in urls:
-        download_instagram_video(url)
+def batch_download(file_path="instagram_urls.txt", workers=8):
+    """Download every URL in the file concurrently; reruns resume"""
+    from ..batch_engine import batch_download as run_batch
+    return run_batch(file_path, "instagram", workers=workers)
 
 
 class BatchInstagramDownloader:
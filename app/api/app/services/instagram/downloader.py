@@ -1,8 +1,8 @@
 import os
-import yt_dlp
 import uuid
 from typing import Optional, Dict, Any
 from ...core.config import settings
+from ..storage import content_store
 from ...models.instagram import InstagramDownloadRequest, InstagramDownloadResponse, InstagramMediaType
 from ...core.exceptions import DownloadError, InvalidURLError
 from .utils import load_cookies, validate_instagram_url, get_media_type, clean_filename
@@ -16,12 +16,15 @@ class InstagramDownloader:
 
     async def download(self, request: InstagramDownloadRequest) -> InstagramDownloadResponse:
         """Download Instagram content."""
+        import yt_dlp
         if not validate_instagram_url(str(request.url)):
             raise InvalidURLError("Invalid Instagram URL")
 
         session_id = str(uuid.uuid4())
-        output_path = os.path.join(
-            self.download_folder, f"{session_id}/%(title)s.%(ext)s")
+        session_folder = content_store.allocate(session_id)
+        staged = content_store.staging.stage_dir(
+            key=f"instagram|{request.url}|{request.quality}")
+        output_path = os.path.join(staged.path, "%(title)s.%(ext)s")
 
         ydl_opts = {
             'format': self._get_format_for_quality(request.quality),
@@ -44,7 +47,12 @@ class InstagramDownloader:
 
                 # Get downloaded file info
                 filename = ydl.prepare_filename(info)
-                download_url = f"/downloads/{session_id}/{os.path.basename(filename)}"
+                relative_path = f"{session_folder}/{os.path.basename(filename)}"
+                if os.path.exists(filename):
+                    content_store.publish_staged(
+                        filename, relative_path, session_id=session_id)
+                staged.discard()
+                download_url = content_store.url_for(relative_path)
 
                 return InstagramDownloadResponse(
                     url=str(request.url),
@@ -57,6 +65,8 @@ class InstagramDownloader:
         except Exception as e:
             raise DownloadError(
                 f"Failed to download Instagram content: {str(e)}")
+        finally:
+            staged.close()
 
     def _get_format_for_quality(self, quality: str) -> str:
         """Get yt-dlp format string based on quality."""
@@ -0,0 +1,209 @@
+"""
+Buffered, date-partitioned export of download metadata.
+
+Rows are written to ``<path>/date=YYYY-MM-DD/`` by the date of their
+timestamp, the Hive layout that pandas, pyarrow, DuckDB and Spark read
+as one dataset, so a day's rows can be loaded (or skipped) without
+reading the rest.
+"""
+import csv
+import datetime
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:  # pragma: no cover - optional, Parquet output only
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def _append(path: str, data: bytes, create: bool = False) -> None:
+    """
+    Append ``data`` to ``path`` with one ``O_APPEND`` write, so rows of
+    concurrent appenders don't interleave. With ``create`` the file must
+    not exist yet (FileExistsError otherwise).
+    """
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+    if create:
+        flags |= os.O_EXCL
+    fd = os.open(path, flags, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _csv(fields: List[str], rows: List[Dict[str, Any]], header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+class MetadataSink:
+    """
+    Metadata rows buffered in memory and written out by a single thread.
+
+    ``write`` only appends to the buffer, so download threads never open
+    a file. The writer thread flushes every ``flush_interval`` seconds,
+    or as soon as ``max_rows`` are waiting. Rows that fail to flush stay
+    buffered for the next attempt.
+
+    CSV and JSONL partitions are one file each that every flush appends
+    to; a CSV header is written when the file is created, and rows of an
+    existing file follow its header. Parquet files can't be appended
+    to, so each flush adds a part file, written under a temporary name
+    and renamed into place. ``fields`` fixes the columns (default: the
+    keys of the first row).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        format: str = "csv",
+        fields: Optional[Sequence[str]] = None,
+        date_field: str = "timestamp",
+        flush_interval: float = 5.0,
+        max_rows: int = 1000,
+    ):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown metadata format {format!r}, expected one of {FORMATS}")
+        if format == "parquet" and pyarrow is None:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+        self.path = path
+        self.name = os.path.basename(os.path.normpath(path))
+        self.format = format
+        self.fields = list(fields) if fields else None
+        self.date_field = date_field
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self._rows: List[Dict[str, Any]] = []
+        self._headers: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self, row: Dict[str, Any]) -> None:
+        """Buffer ``row``; it is written by the next flush"""
+        with self._lock:
+            if self.fields is None:
+                self.fields = list(row)
+            self._rows.append(row)
+            full = len(self._rows) >= self.max_rows
+        if full:
+            self._wake.set()
+
+    def _partition(self, row: Dict[str, Any]) -> str:
+        value = str(row.get(self.date_field) or "")
+        date = value[:10] if DATE.match(value) else datetime.date.today().isoformat()
+        return os.path.join(self.path, f"date={date}")
+
+    def flush(self) -> None:
+        """Write every buffered row"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return
+            partitions: Dict[str, List[Dict[str, Any]]] = {}
+            for row in rows:
+                partitions.setdefault(self._partition(row), []).append(row)
+            failed: List[Dict[str, Any]] = []
+            for directory, batch in partitions.items():
+                try:
+                    os.makedirs(directory, exist_ok=True)
+                    getattr(self, f"_write_{self.format}")(directory, batch)
+                except Exception as e:
+                    logger.warning(f"Could not write {len(batch)} metadata rows to {directory}: {e}")
+                    failed.extend(batch)
+            if failed:
+                with self._lock:
+                    self._rows[:0] = failed
+
+    def _csv_header(self, path: str) -> List[str]:
+        header = self._headers.get(path)
+        if header is None:
+            try:
+                with open(path, 'r', newline='', encoding='utf-8') as f:
+                    header = next(csv.reader(f), None)
+            except FileNotFoundError:
+                header = None
+            if header:
+                self._headers[path] = header
+        return header
+
+    def _write_csv(self, directory: str, rows: List[Dict[str, Any]]) -> None:
+        path = os.path.join(directory, f"{self.name}.csv")
+        header = self._csv_header(path)
+        if header is None:
+            try:
+                _append(path, _csv(self.fields, rows, header=True), create=True)
+                self._headers[path] = self.fields
+                return
+            except FileExistsError:
+                # Another writer created it first
+                header = self._csv_header(path) or self.fields
+        _append(path, _csv(header, rows, header=False))
+
+    def _write_jsonl(self, directory: str, rows: List[Dict[str, Any]]) -> None:
+        path = os.path.join(directory, f"{self.name}.jsonl")
+        data = "".join(
+            json.dumps({field: row.get(field) for field in self.fields},
+                       ensure_ascii=False, default=str) + "\n"
+            for row in rows)
+        _append(path, data.encode('utf-8'))
+
+    def _write_parquet(self, directory: str, rows: List[Dict[str, Any]]) -> None:
+        table = pyarrow.Table.from_pylist(
+            [{field: row.get(field) for field in self.fields} for row in rows])
+        path = os.path.join(directory, f"{self.name}-{time.time_ns()}-{os.getpid()}.parquet")
+        parquet.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self) -> "MetadataSink":
+        """Start the writer thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metadata-sink", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop the writer thread and write what is left"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def __enter__(self) -> "MetadataSink":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,129 @@
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+from ..core.config import settings
+from .audio_extractor import AudioExtractorService
+from .download_manager import DownloadManager
+from .facebook import FacebookService
+from .instagram import InstagramDownloader
+from .sora import SoraService
+from .tiktok import TikTokService
+from .youtube import YouTubeService
+
+T = TypeVar("T")
+
+
+class ServiceRegistry:
+    """
+    Process-wide service instances and the shared outbound HTTP client.
+
+    Each service is constructed once per worker on first use. The HTTP
+    client is opened by the application lifespan and closed on shutdown;
+    it is created on demand when used outside the app (scripts, tests).
+    """
+
+    def __init__(self):
+        self._services: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.AsyncClient] = None
+
+    def get(self, factory: Callable[[], T], key: Optional[Any] = None) -> T:
+        """Get the shared instance built by ``factory``, creating it once."""
+        key = key or factory
+        service = self._services.get(key)
+        if service is None:
+            with self._lock:
+                service = self._services.get(key)
+                if service is None:
+                    service = factory()
+                    self._services[key] = service
+        return service
+
+    def peek(self, key: Any) -> Optional[Any]:
+        """The instance registered under ``key``, without creating one."""
+        return self._services.get(key)
+
+    def override(self, key: Any, service: Any) -> None:
+        """Replace a registered service, e.g. with a fake in tests."""
+        with self._lock:
+            self._services[key] = service
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """The shared keep-alive client for outbound API calls."""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                timeout=settings.HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self._http_client
+
+    async def startup(self) -> None:
+        """Open pooled resources when the worker starts."""
+        self.http_client
+
+    async def shutdown(self) -> None:
+        """Close pooled resources and executors when the worker stops."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+        with self._lock:
+            services = list(self._services.values())
+            self._services.clear()
+        for service in services:
+            executor = getattr(service, "executor", None)
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+
+registry = ServiceRegistry()
+
+
+@asynccontextmanager
+async def shared_http_client() -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Borrow the shared HTTP client.
+
+    Drop-in replacement for ``async with httpx.AsyncClient() as client``
+    that reuses pooled connections and leaves the client open on exit.
+    """
+    yield registry.http_client
+
+
+# FastAPI dependencies. These are coroutines so FastAPI resolves them on the
+# event loop instead of dispatching each lookup to the threadpool.
+
+async def get_download_manager() -> DownloadManager:
+    return registry.get(DownloadManager)
+
+
+async def get_tiktok_service() -> TikTokService:
+    return registry.get(TikTokService)
+
+
+async def get_youtube_service() -> YouTubeService:
+    return registry.get(YouTubeService)
+
+
+async def get_facebook_service() -> FacebookService:
+    return registry.get(FacebookService)
+
+
+async def get_audio_extractor() -> AudioExtractorService:
+    return registry.get(AudioExtractorService)
+
+
+async def get_sora_service() -> SoraService:
+    return registry.get(SoraService)
+
+
+async def get_instagram_downloader() -> InstagramDownloader:
+    return registry.get(InstagramDownloader)
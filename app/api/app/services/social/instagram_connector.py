@@ -1,4 +1,4 @@
-import httpx
+from app.services.registry import shared_http_client
 import asyncio
 import logging
 from typing import List, Dict, Any, Optional
@@ -26,7 +26,7 @@ class InstagramConnector:
 
     async def exchange_code_for_token(self, code: str) -> InstagramOAuthResponse:
         """Exchange authorization code for access token"""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             data = {
                 "client_id": self.client_id,
                 "client_secret": self.client_secret,
@@ -55,7 +55,7 @@ class InstagramConnector:
 
     async def get_user_info(self, access_token: str) -> Dict[str, Any]:
         """Get Instagram user information"""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             response = await client.get(
                 f"{self.base_url}/{self.api_version}/me",
                 params={
@@ -69,7 +69,7 @@ class InstagramConnector:
     async def get_user_media(self, access_token: str, user_id: str, 
                            limit: int = 50) -> List[Dict[str, Any]]:
         """Get user's media (posts, reels, etc.)"""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             response = await client.get(
                 f"{self.base_url}/{self.api_version}/{user_id}/media",
                 params={
@@ -84,7 +84,7 @@ class InstagramConnector:
     async def get_saved_posts(self, access_token: str, user_id: str,
                             limit: int = 50) -> List[Dict[str, Any]]:
         """Get user's saved posts"""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             response = await client.get(
                 f"{self.base_url}/{self.api_version}/{user_id}/saved",
                 params={
@@ -99,7 +99,7 @@ class InstagramConnector:
     async def get_liked_posts(self, access_token: str, user_id: str,
                             limit: int = 50) -> List[Dict[str, Any]]:
         """Get user's liked posts"""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             response = await client.get(
                 f"{self.base_url}/{self.api_version}/{user_id}/likes",
                 params={
@@ -267,7 +267,7 @@ class InstagramConnector:
 
     async def refresh_access_token(self, refresh_token: str) -> Dict[str, Any]:
         """Refresh Instagram access token"""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             response = await client.get(
                 f"{self.base_url}/refresh_access_token",
                 params={
@@ -1,4 +1,4 @@
-import httpx
+from app.services.registry import shared_http_client
 import asyncio
 import logging
 from typing import Dict, Any, Optional
@@ -96,7 +96,7 @@ class InstagramPublisher:
         media_id = await self._upload_video_file(access_token, video_path)
         
         # Then create the container
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             data = {
                 "media_type": "VIDEO",
                 "video_id": media_id,
@@ -116,7 +116,7 @@ class InstagramPublisher:
     
     async def _upload_video_file(self, access_token: str, video_path: str) -> str:
         """Upload video file and return media ID."""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             with open(video_path, 'rb') as video_file:
                 response = await client.post(
                     f"{self.graph_api_base_url}/v18.0/me/media",
@@ -132,7 +132,7 @@ class InstagramPublisher:
     
     async def _publish_media(self, access_token: str, container_id: str) -> Dict[str, Any]:
         """Publish the media container."""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             response = await client.post(
                 f"{self.graph_api_base_url}/{account.account_id}/media_publish",
                 data={
@@ -145,7 +145,7 @@ class InstagramPublisher:
     
     async def get_media_status(self, access_token: str, media_id: str) -> Dict[str, Any]:
         """Get the status of a published media."""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             response = await client.get(
                 f"{self.graph_api_base_url}/{media_id}",
                 params={
@@ -158,7 +158,7 @@ class InstagramPublisher:
     
     async def delete_media(self, access_token: str, media_id: str) -> Dict[str, Any]:
         """Delete a published media."""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             response = await client.delete(
                 f"{self.graph_api_base_url}/{media_id}",
                 params={"access_token": access_token}
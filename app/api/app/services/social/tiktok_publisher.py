@@ -1,4 +1,4 @@
-import httpx
+from app.services.registry import shared_http_client
 import asyncio
 import logging
 from typing import Dict, Any, Optional
@@ -92,7 +92,7 @@ class TikTokPublisher:
     
     async def _initialize_upload(self, access_token: str) -> Dict[str, Any]:
         """Initialize video upload with TikTok API."""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             response = await client.post(
                 f"{self.api_base_url}/share/video/upload/",
                 headers={
@@ -115,7 +115,7 @@ class TikTokPublisher:
         """Upload video file to TikTok's servers."""
         try:
             with open(video_path, 'rb') as video_file:
-                async with httpx.AsyncClient() as client:
+                async with shared_http_client() as client:
                     response = await client.put(
                         upload_url,
                         content=video_file.read(),
@@ -134,7 +134,7 @@ class TikTokPublisher:
         privacy_level: str
     ) -> Dict[str, Any]:
         """Publish the uploaded video."""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             response = await client.post(
                 f"{self.api_base_url}/share/video/publish/",
                 headers={
@@ -158,7 +158,7 @@ class TikTokPublisher:
     
     async def get_video_status(self, access_token: str, video_id: str) -> Dict[str, Any]:
         """Get the status of a published video."""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             response = await client.get(
                 f"{self.api_base_url}/share/video/query/",
                 headers={"Authorization": f"Bearer {access_token}"},
@@ -169,7 +169,7 @@ class TikTokPublisher:
     
     async def delete_video(self, access_token: str, video_id: str) -> Dict[str, Any]:
         """Delete a published video."""
-        async with httpx.AsyncClient() as client:
+        async with shared_http_client() as client:
             response = await client.post(
                 f"{self.api_base_url}/share/video/delete/",
                 headers={
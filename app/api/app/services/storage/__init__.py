@@ -0,0 +1,21 @@
+from .backends import LocalBackend, S3Backend, StorageBackend, StorageError
+from .content_store import ContentStore, hash_file, shard
+from .index import MediaIndex
+from .staging import StagedFile, StagingArea
+
+# Shared store for everything written under settings.DOWNLOAD_FOLDER
+content_store = ContentStore()
+
+__all__ = [
+    'ContentStore',
+    'LocalBackend',
+    'MediaIndex',
+    'S3Backend',
+    'StagedFile',
+    'StagingArea',
+    'StorageBackend',
+    'StorageError',
+    'content_store',
+    'hash_file',
+    'shard'
+]
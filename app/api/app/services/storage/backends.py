@@ -0,0 +1,385 @@
+import datetime
+import hashlib
+import hmac
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote, urlsplit
+from xml.sax.saxutils import escape
+
+import httpx
+
+from ...core.config import settings
+from ...core.executors import InstrumentedExecutor
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+# S3 rejects multipart parts below 5 MiB, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class StorageError(Exception):
+    """Raised when the object store rejects or fails a request"""
+
+
+def _quote(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _sign(
+    method: str,
+    url: str,
+    headers: Dict[str, str],
+    params: List[Tuple[str, str]],
+    payload_hash: str,
+    secret_key: str,
+    scope: str,
+    amz_date: str,
+) -> str:
+    """AWS Signature Version 4 over the canonical form of a request"""
+    names = sorted(name.lower() for name in headers)
+    lowered = {name.lower(): value for name, value in headers.items()}
+    canonical_request = "\n".join([
+        method,
+        urlsplit(url).path or "/",
+        "&".join(f"{_quote(k)}={_quote(v)}" for k, v in sorted(params)),
+        "".join(f"{name}:{lowered[name].strip()}\n" for name in names),
+        ";".join(names),
+        payload_hash,
+    ])
+    string_to_sign = "\n".join([
+        ALGORITHM,
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+    ])
+    date, region, service, _ = scope.split("/")
+    key = _hmac(("AWS4" + secret_key).encode("utf-8"), date)
+    for part in (region, service, "aws4_request"):
+        key = _hmac(key, part)
+    return hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _scope(now: datetime.datetime, region: str) -> Tuple[str, str]:
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    return amz_date, f"{amz_date[:8]}/{region}/s3/aws4_request"
+
+
+def sign_headers(
+    method: str,
+    url: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    payload_hash: str = UNSIGNED_PAYLOAD,
+    now: Optional[datetime.datetime] = None,
+) -> Dict[str, str]:
+    """Headers that authenticate ``method url`` with SigV4"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date, scope = _scope(now, region)
+    parts = urlsplit(url)
+    headers = {
+        "host": parts.netloc,
+        "x-amz-content-sha256": payload_hash,
+        "x-amz-date": amz_date,
+    }
+    signature = _sign(
+        method, url, headers, parse_qsl(parts.query, keep_blank_values=True),
+        payload_hash, secret_key, scope, amz_date)
+    headers["authorization"] = (
+        f"{ALGORITHM} Credential={access_key}/{scope}, "
+        f"SignedHeaders={';'.join(sorted(headers))}, Signature={signature}")
+    del headers["host"]
+    return headers
+
+
+def presign_url(
+    url: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    expires: int,
+    method: str = "GET",
+    now: Optional[datetime.datetime] = None,
+) -> str:
+    """Query-string-signed URL that grants ``method`` on ``url`` for ``expires`` seconds"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date, scope = _scope(now, region)
+    parts = urlsplit(url)
+    params = parse_qsl(parts.query, keep_blank_values=True) + [
+        ("X-Amz-Algorithm", ALGORITHM),
+        ("X-Amz-Credential", f"{access_key}/{scope}"),
+        ("X-Amz-Date", amz_date),
+        ("X-Amz-Expires", str(expires)),
+        ("X-Amz-SignedHeaders", "host"),
+    ]
+    signature = _sign(
+        method, url, {"host": parts.netloc}, params,
+        UNSIGNED_PAYLOAD, secret_key, scope, amz_date)
+    query = "&".join(f"{_quote(k)}={_quote(v)}" for k, v in params)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}?{query}&X-Amz-Signature={signature}"
+
+
+class StorageBackend:
+    """
+    Where finished media is served from.
+
+    The content store always writes the local copy; a backend decides
+    whether it is also shipped elsewhere and which URL clients get.
+    """
+
+    name = "local"
+    remote = False
+
+    def open_upload(self, key: str) -> Optional["MultipartUpload"]:
+        """Writer that streams an object as it is produced, or None if nothing is uploaded"""
+        return None
+
+    def url(self, key: str, filename: Optional[str] = None) -> Optional[str]:
+        """Client-facing URL for ``key``, or None to serve the local file"""
+        return None
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class LocalBackend(StorageBackend):
+    """Files are served from the local download folder (the default)"""
+
+
+class MultipartUpload:
+    """
+    Stream one object to S3 while it is being written.
+
+    Bytes passed to ``write`` are cut into ``part_size`` parts that upload
+    on the backend's thread pool as soon as they fill, with at most
+    ``concurrency`` parts in flight so memory stays bounded. An object
+    smaller than one part is sent with a single PUT on ``close``. Used as a
+    context manager, an exception aborts the upload.
+    """
+
+    def __init__(self, backend: "S3Backend", key: str):
+        self.backend = backend
+        self.key = key
+        self.size = 0
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts: List[Future] = []
+        self._slots = threading.BoundedSemaphore(backend.concurrency)
+
+    def write(self, data: bytes) -> None:
+        self._buffer += data
+        self.size += len(data)
+        part_size = self.backend.part_size
+        while len(self._buffer) >= part_size:
+            part = bytes(self._buffer[:part_size])
+            del self._buffer[:part_size]
+            self._submit(part)
+
+    def _submit(self, data: bytes) -> None:
+        # Fail fast instead of uploading the rest of a doomed object
+        for part in self._parts:
+            if part.done() and part.exception() is not None:
+                raise part.exception()
+        if self._upload_id is None:
+            self._upload_id = self.backend.create_multipart_upload(self.key)
+
+        number = len(self._parts) + 1
+        self._slots.acquire()
+        try:
+            future = self.backend.executor.submit(
+                self.backend.upload_part, self.key, self._upload_id, number, data)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._parts.append(future)
+
+    def close(self) -> None:
+        if self._upload_id is None:
+            self.backend.put_object(self.key, bytes(self._buffer))
+            self._buffer.clear()
+            return
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        etags = [part.result() for part in self._parts]
+        self.backend.complete_multipart_upload(self.key, self._upload_id, etags)
+
+    def abort(self) -> None:
+        for part in self._parts:
+            part.cancel()
+        for part in self._parts:
+            if not part.cancelled():
+                part.exception()
+        if self._upload_id is not None:
+            try:
+                self.backend.abort_multipart_upload(self.key, self._upload_id)
+            except StorageError as e:
+                logger.warning(f"Failed to abort upload of {self.key}: {e}")
+
+    def __enter__(self) -> "MultipartUpload":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class S3Backend(StorageBackend):
+    """
+    S3-compatible object storage (AWS S3, MinIO, R2, ...).
+
+    Objects are keyed by their store-relative path and addressed
+    path-style, which every S3-compatible server accepts. Clients get
+    presigned GET URLs against ``public_endpoint`` (which may differ from
+    the endpoint the API reaches internally), so API workers never carry
+    the bytes. Requests are signed with SigV4 directly over httpx.
+    """
+
+    name = "s3"
+    remote = True
+
+    def __init__(
+        self,
+        endpoint: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        public_endpoint: Optional[str] = None,
+        part_size: int = 8 * 1024 * 1024,
+        concurrency: int = 4,
+        url_expiry: int = 3600,
+        transport: Optional[httpx.BaseTransport] = None,
+    ):
+        if not endpoint or not bucket:
+            raise ValueError("S3 storage needs an endpoint and a bucket")
+        self.endpoint = endpoint.rstrip("/")
+        self.public_endpoint = (public_endpoint or endpoint).rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self.url_expiry = url_expiry
+        self.client = httpx.Client(transport=transport, timeout=60)
+        self.executor = InstrumentedExecutor(
+            "s3_upload", max_workers=concurrency, thread_name_prefix="s3-upload")
+
+    def _object_url(self, key: str, endpoint: Optional[str] = None) -> str:
+        return f"{endpoint or self.endpoint}/{self.bucket}/{_quote(key, safe='/-_.~')}"
+
+    def _request(
+        self,
+        method: str,
+        key: str,
+        query: str = "",
+        content: bytes = b"",
+        payload_hash: str = UNSIGNED_PAYLOAD,
+        missing_ok: bool = False,
+    ) -> httpx.Response:
+        url = self._object_url(key) + (f"?{query}" if query else "")
+        headers = sign_headers(
+            method, url, self.access_key, self.secret_key, self.region, payload_hash)
+        try:
+            response = self.client.request(method, url, content=content, headers=headers)
+        except httpx.HTTPError as e:
+            raise StorageError(f"{method} {key} failed: {e}") from e
+        if response.status_code == 404 and missing_ok:
+            return response
+        if response.status_code >= 300:
+            raise StorageError(
+                f"{method} {key} failed with {response.status_code}: {response.text[:200]}")
+        return response
+
+    def put_object(self, key: str, data: bytes) -> None:
+        self._request("PUT", key, content=data,
+                      payload_hash=hashlib.sha256(data).hexdigest())
+
+    def create_multipart_upload(self, key: str) -> str:
+        response = self._request("POST", key, query="uploads=")
+        upload_id = _xml_text(response.text, "UploadId")
+        if not upload_id:
+            raise StorageError(f"No UploadId in response for {key}")
+        return upload_id
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        response = self._request(
+            "PUT", key, query=f"partNumber={number}&uploadId={_quote(upload_id)}",
+            content=data)
+        return response.headers["etag"]
+
+    def complete_multipart_upload(self, key: str, upload_id: str, etags: List[str]) -> None:
+        body = "".join(
+            f"<Part><PartNumber>{number}</PartNumber><ETag>{escape(etag)}</ETag></Part>"
+            for number, etag in enumerate(etags, 1))
+        data = f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>".encode("utf-8")
+        response = self._request(
+            "POST", key, query=f"uploadId={_quote(upload_id)}", content=data,
+            payload_hash=hashlib.sha256(data).hexdigest())
+        # Errors during completion can arrive in a 200 response body
+        if _xml_text(response.text, "Code") is not None:
+            raise StorageError(f"Completing upload of {key} failed: {response.text[:200]}")
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        self._request("DELETE", key, query=f"uploadId={_quote(upload_id)}")
+
+    def open_upload(self, key: str) -> MultipartUpload:
+        return MultipartUpload(self, key)
+
+    def url(self, key: str, filename: Optional[str] = None) -> str:
+        url = self._object_url(key, self.public_endpoint)
+        if filename:
+            disposition = f'attachment; filename="{filename}"'
+            url += f"?response-content-disposition={_quote(disposition)}"
+        return presign_url(
+            url, self.access_key, self.secret_key, self.region, self.url_expiry)
+
+    def delete(self, key: str) -> None:
+        self._request("DELETE", key, missing_ok=True)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        self.client.close()
+
+
+def _xml_text(document: str, tag: str) -> Optional[str]:
+    """Text of the first ``tag`` element, ignoring the S3 XML namespace"""
+    start = document.find(f"<{tag}>")
+    end = document.find(f"</{tag}>", start)
+    if start == -1 or end == -1:
+        return None
+    return document[start + len(tag) + 2:end]
+
+
+def create_backend() -> StorageBackend:
+    """Backend selected by ``STORAGE_BACKEND`` ("local" or "s3")"""
+    if settings.STORAGE_BACKEND == "local":
+        return LocalBackend()
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Backend(
+            endpoint=settings.S3_ENDPOINT_URL,
+            bucket=settings.S3_BUCKET,
+            access_key=settings.S3_ACCESS_KEY_ID,
+            secret_key=settings.S3_SECRET_ACCESS_KEY,
+            region=settings.S3_REGION,
+            public_endpoint=settings.S3_PUBLIC_ENDPOINT_URL or None,
+            part_size=max(settings.S3_PART_SIZE_BYTES, MIN_PART_SIZE),
+            concurrency=settings.S3_UPLOAD_CONCURRENCY,
+            url_expiry=settings.S3_PRESIGNED_URL_EXPIRY_SECONDS,
+        )
+    raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
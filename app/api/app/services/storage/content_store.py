@@ -0,0 +1,468 @@
+import errno
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+from ...core.config import settings
+from ...core.metrics import (
+    STORAGE_BYTES_BUDGET,
+    STORAGE_BYTES_EVICTED,
+    STORAGE_BYTES_USED
+)
+from .backends import StorageBackend, StorageError, create_backend
+from .index import INDEX_FILENAME, MediaIndex
+from .staging import StagingArea, default_staging_folder
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = ".blobs"
+# Same-filesystem landing spot for files copied in from tmpfs staging
+INCOMING_DIR = ".incoming"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Return the SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def shard(key: str) -> str:
+    """Two-level hash-prefix directory (``ab/cd``) for a file name or digest"""
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}"
+
+
+class ContentStore:
+    """
+    Content-addressed, sharded storage for finished downloads.
+
+    Session files live at ``ab/cd/<filename>`` under the root (see
+    ``allocate``) and are hard links to a blob at
+    ``.blobs/ab/cd/<sha256><ext>``, so identical content is stored once.
+    Every file and blob is recorded in a SQLite ``MediaIndex`` with its
+    session, size and expiry; releasing the last file of a blob deletes
+    the blob.
+
+    With a ``max_bytes`` budget, publishing evicts files by ``policy``
+    ("lru", or "size" for size times idle time) until usage fits. Files
+    that are fetched again via ``touch`` have their expiry extended, up
+    to ``max_lifetime`` after they were created.
+
+    Downloads are written to a ``StagingArea`` first and only moved under
+    the root by ``publish_staged`` once complete, so the public folder
+    never exposes partial files.
+
+    A ``StorageBackend`` other than the local one gets each file streamed
+    to it during the pass that hashes it, serves it to clients through
+    ``url_for`` and loses it again on release.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        default_ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        policy: Optional[str] = None,
+        max_lifetime: Optional[float] = None,
+        staging_folder: Optional[str] = None,
+        backend: Optional[StorageBackend] = None,
+    ):
+        self.root = root or settings.DOWNLOAD_FOLDER
+        self.blob_dir = os.path.join(self.root, BLOB_DIR)
+        self.default_ttl = default_ttl if default_ttl is not None else \
+            settings.DOWNLOAD_EXPIRY_MINUTES * 60
+        self.max_bytes = max_bytes if max_bytes is not None else \
+            settings.STORAGE_MAX_BYTES
+        self.policy = policy or settings.STORAGE_EVICTION_POLICY
+        self.max_lifetime = max_lifetime if max_lifetime is not None else \
+            settings.STORAGE_MAX_LIFETIME_SECONDS
+        self.staging = StagingArea(
+            staging_folder or settings.STAGING_FOLDER or default_staging_folder(
+                self.root, settings.STAGING_TMPFS_MIN_FREE_BYTES),
+            settings.STAGING_MAX_AGE_SECONDS)
+        self.backend = backend or create_backend()
+        STORAGE_BYTES_BUDGET.set(self.max_bytes)
+        self._lock = threading.Lock()
+        self._index: Optional[MediaIndex] = None
+
+    @property
+    def index(self) -> MediaIndex:
+        """Index opened on first use so importing the store touches no files"""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    os.makedirs(self.root, exist_ok=True)
+                    self._index = MediaIndex(
+                        os.path.join(self.root, INDEX_FILENAME))
+        return self._index
+
+    def close(self) -> None:
+        self.backend.close()
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    def path(self, relative_path: str) -> str:
+        return os.path.join(self.root, relative_path)
+
+    def url_for(self, relative_path: str, filename: Optional[str] = None) -> str:
+        """URL clients should fetch a published file from"""
+        return self.backend.url(relative_path, filename) or \
+            f"/downloads/{relative_path}"
+
+    def allocate(self, filename: str) -> str:
+        """Return the sharded relative path for a new file and create its directory"""
+        relative_path = f"{shard(filename)}/{filename}"
+        os.makedirs(os.path.dirname(self.path(relative_path)), exist_ok=True)
+        return relative_path
+
+    def blob_relative_path(self, digest: str, ext: str = "") -> str:
+        return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    def blob_path(self, digest: str, ext: str = "") -> str:
+        return self.path(self.blob_relative_path(digest, ext))
+
+    def publish(
+        self,
+        relative_path: str,
+        session_id: Optional[str] = None,
+        expires_at: Optional[float] = None,
+        digest: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Deduplicate and index a finished file under the store root.
+
+        The file is hashed, and streamed to a remote backend, in one pass
+        unless its ``digest`` is already known (the caller then uploaded
+        it too); if a blob with the same digest exists the file is
+        atomically replaced by a link to it, otherwise the file itself
+        becomes the blob. Returns the digest, or None when the filesystem
+        doesn't support hard links (the file is still indexed so it
+        expires normally).
+        """
+        path = self.path(relative_path)
+        size = os.path.getsize(path)
+        if expires_at is None:
+            expires_at = time.time() + self.default_ttl
+
+        if digest is None:
+            try:
+                digest = self._ingest(path, relative_path)
+            except StorageError:
+                os.remove(path)
+                raise
+        digest = self._link_blob(relative_path, digest)
+        if digest is not None:
+            self.index.add_blob(
+                digest,
+                self.blob_relative_path(digest, os.path.splitext(path)[1]),
+                size)
+        self.index.add_file(relative_path, size, digest, session_id, expires_at)
+        self.enforce_budget(exclude=relative_path)
+        return digest
+
+    def publish_staged(
+        self,
+        staged_path: str,
+        relative_path: str,
+        session_id: Optional[str] = None,
+        expires_at: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        Move a finished download from staging to ``relative_path`` and publish it.
+
+        On the same filesystem this is a single atomic rename. From tmpfs
+        the file is copied (and hashed on the way) into a hidden folder on
+        the store's filesystem, fsynced, then renamed into place, so
+        readers see either nothing or the complete file.
+        """
+        path = self.path(relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        digest = None
+        try:
+            os.replace(staged_path, path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            digest = self._copy_in(staged_path, relative_path)
+            os.remove(staged_path)
+        return self.publish(relative_path, session_id, expires_at, digest=digest)
+
+    def _copy_in(self, source: str, relative_path: str) -> str:
+        path = self.path(relative_path)
+        incoming = os.path.join(self.root, INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        temp_path = os.path.join(
+            incoming, uuid.uuid4().hex + os.path.splitext(path)[1])
+        try:
+            digest = self._ingest(source, relative_path, temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            StagingArea.remove(temp_path)
+            raise
+        return digest
+
+    def _ingest(self, source: str, relative_path: str, target: Optional[str] = None) -> str:
+        """
+        Read ``source`` once: hash it, optionally copy it to ``target`` and
+        stream it to the backend as ``relative_path``. Returns the digest.
+        """
+        digest = hashlib.sha256()
+        upload = self.backend.open_upload(relative_path)
+        try:
+            with open(source, "rb") as src, \
+                    (open(target, "wb") if target else nullcontext()) as dst:
+                for chunk in iter(lambda: src.read(HASH_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    if dst is not None:
+                        dst.write(chunk)
+                    if upload is not None:
+                        upload.write(chunk)
+                if dst is not None:
+                    dst.flush()
+                    os.fsync(dst.fileno())
+            if upload is not None:
+                upload.close()
+        except BaseException:
+            if upload is not None:
+                upload.abort()
+            raise
+        return digest.hexdigest()
+
+    def _link_blob(self, relative_path: str, digest: str) -> Optional[str]:
+        path = self.path(relative_path)
+        blob = self.blob_path(digest, os.path.splitext(path)[1])
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+
+        with self._lock:
+            # Retry in case another worker releases the blob mid-publish
+            for _ in range(3):
+                try:
+                    os.link(path, blob)
+                    return digest
+                except FileExistsError:
+                    pass
+                except OSError as e:
+                    logger.warning(
+                        f"Hard links unsupported in {self.root}, not deduplicating: {e}")
+                    return None
+
+                if os.path.samefile(path, blob):
+                    return digest
+
+                # Identical content already stored: swap the file for a link
+                temp_path = f"{path}.{uuid.uuid4().hex[:8]}.link"
+                try:
+                    os.link(blob, temp_path)
+                except FileNotFoundError:
+                    continue
+                os.replace(temp_path, path)
+                logger.info(f"Deduplicated {relative_path} against blob {digest}")
+                return digest
+
+        return None
+
+    def claim(
+        self,
+        relative_path: str,
+        session_id: Optional[str] = None,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        """Attach a session and/or expiry to an already published file"""
+        self.index.update_file(relative_path, session_id, expires_at)
+
+    def touch(self, relative_path: str, extend_by: Optional[float] = None) -> Optional[float]:
+        """
+        Record a fetch of a file and return its (possibly extended) expiry.
+
+        Hot files thereby outlive the base TTL, bounded by ``max_lifetime``.
+        """
+        now = time.time()
+        extend_by = self.default_ttl if extend_by is None else extend_by
+        return self.index.touch(
+            relative_path, now, now + extend_by, self.max_lifetime)
+
+    def release(self, relative_path: str, reason: Optional[str] = None) -> int:
+        """
+        Remove a file and drop its blob once nothing else uses it.
+
+        Returns the bytes actually freed, which are counted as evicted
+        under ``reason`` when one is given.
+        """
+        row = self.index.remove_file(relative_path)
+        try:
+            os.remove(self.path(relative_path))
+        except FileNotFoundError:
+            pass
+        self._delete_remote(relative_path)
+        if row is None:
+            return 0
+
+        digest, size = row
+        freed = 0
+        if digest is None:
+            freed = size
+        elif self.index.reference_count(digest) == 0:
+            blob = self.index.get_blob(digest)
+            if blob is not None and self._drop_blob(digest, blob[0]):
+                freed = blob[1]
+        if reason is not None and freed:
+            STORAGE_BYTES_EVICTED.labels(reason=reason).inc(freed)
+        return freed
+
+    def refcount(self, digest: str) -> int:
+        """Number of indexed files pointing at a blob"""
+        return self.index.reference_count(digest)
+
+    def usage(self) -> int:
+        """Bytes currently stored, counting each blob once"""
+        used = self.index.total_bytes()
+        STORAGE_BYTES_USED.set(used)
+        return used
+
+    def enforce_budget(self, exclude: Optional[str] = None) -> List[Tuple[str, Optional[str]]]:
+        """
+        Evict files until usage fits within ``max_bytes``.
+
+        ``exclude`` protects the file being published. Evicting a file whose
+        blob is shared frees nothing, so candidates are taken in order until
+        enough bytes are actually released. Returns (path, session_id).
+        """
+        used = self.usage()
+        if not self.max_bytes or used <= self.max_bytes:
+            return []
+
+        evicted = []
+        while used > self.max_bytes:
+            candidates = self.index.eviction_candidates(
+                self.policy, time.time(), exclude=exclude)
+            if not candidates:
+                break
+            for relative_path, session_id in candidates:
+                used -= self.release(relative_path, reason="quota")
+                evicted.append((relative_path, session_id))
+                if used <= self.max_bytes:
+                    break
+
+        if evicted:
+            logger.info(
+                f"Evicted {len(evicted)} files to fit the {self.max_bytes} byte budget")
+        self.usage()
+        return evicted
+
+    def expire(self, now: Optional[float] = None) -> List[Tuple[str, Optional[str]]]:
+        """Release every file whose expiry has passed; returns (path, session_id)"""
+        now = time.time() if now is None else now
+        released = []
+        while True:
+            batch = self.index.expired_files(now)
+            if not batch:
+                return released
+            for relative_path, session_id in batch:
+                self.release(relative_path, reason="expired")
+            released.extend(batch)
+
+    def collect_garbage(self) -> int:
+        """
+        Delete blobs that no indexed file refers to any more.
+
+        Covers files released by another worker between its index update
+        and its blob check. Returns the number of blobs removed.
+        """
+        removed = 0
+        for digest, blob_path in self.index.unreferenced_blobs():
+            if self._drop_blob(digest, blob_path):
+                removed += 1
+        return removed
+
+    def recover(self) -> Dict[str, int]:
+        """
+        Reconcile the index with the disk after a restart.
+
+        Rows whose files vanished are dropped, files left in the flat
+        pre-sharding layout are indexed with an expiry based on their
+        mtime, and unreferenced blobs are collected. Only the root's top
+        level is listed; sharded directories are checked through the index.
+        The staging folder is swept too (see ``StagingArea.recover``),
+        along with copies interrupted on their way in from tmpfs.
+        """
+        stats = {"missing": 0, "imported": 0, "collected": 0}
+        stats.update(self.staging.recover())
+        stats["purged"] += self._purge_incoming()
+
+        for relative_path in self.index.all_files():
+            if not os.path.exists(self.path(relative_path)):
+                self.index.remove_file(relative_path)
+                self._delete_remote(relative_path)
+                stats["missing"] += 1
+        for digest, blob_path in self.index.all_blobs():
+            if not os.path.exists(self.path(blob_path)):
+                self.index.remove_blob(digest)
+                stats["missing"] += 1
+
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                if self.index.get_file(entry.name) is None:
+                    stat_result = entry.stat()
+                    self.index.add_file(
+                        entry.name,
+                        stat_result.st_size,
+                        expires_at=stat_result.st_mtime + self.default_ttl)
+                    stats["imported"] += 1
+
+        stats["collected"] = self.collect_garbage()
+        if any(stats.values()):
+            logger.info(f"Recovered download index: {stats}")
+        return stats
+
+    def _delete_remote(self, relative_path: str) -> None:
+        if not self.backend.remote:
+            return
+        try:
+            self.backend.delete(relative_path)
+        except StorageError as e:
+            logger.warning(f"Failed to delete {relative_path} from {self.backend.name}: {e}")
+
+    def _purge_incoming(self) -> int:
+        purged = 0
+        cutoff = time.time() - self.staging.max_age
+        try:
+            entries = list(os.scandir(os.path.join(self.root, INCOMING_DIR)))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                # Younger copies may still be in flight in another worker
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    purged += 1
+            except FileNotFoundError:
+                pass
+        return purged
+
+    def _drop_blob(self, digest: str, blob_path: str) -> bool:
+        path = self.path(blob_path)
+        removed = False
+        with self._lock:
+            try:
+                # Links published by another worker but not yet indexed
+                if os.stat(path).st_nlink <= 1:
+                    os.remove(path)
+                    removed = True
+                else:
+                    return False
+            except FileNotFoundError:
+                pass
+            self.index.remove_blob(digest)
+        return removed
@@ -0,0 +1,197 @@
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+INDEX_FILENAME = ".index.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    session_id TEXT,
+    digest TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    last_access REAL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS files_expires_at ON files (expires_at);
+CREATE INDEX IF NOT EXISTS files_session_id ON files (session_id);
+CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+CREATE INDEX IF NOT EXISTS files_last_access ON files (last_access);
+"""
+
+# ORDER BY clauses for quota eviction; "size" weighs idle time by size
+EVICTION_ORDER = {
+    "lru": "COALESCE(last_access, created_at) ASC",
+    "size": "size * (? - COALESCE(last_access, created_at)) DESC",
+}
+
+
+class MediaIndex:
+    """
+    SQLite index of the download folder.
+
+    Maps each published file (path relative to the store root) to its
+    session, blob digest, size and expiry, so cleanup, usage totals and
+    startup recovery are indexed queries instead of directory walks. WAL
+    mode lets several API workers share one index file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def add_blob(self, digest: str, path: str, size: int) -> None:
+        self._execute(
+            "INSERT OR IGNORE INTO blobs (digest, path, size, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            (digest, path, size, time.time()),
+        )
+
+    def remove_blob(self, digest: str) -> None:
+        self._execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+
+    def get_blob(self, digest: str) -> Optional[Tuple[str, int]]:
+        rows = self._query(
+            "SELECT path, size FROM blobs WHERE digest = ?", (digest,))
+        return rows[0] if rows else None
+
+    def add_file(
+        self,
+        path: str,
+        size: int,
+        digest: Optional[str] = None,
+        session_id: Optional[str] = None,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO files "
+            "(path, session_id, digest, size, created_at, expires_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, session_id, digest, size, now, expires_at, now),
+        )
+
+    def touch(self, path: str, now: float, extend_to: float, max_lifetime: float) -> Optional[float]:
+        """
+        Record an access and push the expiry back to ``extend_to``.
+
+        The expiry never moves earlier and never past ``created_at +
+        max_lifetime``. Returns the new expiry, or None if not indexed.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE files SET last_access = ?, hits = hits + 1, "
+                "expires_at = MAX(COALESCE(expires_at, 0), "
+                "MIN(?, created_at + ?)) WHERE path = ?",
+                (now, extend_to, max_lifetime, path),
+            )
+            row = self._conn.execute(
+                "SELECT expires_at FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def eviction_candidates(
+        self,
+        policy: str,
+        now: float,
+        limit: int = 100,
+        exclude: Optional[str] = None,
+    ) -> List[Tuple[str, Optional[str]]]:
+        """(path, session_id) of files in the order they should be evicted"""
+        order = EVICTION_ORDER.get(policy)
+        if order is None:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        params = (now,) if "?" in order else ()
+        return self._query(
+            "SELECT path, session_id FROM files WHERE path != ? "
+            f"ORDER BY {order} LIMIT ?",
+            (exclude or "",) + params + (limit,),
+        )
+
+    def update_file(
+        self,
+        path: str,
+        session_id: Optional[str] = None,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        self._execute(
+            "UPDATE files SET session_id = COALESCE(?, session_id), "
+            "expires_at = COALESCE(?, expires_at) WHERE path = ?",
+            (session_id, expires_at, path),
+        )
+
+    def remove_file(self, path: str) -> Optional[Tuple[Optional[str], int]]:
+        """Delete a file row and return the (digest, size) it had"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, size FROM files WHERE path = ?", (path,)).fetchone()
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+        return row
+
+    def get_file(self, path: str) -> Optional[tuple]:
+        rows = self._query(
+            "SELECT path, session_id, digest, size, created_at, expires_at "
+            "FROM files WHERE path = ?", (path,))
+        return rows[0] if rows else None
+
+    def files_for_session(self, session_id: str) -> List[str]:
+        return [row[0] for row in self._query(
+            "SELECT path FROM files WHERE session_id = ?", (session_id,))]
+
+    def expired_files(self, now: float, limit: int = 1000) -> List[Tuple[str, Optional[str]]]:
+        """(path, session_id) of files whose expiry has passed"""
+        return self._query(
+            "SELECT path, session_id FROM files "
+            "WHERE expires_at IS NOT NULL AND expires_at <= ? "
+            "ORDER BY expires_at LIMIT ?",
+            (now, limit),
+        )
+
+    def reference_count(self, digest: str) -> int:
+        return self._query(
+            "SELECT COUNT(*) FROM files WHERE digest = ?", (digest,))[0][0]
+
+    def unreferenced_blobs(self) -> List[Tuple[str, str]]:
+        """(digest, path) of blobs that no file row points at"""
+        return self._query(
+            "SELECT digest, path FROM blobs WHERE NOT EXISTS "
+            "(SELECT 1 FROM files WHERE files.digest = blobs.digest)")
+
+    def all_files(self) -> List[str]:
+        return [row[0] for row in self._query("SELECT path FROM files")]
+
+    def all_blobs(self) -> List[Tuple[str, str]]:
+        return self._query("SELECT digest, path FROM blobs")
+
+    def total_bytes(self) -> int:
+        """Bytes on disk: deduplicated blobs plus files stored without one"""
+        return self._query(
+            "SELECT (SELECT COALESCE(SUM(size), 0) FROM blobs) + "
+            "(SELECT COALESCE(SUM(size), 0) FROM files WHERE digest IS NULL)"
+        )[0][0]
@@ -0,0 +1,220 @@
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows, in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+TMPFS_PATH = "/dev/shm"
+TMPFS_DIRNAME = "tiktok-downloader-staging"
+STAGING_DIR = ".staging"
+LOCK_SUFFIX = ".lock"
+
+
+def default_staging_folder(root: str, min_tmpfs_free: int) -> str:
+    """
+    Pick the scratch folder for in-progress downloads.
+
+    tmpfs is used when it has at least ``min_tmpfs_free`` bytes free (a
+    container's default 64 MB /dev/shm does not qualify); otherwise a
+    hidden folder under the store root, where publishing is a plain rename.
+    """
+    if min_tmpfs_free > 0 and os.access(TMPFS_PATH, os.W_OK):
+        try:
+            if shutil.disk_usage(TMPFS_PATH).free >= min_tmpfs_free:
+                return os.path.join(TMPFS_PATH, TMPFS_DIRNAME)
+        except OSError:
+            pass
+    return os.path.join(root, STAGING_DIR)
+
+
+def _stem(name: str) -> str:
+    """Staged name without any of the suffixes yt-dlp appends (.part, .f137.mp4)"""
+    return name.split(".", 1)[0]
+
+
+class StagedFile:
+    """
+    Scratch path reserved for one download.
+
+    The reservation is an ``flock`` on ``<stem>.lock`` which the kernel
+    drops if the worker dies, so a crashed download never blocks a retry
+    and recovery can tell live partials from abandoned ones.
+    """
+
+    def __init__(self, area: "StagingArea", path: str, lock_fd: Optional[int]):
+        self.area = area
+        self.path = path
+        self._lock_fd = lock_fd
+
+    @property
+    def stem(self) -> str:
+        return _stem(os.path.basename(self.path))
+
+    def discard(self) -> None:
+        """Remove the staged file or folder, e.g. after a failed download"""
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+        else:
+            for name in self.area.leftovers(self.stem):
+                self.area.remove(os.path.join(self.area.folder, name))
+
+    def close(self) -> None:
+        """Release the reservation; anything left stays resumable until it ages out"""
+        self.area.release(self)
+        if self._lock_fd is not None:
+            self.area.remove(os.path.join(self.area.folder, self.stem + LOCK_SUFFIX))
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def __enter__(self) -> "StagedFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class StagingArea:
+    """
+    Scratch folder where downloads are written before they are published.
+
+    Names are derived from a ``key`` (URL plus format) so a retry of the
+    same download reuses the same path and yt-dlp resumes its ``.part``
+    file, or skips the download entirely if the file was finished but
+    never published. A key already held by another writer falls back to a
+    unique name.
+    """
+
+    def __init__(self, folder: str, max_age: float):
+        self.folder = os.path.abspath(folder)
+        self.max_age = max_age
+        self._held: Set[str] = set()
+
+    def stage(self, filename: str, key: Optional[str] = None) -> StagedFile:
+        """Reserve a scratch path with the extension of ``filename``"""
+        os.makedirs(self.folder, exist_ok=True)
+        ext = os.path.splitext(filename)[1]
+        if key is not None:
+            stem = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+            staged = self._reserve(stem, ext)
+            if staged is not None:
+                return staged
+        while True:
+            staged = self._reserve(uuid.uuid4().hex, ext)
+            if staged is not None:
+                return staged
+
+    def stage_dir(self, key: Optional[str] = None) -> StagedFile:
+        """Reserve a scratch folder, for downloads that produce several files"""
+        staged = self.stage("", key)
+        os.makedirs(staged.path, exist_ok=True)
+        return staged
+
+    def _reserve(self, stem: str, ext: str) -> Optional[StagedFile]:
+        if stem in self._held:
+            return None
+        fd = None
+        if fcntl is not None:
+            lock_path = os.path.join(self.folder, stem + LOCK_SUFFIX)
+            fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                # The previous holder may have unlinked the file we locked
+                if os.fstat(fd).st_ino != os.stat(lock_path).st_ino:
+                    raise FileNotFoundError(lock_path)
+            except OSError:
+                os.close(fd)
+                return None
+        self._held.add(stem)
+        return StagedFile(self, os.path.join(self.folder, stem + ext), fd)
+
+    def release(self, staged: StagedFile) -> None:
+        self._held.discard(staged.stem)
+
+    def leftovers(self, stem: str) -> list:
+        """Names in the folder belonging to a staged stem, lock excluded"""
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return []
+        return [
+            name for name in names
+            if _stem(name) == stem and not name.endswith(LOCK_SUFFIX)
+        ]
+
+    def is_locked(self, stem: str) -> bool:
+        """Whether a live writer, in any process, holds ``stem``"""
+        if stem in self._held:
+            return True
+        if fcntl is None:
+            return False
+        try:
+            fd = os.open(os.path.join(self.folder, stem + LOCK_SUFFIX), os.O_RDWR)
+        except FileNotFoundError:
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        finally:
+            os.close(fd)
+        return False
+
+    def recover(self) -> Dict[str, int]:
+        """
+        Sweep the scratch folder, at startup and on every cleanup pass.
+
+        Leftovers whose writer is gone are kept for resume while younger
+        than ``max_age`` and purged after that; stale lock files are
+        removed. Entries locked by a live writer (another worker) are left
+        alone. Returns counts of resumable and purged entries.
+        """
+        stats = {"resumable": 0, "purged": 0}
+        try:
+            entries = list(os.scandir(self.folder))
+        except FileNotFoundError:
+            return stats
+
+        cutoff = time.time() - self.max_age
+        live = set()
+        for entry in entries:
+            stem = _stem(entry.name)
+            if stem in live:
+                continue
+            if self.is_locked(stem):
+                live.add(stem)
+                continue
+            if entry.name.endswith(LOCK_SUFFIX):
+                self.remove(entry.path)
+                continue
+            try:
+                expired = entry.stat().st_mtime < cutoff
+            except FileNotFoundError:
+                continue
+            if expired:
+                if entry.is_dir():
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    self.remove(entry.path)
+                stats["purged"] += 1
+            else:
+                stats["resumable"] += 1
+
+        if stats["purged"]:
+            logger.info(f"Recovered staging folder {self.folder}: {stats}")
+        return stats
+
+    @staticmethod
+    def remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -1,13 +1,13 @@
-import yt_dlp
 import os
 import uuid
-import requests
 import re
 import logging
 import time
 from typing import List
 from pydantic import HttpUrl
 from ..core.config import settings
+from .storage import content_store
+from ..core.stage_timer import EXTRACT_INFO, FINALIZE, RESOLVE, StageTimer
 from ..core.exceptions import DownloadFailedException, InvalidURLException
 import asyncio
 
@@ -50,6 +50,7 @@ class TikTokService:
 
     async def get_video_no_watermark(self, url: str) -> dict:
         """Get TikTok video without watermark using yt-dlp"""
+        import yt_dlp
         try:
             ydl_opts = {
                 'format': 'best',
@@ -125,15 +126,20 @@ class TikTokService:
 
     async def download_video(self, url: HttpUrl, quality: str = "best") -> dict:
         """Download a single TikTok video without watermark"""
+        import yt_dlp
+        timer = StageTimer("tiktok")
         session_id = str(uuid.uuid4())
-        filename = f"tiktok_{uuid.uuid4().hex[:8]}.mp4"
+        filename = content_store.allocate(
+            f"tiktok_{uuid.uuid4().hex[:8]}.mp4")
         file_path = os.path.join(self.download_path, filename)
+        staged = content_store.staging.stage(
+            filename, key=f"tiktok|{url}|{quality}")
 
         try:
             # Enhanced configuration for TikTok no-watermark downloads
             ydl_opts = {
                 'format': 'mp4',  # Base format
-                'outtmpl': file_path,
+                'outtmpl': staged.path,
                 'quiet': True,
                 'noplaylist': True,
                 'extract_flat': False,
@@ -169,13 +175,14 @@ class TikTokService:
             elif quality == "low":
                 ydl_opts['format'] = 'bestvideo[height<=480]+bestaudio/best[height<=480]'
 
-            # Use asyncio to run yt-dlp in a separate thread (non-blocking)
-            loop = asyncio.get_event_loop()
+            # Run yt-dlp off the event loop, timing each stage
+            timer.hook(ydl_opts)
+            timer.lap(RESOLVE)
 
             # Extract info first to get metadata (needed for API response)
             logger.info(f"Extracting video info for URL: {url}")
-            info_dict = await loop.run_in_executor(
-                None,
+            info_dict = await timer.run(
+                EXTRACT_INFO, None,
                 lambda: yt_dlp.YoutubeDL(ydl_opts).extract_info(
                     str(url), download=False)
             )
@@ -185,27 +192,33 @@ class TikTokService:
 
             # Now download with the enhanced configuration
             logger.info(f"Downloading video from URL: {url}")
-            await loop.run_in_executor(
-                None,
+            await timer.run(
+                None, None,
                 lambda: yt_dlp.YoutubeDL(ydl_opts).download([str(url)])
             )
 
             # Check if file was downloaded successfully
-            if not os.path.exists(file_path):
+            if not os.path.exists(staged.path):
                 raise DownloadFailedException(
                     "Download completed but file not found")
 
-            # Update file timestamp to current time for better organization on mobile devices
+            # Update file timestamp to current time for better organization on mobile devices;
+            # before publishing, as a deduplicated file shares its blob's inode
             current_time = time.time()
-            os.utime(file_path, (current_time, current_time))
+            os.utime(staged.path, (current_time, current_time))
             logger.info(f"Updated file timestamp to current time for: {file_path}")
 
+            # Move into the public folder in one rename, then deduplicate
+            await timer.run(
+                FINALIZE, None, content_store.publish_staged, staged.path, filename)
+
             logger.info(f"Successfully downloaded video to: {file_path}")
             return {
                 "session_id": session_id,
                 "status": "completed",
                 "message": "Download completed successfully",
-                "download_url": f"/downloads/{filename}",
+                "filename": filename,
+                "download_url": content_store.url_for(filename),
                 "description": info_dict.get('title', ''),
                 "author": info_dict.get('uploader', 'unknown')
             }
@@ -213,6 +226,9 @@ class TikTokService:
         except Exception as e:
             logger.error(f"Download failed for URL {url}: {str(e)}")
             raise DownloadFailedException(str(e))
+        finally:
+            staged.close()
+            timer.observe()
 
     async def batch_download(self, urls: List[HttpUrl], quality: str = "best") -> List[dict]:
         """Download multiple TikTok videos"""
@@ -0,0 +1,77 @@
+"""
+Widget updates from download threads for the Tk front ends of the batch
+engine (tkinter_gui.py and instagram_gui.py).
+
+Tk widgets may only be touched from the main loop, and yt-dlp calls its
+progress hooks far more often than a window can redraw.
+"""
+import queue
+from typing import Any, Callable, Dict, Optional
+
+# How often the main loop applies queued updates
+UI_FRAME_MS = 100
+
+
+class UIQueue:
+    """
+    Updates posted by any thread, applied on the Tk main loop.
+
+    ``post(kind, *args)`` only queues. Every ``frame_ms`` the main loop
+    drains the queue and calls ``setters[kind]`` once with the newest
+    arguments of each kind; ``dialogs`` kinds (message boxes) are shown
+    for every update instead. While ``engine`` is set to a running
+    ``BatchDownloader``, its progress snapshot is drawn as the frame's
+    "status" and "progress".
+    """
+
+    def __init__(
+        self,
+        root: Any,
+        setters: Dict[str, Callable[..., None]],
+        dialogs: Optional[Dict[str, Callable[..., None]]] = None,
+        frame_ms: int = UI_FRAME_MS,
+    ):
+        self.root = root
+        self.setters = setters
+        self.dialogs = dialogs or {}
+        self.frame_ms = frame_ms
+        self.engine = None
+        self._queue = queue.Queue()
+        self.root.after(self.frame_ms, self.drain)
+
+    def post(self, kind: str, *args: Any) -> None:
+        """Queue an update; safe from any thread"""
+        self._queue.put((kind, args))
+
+    def drain(self) -> None:
+        """Apply what was queued since the last frame (main loop only)"""
+        latest: Dict[str, tuple] = {}
+        dialogs = []
+        while True:
+            try:
+                kind, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind in self.dialogs:
+                dialogs.append((kind, args))
+            else:
+                latest[kind] = args
+
+        engine = self.engine
+        if engine is not None:
+            progress = engine.progress()
+            if progress.total:
+                latest["progress"] = (progress.finished / progress.total * 100,)
+                latest["status"] = (
+                    f"Downloading {progress.finished}/{progress.total}: "
+                    f"{progress.active} active, {progress.failed} failed, "
+                    f"{progress.bytes_downloaded / 2 ** 20:.1f} MB",)
+
+        for kind, args in latest.items():
+            setter = self.setters.get(kind)
+            if setter is not None:
+                setter(*args)
+        # Rescheduled before the dialogs, which block until dismissed
+        self.root.after(self.frame_ms, self.drain)
+        for kind, args in dialogs:
+            self.dialogs[kind](*args)
@@ -1,12 +1,12 @@
-import yt_dlp
 import os
 import uuid
-import asyncio
 import logging
 import re
 from typing import List, Dict, Any
 from pydantic import HttpUrl
 from ..core.config import settings
+from .storage import content_store
+from ..core.stage_timer import EXTRACT_INFO, FINALIZE, RESOLVE, StageTimer
 from ..core.exceptions import DownloadFailedException, InvalidURLException
 from ..models.youtube import (
     YouTubeDownloadRequest, 
@@ -87,9 +87,14 @@ class YouTubeService:
 
     async def download_video(self, url: HttpUrl, quality: str = "high") -> dict:
         """Download a YouTube video or Short"""
+        import yt_dlp
+        timer = StageTimer("youtube")
         session_id = str(uuid.uuid4())
-        filename = f"youtube_{uuid.uuid4().hex[:8]}.mp4"
+        filename = content_store.allocate(
+            f"youtube_{uuid.uuid4().hex[:8]}.mp4")
         file_path = os.path.join(self.download_path, filename)
+        staged = content_store.staging.stage(
+            filename, key=f"youtube|{url}|{quality}")
 
         try:
             # Quality mapping
@@ -98,7 +103,7 @@ class YouTubeService:
 
             ydl_opts = {
                 'format': format_string,
-                'outtmpl': file_path,
+                'outtmpl': staged.path,
                 'quiet': True,
                 'no_warnings': True,
                 'extract_flat': False,
@@ -112,13 +117,14 @@ class YouTubeService:
                 'writeautomaticsub': False,
             }
 
-            # Use asyncio to run yt-dlp in a separate thread (non-blocking)
-            loop = asyncio.get_event_loop()
+            # Run yt-dlp off the event loop, timing each stage
+            timer.hook(ydl_opts)
+            timer.lap(RESOLVE)
 
             # Extract info first to get metadata
             logger.info(f"Extracting YouTube video info for URL: {url}")
-            info_dict = await loop.run_in_executor(
-                None,
+            info_dict = await timer.run(
+                EXTRACT_INFO, None,
                 lambda: yt_dlp.YoutubeDL(ydl_opts).extract_info(
                     str(url), download=False)
             )
@@ -132,15 +138,19 @@ class YouTubeService:
 
             # Now download with the configuration
             logger.info(f"Downloading YouTube {'Shorts' if is_shorts else 'video'} from URL: {url}")
-            await loop.run_in_executor(
-                None,
+            await timer.run(
+                None, None,
                 lambda: yt_dlp.YoutubeDL(ydl_opts).download([str(url)])
             )
 
             # Check if file was downloaded successfully
-            if not os.path.exists(file_path):
+            if not os.path.exists(staged.path):
                 raise DownloadFailedException("Download completed but file not found")
 
+            # Move into the public folder in one rename, then deduplicate
+            await timer.run(
+                FINALIZE, None, content_store.publish_staged, staged.path, filename)
+
             logger.info(f"Successfully downloaded YouTube {'Shorts' if is_shorts else 'video'} to: {file_path}")
             
             # Extract metadata
@@ -150,7 +160,7 @@ class YouTubeService:
                 "session_id": session_id,
                 "status": "completed",
                 "message": f"YouTube {'Shorts' if is_shorts else 'video'} downloaded successfully",
-                "download_url": f"/downloads/{filename}",
+                "download_url": content_store.url_for(filename),
                 "title": info_dict.get('title', ''),
                 "author": info_dict.get('uploader', 'unknown'),
                 "duration": info_dict.get('duration', 0),
@@ -162,6 +172,9 @@ class YouTubeService:
         except Exception as e:
             logger.error(f"YouTube download failed for URL {url}: {str(e)}")
             raise DownloadFailedException(str(e))
+        finally:
+            staged.close()
+            timer.observe()
 
     async def batch_download(self, urls: List[HttpUrl], quality: str = "high") -> List[dict]:
         """Download multiple YouTube videos/Shorts"""
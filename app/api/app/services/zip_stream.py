@@ -0,0 +1,65 @@
+import zipfile
+from typing import Iterable, Iterator, List, Tuple
+
+CHUNK_SIZE = 256 * 1024
+
+
+class _ChunkBuffer:
+    """
+    Write-only sink that ZipFile streams into.
+
+    It has no ``tell``/``seek`` so ZipFile treats it as unseekable and
+    writes data descriptors instead of going back to patch headers. The
+    bytes written since the last ``drain`` are handed to the client, so
+    at most one chunk plus a header is held in memory.
+    """
+
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_zip(
+    entries: Iterable[Tuple[str, str]],
+    chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Yield an uncompressed ZIP archive of ``(arcname, path)`` entries.
+
+    Entries are stored rather than deflated: videos don't compress, and
+    stored entries are copied straight through without a temp file.
+    Files that disappear before they are reached (e.g. expired by the
+    cleanup loop) are skipped.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for arcname, path in entries:
+            try:
+                source = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            with source:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                info.compress_type = zipfile.ZIP_STORED
+                with archive.open(info, mode="w") as target:
+                    while True:
+                        chunk = source.read(chunk_size)
+                        if not chunk:
+                            break
+                        target.write(chunk)
+                        yield buffer.drain()
+            # Data descriptor for the finished entry
+            yield buffer.drain()
+    # Central directory
+    yield buffer.drain()
@@ -0,0 +1 @@
+"""Performance benchmarks for the downloader API. Run modules with ``python -m``."""
@@ -0,0 +1,385 @@
+"""
+Load test of ``app.main:app`` with the download backend swapped for a fake.
+
+Virtual users replay the production traffic shapes against the real
+middleware, routing, dependencies, staging and publish code:
+
+    download   POST /api/v1/download
+    batch      POST /api/v1/batch-download with 24 URLs
+    status     GET  /api/v1/status/{id} on live and finished sessions
+    websocket  watch /api/v1/ws/{id} from a new download until it closes
+    file       GET  /api/v1/file/{id} of a finished download
+    mixed      all of the above, weighted like production traffic
+
+``DownloadManager``'s yt-dlp calls are replaced by a fake that "downloads"
+for ``--job-seconds`` and writes ``--file-kb`` of data, so nothing leaves
+the process. The app is driven in-process through a minimal ASGI client:
+responses return as soon as their body is sent, with background tasks
+still running on the same loop, as under uvicorn. Reports requests/sec,
+latency percentiles and event-loop lag (how late a 10 ms timer fires)
+per scenario. Websocket latency is connect to first status message.
+
+Rate-limit dependencies are disabled unless ``--rate-limits`` is given,
+since a handful of virtual users would otherwise exhaust the free tier.
+
+Usage (from app/api):
+    python -m benchmarks.bench_load --users 50 --duration 10
+    python -m benchmarks.bench_load --scenarios mixed --users 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+SCENARIOS = ("download", "batch", "status", "websocket", "file", "mixed")
+MIXED_WEIGHTS = {"status": 60, "file": 15, "download": 12, "websocket": 10, "batch": 3}
+BATCH_SIZE = 24
+LAG_INTERVAL = 0.01
+API_KEY = "bench-website-key"
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class AsgiClient:
+    """
+    Just enough of an ASGI server to drive HTTP and websocket routes.
+
+    ``httpx.ASGITransport`` waits for the whole app call, background
+    tasks included, and has no websocket support.
+    """
+
+    def __init__(self, app, headers: Dict[str, str]):
+        self.app = app
+        self.headers = [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+        self.background = set()
+        self.background_errors = 0
+
+    def _scope(self, kind: str, path: str, client: int) -> dict:
+        path, _, query = path.partition("?")
+        return {
+            "type": kind,
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "scheme": "http" if kind == "http" else "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": list(self.headers),
+            # Distinct client addresses, as behind a load balancer
+            "client": (f"10.{client >> 16 & 255}.{client >> 8 & 255}.{client & 255}", 40000),
+            "server": ("bench", 80),
+        }
+
+    def _track(self, task: asyncio.Task) -> None:
+        self.background.add(task)
+
+        def finished(task: asyncio.Task) -> None:
+            self.background.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                self.background_errors += 1
+        task.add_done_callback(finished)
+
+    async def request(self, method: str, path: str, body: Optional[dict] = None,
+                      client: int = 0) -> Tuple[int, bytes]:
+        payload = json.dumps(body).encode() if body is not None else b""
+        scope = self._scope("http", path, client)
+        scope["method"] = method
+        scope["headers"] += [(b"content-type", b"application/json"),
+                             (b"content-length", str(len(payload)).encode())]
+        done = asyncio.get_running_loop().create_future()
+        status: List[int] = []
+        chunks: List[bytes] = []
+        sent = False
+
+        async def receive() -> dict:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": payload, "more_body": False}
+            await asyncio.shield(done)
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body") and not done.done():
+                    done.set_result(None)
+
+        task = asyncio.ensure_future(self.app(scope, receive, send))
+        self._track(task)
+        await asyncio.wait({done, task}, return_when=asyncio.FIRST_COMPLETED)
+        if not done.done():
+            task.result()
+            raise RuntimeError(f"{method} {path} returned without a response")
+        return status[0], b"".join(chunks)
+
+    async def websocket(self, path: str, client: int = 0) -> AsyncIterator[dict]:
+        """Yield JSON messages until the server closes the socket"""
+        inbox: asyncio.Queue = asyncio.Queue()
+        outbox: asyncio.Queue = asyncio.Queue()
+        await inbox.put({"type": "websocket.connect"})
+        scope = self._scope("websocket", path, client)
+        scope["subprotocols"] = []
+        task = asyncio.ensure_future(self.app(scope, inbox.get, outbox.put))
+        self._track(task)
+
+        async def next_message() -> dict:
+            getter = asyncio.ensure_future(outbox.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                return getter.result()
+            getter.cancel()
+            task.result()
+            return {"type": "websocket.close"}
+
+        try:
+            if (await next_message())["type"] != "websocket.accept":
+                raise RuntimeError(f"websocket {path} rejected")
+            while True:
+                message = await next_message()
+                if message["type"] == "websocket.close":
+                    return
+                yield json.loads(message.get("text") or message["bytes"])
+        finally:
+            if not task.done():
+                await inbox.put({"type": "websocket.disconnect", "code": 1000})
+
+
+def _fake_manager_class():
+    from app.services.download_manager import DownloadManager
+
+    class FakeDownloadManager(DownloadManager):
+        """``DownloadManager`` with yt-dlp replaced by a timed local write"""
+
+        job_seconds = 1.0
+        file_bytes = 256 * 1024
+
+        async def _extract_video_info(self, url, ydl_opts, timer):
+            await asyncio.sleep(0)
+            return {
+                "title": "Load test video",
+                "uploader": "bench",
+                "duration": 30,
+                "formats": [{"format_id": f"{h}p", "height": h} for h in (480, 720, 1080)],
+            }
+
+        async def _download_video_async(self, url, ydl_opts, session_id, timer):
+            steps = 4
+            for step in range(1, steps + 1):
+                await asyncio.sleep(self.job_seconds / steps)
+                self.active_downloads[session_id]["progress"] = step * 100 // steps
+
+            def write(path: str) -> None:
+                with open(path, "wb") as file:
+                    file.write(os.urandom(self.file_bytes))
+            await timer.run(None, self.executor, write, ydl_opts["outtmpl"])
+
+    return FakeDownloadManager
+
+
+class LagMonitor:
+    """Measure how late a short periodic sleep wakes up on the event loop"""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LAG_INTERVAL
+            await asyncio.sleep(LAG_INTERVAL)
+            self.samples.append(max(loop.time() - expected, 0.0))
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self._run())
+
+    def take(self) -> List[float]:
+        samples, self.samples = self.samples, []
+        return samples
+
+    def stop(self) -> None:
+        self._task.cancel()
+
+
+class LoadRun:
+    """Virtual users hitting the app for one scenario"""
+
+    def __init__(self, client: AsgiClient, finished: List[str]):
+        self.client = client
+        self.finished = finished
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.counter = 0
+
+    def _url(self) -> str:
+        self.counter += 1
+        return f"https://www.youtube.com/watch?v=bench{self.counter:06d}"
+
+    def _error(self, what: str) -> None:
+        self.errors[what] = self.errors.get(what, 0) + 1
+
+    async def _timed(self, method: str, path: str, body: Optional[dict], user: int,
+                     expect: int = 200) -> Optional[bytes]:
+        started = time.perf_counter()
+        status, content = await self.client.request(method, path, body, client=user)
+        self.latencies.append(time.perf_counter() - started)
+        if status != expect:
+            self._error(f"{method} {path.split('/')[3]} -> {status}")
+            return None
+        return content
+
+    async def download(self, user: int) -> None:
+        body = {"url": self._url(), "platform": "youtube", "quality": "medium"}
+        await self._timed("POST", "/api/v1/download", body, user)
+
+    async def batch(self, user: int) -> None:
+        body = {"urls": [self._url() for _ in range(BATCH_SIZE)],
+                "platform": "youtube", "quality": "medium"}
+        await self._timed("POST", "/api/v1/batch-download", body, user)
+
+    async def status(self, user: int) -> None:
+        await self._timed("GET", f"/api/v1/status/{random.choice(self.finished)}", None, user)
+
+    async def file(self, user: int) -> None:
+        await self._timed("GET", f"/api/v1/file/{random.choice(self.finished)}", None, user)
+
+    async def websocket(self, user: int) -> None:
+        body = {"url": self._url(), "platform": "youtube", "quality": "medium"}
+        _, content = await self.client.request("POST", "/api/v1/download", body, client=user)
+        session_id = json.loads(content)["session_id"]
+        started = time.perf_counter()
+        last = None
+        async for message in self.client.websocket(f"/api/v1/ws/{session_id}", client=user):
+            if last is None:
+                self.latencies.append(time.perf_counter() - started)
+            last = message
+        if last is None or last["status"] != "completed":
+            self._error("websocket closed before completion")
+
+    async def mixed(self, user: int) -> None:
+        action = random.choices(list(MIXED_WEIGHTS), weights=list(MIXED_WEIGHTS.values()))[0]
+        await getattr(self, action)(user)
+
+    async def run(self, scenario: str, users: int, duration: float) -> float:
+        deadline = time.perf_counter() + duration
+        action = getattr(self, scenario)
+
+        async def user_loop(user: int) -> None:
+            while time.perf_counter() < deadline:
+                try:
+                    await action(user)
+                except Exception as e:
+                    self._error(type(e).__name__)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user_loop(n) for n in range(users)))
+        return time.perf_counter() - started
+
+
+async def _prepare_sessions(client: AsgiClient, count: int) -> List[str]:
+    """Create finished downloads for the status and file scenarios"""
+    sessions = []
+    for n in range(count):
+        body = {"url": f"https://www.youtube.com/watch?v=seed{n:05d}",
+                "platform": "youtube", "quality": "medium"}
+        status, content = await client.request("POST", "/api/v1/download", body)
+        if status != 200:
+            raise RuntimeError(f"could not create a download: {status} {content[:200]}")
+        sessions.append(json.loads(content)["session_id"])
+    while client.background:
+        await asyncio.sleep(0.05)
+    return sessions
+
+
+async def bench(args: argparse.Namespace) -> None:
+    from app.api.dependencies import (
+        check_bulk_download_limit, check_download_limit, check_rate_limit)
+    from app.main import app
+    from app.services.download_manager import DownloadManager
+    from app.services.registry import registry
+
+    fake = _fake_manager_class()
+    fake.job_seconds = args.job_seconds
+    fake.file_bytes = args.file_kb * 1024
+    registry.override(DownloadManager, fake())
+    if not args.rate_limits:
+        for dependency in (check_rate_limit, check_download_limit, check_bulk_download_limit):
+            app.dependency_overrides[dependency] = lambda: None
+
+    client = AsgiClient(app, {"x-api-key": API_KEY, "user-agent": "bench-load"})
+    async with app.router.lifespan_context(app):
+        finished = await _prepare_sessions(client, args.sessions)
+        monitor = LagMonitor()
+        monitor.start()
+        print(f"{'scenario':10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} "
+              f"{'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'lag p99':>8} {'lag max':>8}")
+        for scenario in args.scenarios:
+            run = LoadRun(client, finished)
+            monitor.take()
+            wall = await run.run(scenario, args.users, args.duration)
+            lag = monitor.take() or [0.0]
+            latencies = run.latencies or [0.0]
+            print(f"{scenario:10} {len(run.latencies):9} {sum(run.errors.values()):7} "
+                  f"{len(run.latencies) / wall:9.0f} "
+                  f"{_percentile(latencies, 0.50) * 1000:8.1f} "
+                  f"{_percentile(latencies, 0.90) * 1000:8.1f} "
+                  f"{_percentile(latencies, 0.99) * 1000:8.1f} "
+                  f"{max(latencies) * 1000:8.1f} "
+                  f"{_percentile(lag, 0.99) * 1000:8.1f} {max(lag) * 1000:8.1f}")
+            for error, count in sorted(run.errors.items()):
+                print(f"{'':10} {count:9} x {error}")
+            # Let this scenario's background jobs drain before the next one
+            while client.background:
+                await asyncio.sleep(0.05)
+        monitor.stop()
+    if client.background_errors:
+        print(f"\n{client.background_errors} background tasks raised")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--sessions", type=int, default=32,
+                        help="finished downloads prepared for status and file")
+    parser.add_argument("--job-seconds", type=float, default=1.0)
+    parser.add_argument("--file-kb", type=int, default=256)
+    parser.add_argument("--rate-limits", action="store_true")
+    args = parser.parse_args()
+
+    # Settings are read at import, so configure before importing the app
+    folder = tempfile.mkdtemp(prefix="bench-load-")
+    os.environ.update({
+        "ENV": "production",
+        "REQUIRE_API_KEY": "true",
+        "WEBSITE_API_KEY": API_KEY,
+        "ADMIN_API_KEY": "bench-admin-key",
+        "DOWNLOAD_FOLDER": os.path.join(folder, "downloads"),
+        "STAGING_FOLDER": os.path.join(folder, "staging"),
+        "STORAGE_BACKEND": "local",
+    })
+    # Access and app logs would dominate the measurement
+    import logging
+    logging.disable(logging.CRITICAL)
+    try:
+        asyncio.run(bench(args))
+    finally:
+        import shutil
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Cost and correctness of a /metrics scrape as the worker count grows.
+
+Each scenario spawns ``--workers`` processes that import ``app.core.metrics``
+with ``PROMETHEUS_MULTIPROC_DIR`` set and record a realistic mix of series
+(download counters and histograms per platform, request metrics per
+endpoint, executor and worker gauges). A separate process then times
+``generate_metrics``, which merges every worker's files, and checks the
+merged counters and ``livesum`` gauges against what the workers recorded.
+The single-process registry is measured first as the baseline.
+
+Reports p50/p99 scrape time, CPU per scrape, exposition size and series.
+
+Usage (from app/api):
+    python -m benchmarks.bench_metrics_scrape
+    python -m benchmarks.bench_metrics_scrape --workers 1 4 16 32 --endpoints 200
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from typing import List, Optional
+
+PLATFORMS = ("tiktok", "youtube", "instagram", "facebook")
+QUALITIES = ("high", "medium", "low")
+STATUSES = (200, 404, 500)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _import_metrics(folder: Optional[str]):
+    # prometheus_client picks its value class when first imported
+    if folder is None:
+        os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    else:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = folder
+    from app.core import metrics
+    return metrics
+
+
+def _record(metrics, endpoints: int, observations: int) -> None:
+    """The series one busy worker ends up with"""
+    from app.core.stage_timer import STAGES
+    for platform in PLATFORMS:
+        metrics.ACTIVE_DOWNLOADS.labels(platform=platform).inc()
+        for quality in QUALITIES:
+            metrics.DOWNLOAD_REQUESTS.labels(platform=platform, quality=quality).inc(observations)
+            for n in range(observations):
+                metrics.DOWNLOAD_DURATION.labels(
+                    platform=platform, quality=quality).observe(n % 60)
+        for stage in STAGES:
+            metrics.DOWNLOAD_STAGE_DURATION.labels(platform=platform, stage=stage).observe(1.5)
+        metrics.DOWNLOAD_ERRORS.labels(platform=platform, error_type="DownloadError").inc()
+    for n in range(endpoints):
+        endpoint = f"/api/v1/bench/{n}"
+        metrics.REQUEST_LATENCY.labels(app_name="bench", endpoint=endpoint).observe(0.02)
+        for status in STATUSES:
+            metrics.REQUEST_COUNT.labels(
+                app_name="bench", method="GET", endpoint=endpoint, http_status=status).inc()
+    for executor in ("default", "download_manager", "s3_upload"):
+        metrics.EXECUTOR_QUEUE_LENGTH.labels(executor=executor).set(1)
+        metrics.EXECUTOR_ACTIVE_THREADS.labels(executor=executor).set(2)
+        metrics.EXECUTOR_TASK_WAIT.labels(executor=executor).observe(0.01)
+    metrics.WORKER_RESIDENT_MEMORY.set(200 * 2 ** 20)
+    metrics.SYSTEM_MEMORY_USAGE.set(8 * 2 ** 30)
+
+
+def worker(folder: str, endpoints: int, observations: int, ready, stop) -> None:
+    """Worker-process entry point: record series, then stay alive until told"""
+    _record(_import_metrics(folder), endpoints, observations)
+    ready.set()
+    # Live gauges only count while their worker is running
+    stop.wait()
+
+
+def _value(exposition: str, name: str) -> float:
+    return sum(
+        float(line.rsplit(" ", 1)[1]) for line in exposition.splitlines()
+        if line.startswith(name + "{") or line.startswith(name + " "))
+
+
+def scrape(folder: Optional[str], scrapes: int, endpoints: int, observations: int) -> dict:
+    """Scraper-process entry point: time ``scrapes`` expositions"""
+    metrics = _import_metrics(folder)
+    if folder is None:
+        # Baseline: the series of one worker in the ordinary registry
+        _record(metrics, endpoints, observations)
+    times: List[float] = []
+    cpu_before = time.process_time()
+    for _ in range(scrapes):
+        started = time.perf_counter()
+        body = metrics.generate_metrics()
+        times.append(time.perf_counter() - started)
+    cpu = time.process_time() - cpu_before
+    exposition = body.decode()
+    return {
+        "p50_ms": _percentile(times, 0.50) * 1000,
+        "p99_ms": _percentile(times, 0.99) * 1000,
+        "cpu_ms": cpu * 1000 / scrapes,
+        "kb": len(body) / 1024,
+        "series": sum(1 for line in exposition.splitlines()
+                      if line and not line.startswith("#")),
+        "requests": _value(exposition, "download_requests_total"),
+        "active": _value(exposition, "active_downloads"),
+        "files": len(os.listdir(folder)) if folder else 0,
+    }
+
+
+def run(workers: int, args: argparse.Namespace, context) -> dict:
+    """One scenario: ``workers`` live workers (0 for the single-process baseline)"""
+    if not workers:
+        with context.Pool(1) as pool:
+            return pool.apply(scrape, (None, args.scrapes, args.endpoints, args.observations))
+
+    folder = tempfile.mkdtemp(prefix="bench-metrics-")
+    stop = context.Event()
+    procs = []
+    try:
+        for _ in range(workers):
+            ready = context.Event()
+            proc = context.Process(
+                target=worker, daemon=True,
+                args=(folder, args.endpoints, args.observations, ready, stop))
+            proc.start()
+            procs.append((proc, ready))
+        for _, ready in procs:
+            ready.wait()
+        with context.Pool(1) as pool:
+            return pool.apply(scrape, (folder, args.scrapes, args.endpoints, args.observations))
+    finally:
+        stop.set()
+        for proc, _ in procs:
+            proc.join(timeout=10)
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, 8, 16])
+    parser.add_argument("--endpoints", type=int, default=60,
+                        help="route templates with request metrics per worker")
+    parser.add_argument("--observations", type=int, default=20,
+                        help="downloads recorded per platform and quality")
+    parser.add_argument("--scrapes", type=int, default=50)
+    args = parser.parse_args()
+
+    # Spawn, so each process imports prometheus_client with its own environment
+    context = multiprocessing.get_context("spawn")
+    per_worker = len(PLATFORMS) * len(QUALITIES) * args.observations
+    print(f"{'workers':>8} {'files':>6} {'series':>7} {'KB':>7} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'cpu ms':>7}  merged")
+    for workers in [0] + args.workers:
+        result = run(workers, args, context)
+        expected = (max(workers, 1) * per_worker, max(workers, 1) * len(PLATFORMS))
+        merged = (result["requests"], result["active"])
+        check = "ok" if merged == expected else f"WRONG {merged} != {expected}"
+        label = workers or "single"
+        print(f"{label:>8} {result['files']:6} {result['series']:7} {result['kb']:7.0f} "
+              f"{result['p50_ms']:8.1f} {result['p99_ms']:8.1f} {result['cpu_ms']:7.1f}  {check}")
+
+
+if __name__ == "__main__":
+    main()
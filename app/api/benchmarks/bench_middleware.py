@@ -0,0 +1,128 @@
+"""
+Microbenchmark of requests/sec on ``/health`` for the middleware stack.
+
+Compares the stack main.py installed before (two ``@app.middleware("http")``
+functions) against ``RequestContextMiddleware``. Both keep the session and
+CORS middlewares, and both apps are driven in-process through ``httpx.ASGITransport`` so no sockets are
+involved and only middleware and routing overhead is measured.
+
+Usage (from app/api):
+    python -m benchmarks.bench_middleware --requests 5000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.middleware.sessions import SessionMiddleware
+
+from app.core.middleware import RequestContextMiddleware
+
+API_KEYS = ("admin-key", "website-key")
+
+
+def _health_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "ok"}
+
+    @app.get("/protected")
+    async def protected():
+        return {"status": "ok"}
+
+    return app
+
+
+def _add_session_and_cors(app: FastAPI) -> None:
+    app.add_middleware(SessionMiddleware, secret_key="bench")
+    app.add_middleware(
+        CORSMiddleware, allow_origins=["http://localhost:3000"],
+        allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+
+
+def build_legacy_app() -> FastAPI:
+    """The middleware stack main.py installed before RequestContextMiddleware"""
+    app = _health_app()
+    _add_session_and_cors(app)
+
+    @app.middleware("http")
+    async def add_request_id(request: Request, call_next):
+        request.state.request_id = str(uuid.uuid4())
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request.state.request_id
+        return response
+
+    @app.middleware("http")
+    async def api_key_middleware(request: Request, call_next):
+        if request.method == "OPTIONS":
+            return await call_next(request)
+        for path in ("/docs", "/redoc", "/openapi.json", "/health"):
+            if request.url.path.startswith(path):
+                return await call_next(request)
+        try:
+            session_api_key = request.session.get("api_key")
+        except AssertionError:
+            # Outside SessionMiddleware, as in main.py then
+            session_api_key = None
+        api_key = session_api_key or request.headers.get("X-API-Key")
+        if not api_key:
+            return JSONResponse(status_code=401, content={"detail": "API key is missing"})
+        if api_key in API_KEYS:
+            return await call_next(request)
+        return JSONResponse(status_code=403, content={"detail": "Invalid API key"})
+
+    return app
+
+
+def build_asgi_app() -> FastAPI:
+    """The current single pure-ASGI middleware"""
+    app = _health_app()
+    app.add_middleware(RequestContextMiddleware, api_keys=API_KEYS)
+    _add_session_and_cors(app)
+    return app
+
+
+async def run(app: FastAPI, path: str, requests: int, concurrency: int) -> float:
+    """Return requests/sec for ``requests`` GETs of ``path``"""
+    transport = httpx.ASGITransport(app=app)
+    headers = {"X-API-Key": API_KEYS[1]}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up routing and metric label caches
+        for _ in range(50):
+            await client.get(path, headers=headers)
+
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                response = await client.get(path, headers=headers)
+                assert response.status_code == 200, response.status_code
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    for path in ("/health", "/protected"):
+        before = asyncio.run(run(build_legacy_app(), path, args.requests, args.concurrency))
+        after = asyncio.run(run(build_asgi_app(), path, args.requests, args.concurrency))
+        print(f"{path:12} before: {before:8.0f} req/s  after: {after:8.0f} req/s  "
+              f"({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+End-to-end benchmark of the download pipeline, fully offline.
+
+A ``media_origin`` process serves synthetic progressive MP4, HLS and DASH
+media, and the ``bench:origin`` test extractor (``benchmarks/yt_dlp_plugins``)
+resolves its URLs, so ``DownloadManager``, ``TikTokService``,
+``FacebookService``, ``InstagramDownloader`` and ``AudioExtractorService``
+run their real yt-dlp, staging and publish paths without internet.
+Instagram jobs use ``instagram.com/reel/bench-...`` URLs so the
+downloader's URL validation passes. Each scenario runs in a fresh
+process with its own download folder, so peak RSS and CPU time belong to
+that scenario alone.
+
+Reports throughput, p50/p99 job latency, peak RSS and CPU per job. Results
+can be saved as a JSON baseline and later runs compared against it; the
+exit status is 1 when a metric regresses past ``--tolerance``. Audio
+extraction needs ffmpeg and is skipped without it.
+
+Usage (from app/api):
+    python -m benchmarks.bench_pipeline --jobs 24 --concurrency 4
+    python -m benchmarks.bench_pipeline --save benchmarks/baselines/pipeline.json
+    python -m benchmarks.bench_pipeline --compare benchmarks/baselines/pipeline.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from benchmarks import media_origin
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICES = ("manager", "tiktok", "facebook", "instagram", "audio")
+# metric -> True when higher is better
+METRICS = {
+    "jobs_per_s": True,
+    "mb_per_s": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False,
+    "cpu_ms_per_job": False,
+}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _folder_bytes(folder: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(folder) for name in names
+        if not name.endswith((".db", ".db-wal", ".db-shm")))
+
+
+def _job_factory(service: str):
+    """Return an async ``job(url)`` driving ``service`` the way the API does"""
+    if service == "manager":
+        from app.models.download import DownloadStatus, Platform, VideoQuality
+        from app.services.download_manager import DownloadManager
+        manager = DownloadManager()
+
+        async def job(url: str) -> None:
+            session_id = await manager.create_download(url, Platform.YOUTUBE)
+            response = await manager.process_download(
+                session_id, url, Platform.YOUTUBE, VideoQuality.MEDIUM, time.time())
+            if response.status != DownloadStatus.COMPLETED:
+                raise RuntimeError(response.error or "download failed")
+        return job
+    if service == "tiktok":
+        from app.services.tiktok import TikTokService
+        return lambda url: TikTokService().download_video(url, "medium")
+    if service == "facebook":
+        from app.services.facebook import FacebookService
+        return lambda url: FacebookService().download_video(url, "medium")
+    if service == "instagram":
+        from app.models.instagram import InstagramDownloadRequest
+        from app.services.instagram import InstagramDownloader
+        downloader = InstagramDownloader()
+        return lambda url: downloader.download(
+            InstagramDownloadRequest(url=url, quality="medium"))
+    from app.services.audio_extractor import AudioExtractorService
+    return lambda url: AudioExtractorService().extract_audio(url)
+
+
+def run_scenario(service: str, kind: str, base_url: str, jobs: int,
+                 concurrency: int, folder: str) -> dict:
+    """Worker-process entry point: run ``jobs`` downloads and measure them"""
+    os.environ["DOWNLOAD_FOLDER"] = os.path.join(folder, "downloads")
+    os.environ["STAGING_FOLDER"] = os.path.join(folder, "staging")
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["BENCH_ORIGIN_URL"] = base_url
+    # The Instagram downloader always passes a cookie file; give it an empty one
+    cookies = os.path.join(folder, "cookies.txt")
+    with open(cookies, "w") as file:
+        file.write("# Netscape HTTP Cookie File\n")
+    os.environ["INSTAGRAM_COOKIES_FILE"] = cookies
+    # yt-dlp and the services print progress and warnings; keep the table readable
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    # Makes the yt_dlp_plugins namespace package (bench:origin) importable
+    sys.path.insert(0, BENCH_DIR)
+
+    job = _job_factory(service)
+    downloads = os.environ["DOWNLOAD_FOLDER"]
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    async def timed(semaphore: asyncio.Semaphore, n: int) -> None:
+        if service == "instagram":
+            url = f"https://www.instagram.com/reel/bench-{kind}-{n}/"
+        else:
+            url = f"{base_url}/bench/{kind}/{service}-{kind}-{n}"
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await job(url)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(str(e))
+
+    async def run_all() -> float:
+        # One warm-up job pays for imports and yt-dlp extractor loading
+        await timed(asyncio.Semaphore(1), -1)
+        latencies.clear()
+        errors.clear()
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(timed(semaphore, n) for n in range(jobs)))
+        return time.perf_counter() - started
+
+    published_before = _folder_bytes(downloads)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    cpu_before = time.process_time()
+    wall = asyncio.run(run_all())
+    cpu = time.process_time() - cpu_before
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    published = _folder_bytes(downloads) - published_before
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    result = {
+        "jobs": jobs,
+        "failed": len(errors),
+        "first_error": errors[0] if errors else None,
+        "peak_rss_mb": peak_rss * rss_unit / 2 ** 20,
+        "rss_growth_mb": (peak_rss - rss_before) * rss_unit / 2 ** 20,
+        "cpu_ms_per_job": cpu * 1000 / jobs,
+    }
+    if latencies:
+        result.update({
+            "jobs_per_s": len(latencies) / wall,
+            "mb_per_s": published / 2 ** 20 / wall,
+            "p50_ms": _percentile(latencies, 0.50) * 1000,
+            "p99_ms": _percentile(latencies, 0.99) * 1000,
+        })
+    return result
+
+
+def _compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> int:
+    regressions = 0
+    print(f"\n{'scenario':20} {'metric':16} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current["failed"] > previous.get("failed", 0):
+            regressions += 1
+            print(f"{name:20} {'failed':16} {previous.get('failed', 0):10} "
+                  f"{current['failed']:10}          REGRESSION")
+        for metric, higher_is_better in METRICS.items():
+            if metric not in current or not previous.get(metric):
+                continue
+            change = current[metric] / previous[metric] - 1
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > tolerance else ""
+            regressions += bool(flag)
+            print(f"{name:20} {metric:16} {previous[metric]:10.1f} "
+                  f"{current[metric]:10.1f} {change:+7.0%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=24)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--size-mb", type=float, default=4,
+                        help="size of the 1080p rendition of each clip")
+    parser.add_argument("--segments", type=int, default=8)
+    parser.add_argument("--services", nargs="+", choices=SERVICES, default=list(SERVICES))
+    parser.add_argument("--kinds", nargs="+", choices=media_origin.KINDS,
+                        default=list(media_origin.KINDS))
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare with a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed relative regression before failing")
+    args = parser.parse_args()
+
+    # Spawn, so every scenario starts without state from earlier ones
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    origin = context.Process(
+        target=media_origin.serve, daemon=True,
+        args=(sender, int(args.size_mb * 2 ** 20), args.segments))
+    origin.start()
+    base_url, real_media = receiver.recv()
+
+    results: Dict[str, dict] = {}
+    print(f"{'scenario':20} {'ok':>5} {'jobs/s':>8} {'MB/s':>8} {'p50 ms':>9} "
+          f"{'p99 ms':>9} {'peak MB':>8} {'cpu ms/job':>11}")
+    try:
+        for service in args.services:
+            # Audio extraction decodes the media, so it needs ffmpeg and a real clip
+            kinds = ["mp4"] if service == "audio" else args.kinds
+            for kind in kinds:
+                name = f"{service}/{kind}"
+                if service == "audio" and not real_media:
+                    print(f"{name:20} skipped: ffmpeg not installed")
+                    continue
+                folder = tempfile.mkdtemp(prefix="bench-pipeline-")
+                try:
+                    with ProcessPoolExecutor(1, mp_context=context) as pool:
+                        result = pool.submit(
+                            run_scenario, service, kind, base_url,
+                            args.jobs, args.concurrency, folder).result()
+                finally:
+                    shutil.rmtree(folder, ignore_errors=True)
+                results[name] = result
+                ok = result["jobs"] - result["failed"]
+                if not ok:
+                    print(f"{name:20} {ok:5} all jobs failed: {result['first_error']}")
+                    continue
+                print(f"{name:20} {ok:5} {result['jobs_per_s']:8.1f} "
+                      f"{result['mb_per_s']:8.1f} {result['p50_ms']:9.0f} "
+                      f"{result['p99_ms']:9.0f} {result['peak_rss_mb']:8.0f} "
+                      f"{result['cpu_ms_per_job']:11.1f}")
+    finally:
+        origin.terminate()
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as file:
+            json.dump({
+                "params": {k: getattr(args, k) for k in
+                           ("jobs", "concurrency", "size_mb", "segments")},
+                "environment": {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "cpus": os.cpu_count(),
+                    "ffmpeg": real_media,
+                },
+                "scenarios": results,
+            }, file, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if baseline["params"] != {k: getattr(args, k) for k in baseline["params"]}:
+            print("\nwarning: baseline was recorded with different parameters: "
+                  f"{baseline['params']}")
+        if _compare(results, baseline["scenarios"], args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark of per-request service and HTTP client overhead.
+
+Compares building a service (and its download folder check and option
+dicts) on every request with a registry lookup, and opening a new
+``httpx.AsyncClient`` per outbound call with the shared pooled client.
+Outbound calls go to a local keep-alive HTTP server, so no internet is used.
+
+Usage (from app/api):
+    python -m benchmarks.bench_services --iterations 2000
+"""
+import argparse
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from app.services.audio_extractor import AudioExtractorService
+from app.services.facebook import FacebookService
+from app.services.registry import ServiceRegistry
+from app.services.tiktok import TikTokService
+from app.services.youtube import YouTubeService
+
+SERVICES = (TikTokService, FacebookService, YouTubeService, AudioExtractorService)
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_services(iterations: int) -> None:
+    registry = ServiceRegistry()
+    print(f"{'service':24} {'new per request':>18} {'registry lookup':>18}")
+    for service_class in SERVICES:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            service_class()
+        construct = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            registry.get(service_class)
+        lookup = (time.perf_counter() - start) / iterations
+
+        print(f"{service_class.__name__:24} {construct * 1e6:15.1f} us "
+              f"{lookup * 1e6:15.2f} us")
+
+
+async def bench_http(url: str, iterations: int) -> None:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        async with httpx.AsyncClient() as client:
+            (await client.get(url)).raise_for_status()
+    per_call_client = (time.perf_counter() - start) / iterations
+
+    registry = ServiceRegistry()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        (await registry.http_client.get(url)).raise_for_status()
+    shared_client = (time.perf_counter() - start) / iterations
+    await registry.shutdown()
+
+    print(f"\n{'outbound GET':24} {'client per call':>18} {'shared client':>18}")
+    print(f"{'local keep-alive server':24} {per_call_client * 1e6:15.1f} us "
+          f"{shared_client * 1e6:15.1f} us  ({per_call_client / shared_client:.1f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    bench_services(args.iterations)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/"
+        asyncio.run(bench_http(url, max(args.iterations // 4, 1)))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
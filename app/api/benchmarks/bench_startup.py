@@ -0,0 +1,87 @@
+"""
+Startup-time benchmark reporting import time per module.
+
+Imports ``app.main`` in fresh interpreters with ``-X importtime`` and reports
+the median self and cumulative import time of the slowest modules, plus the
+application's own modules, so heavy eager imports are easy to spot.
+
+Usage (from app/api):
+    python -m benchmarks.bench_startup --repeat 5 --top 20
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure_once(target: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """Import ``target`` in a new interpreter and return wall time and per-module timings"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="0")
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    wall = time.perf_counter() - start
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, module = match.groups()
+            modules[module] = (int(self_us), int(cumulative_us))
+    return wall, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--prefix", default="app.",
+                        help="Always report modules with this prefix")
+    args = parser.parse_args()
+
+    walls: List[float] = []
+    self_times: Dict[str, List[int]] = defaultdict(list)
+    cumulative_times: Dict[str, List[int]] = defaultdict(list)
+    for _ in range(args.repeat):
+        wall, modules = measure_once(args.target)
+        walls.append(wall)
+        for module, (self_us, cumulative_us) in modules.items():
+            self_times[module].append(self_us)
+            cumulative_times[module].append(cumulative_us)
+
+    cumulative = {m: statistics.median(t) for m, t in cumulative_times.items()}
+    own = {m: statistics.median(t) for m, t in self_times.items()}
+
+    print(f"Interpreter start + import {args.target}: "
+          f"median {statistics.median(walls) * 1000:.0f} ms over {args.repeat} runs")
+    print(f"\n{'module':60} {'self ms':>10} {'cumul ms':>10}")
+
+    slowest = sorted(cumulative, key=cumulative.get, reverse=True)[:args.top]
+    for module in slowest:
+        print(f"{module:60} {own[module] / 1000:10.1f} {cumulative[module] / 1000:10.1f}")
+
+    print(f"\nModules under {args.prefix}")
+    for module in sorted(cumulative):
+        if module.startswith(args.prefix):
+            print(f"{module:60} {own[module] / 1000:10.1f} {cumulative[module] / 1000:10.1f}")
+
+    heavy = [m for m in ("yt_dlp", "bcrypt", "passlib") if m in cumulative]
+    if heavy:
+        print(f"\nWarning: imported eagerly: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    main()
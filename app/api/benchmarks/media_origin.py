@@ -0,0 +1,261 @@
+"""
+Local HTTP origin serving synthetic media for the offline benchmarks.
+
+Every video id is available as progressive MP4, HLS and DASH in three
+renditions (480p, 720p, 1080p). Payloads are cut from one random block,
+so the origin costs almost nothing next to the client being measured.
+When ffmpeg is installed, progressive MP4s are a real encoded clip
+instead, so post-processors that decode (audio extraction) can run.
+
+    /bench/<mp4|hls|dash>/<id>        watch page, for the test extractor
+    /api/<id>.json                    metadata
+    /media/<id>_<height>.mp4          progressive download (Range aware)
+    /hls/<id>/master.m3u8             master playlist
+    /hls/<id>/<height>/index.m3u8     media playlist of .ts segments
+    /dash/<id>/manifest.mpd           muxed video+audio representations
+    /dash/<id>/<height>/<n>.m4s       init (n=0) and media segments
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.connection import Connection
+from typing import Optional
+
+HEIGHTS = (480, 720, 1080)
+KINDS = ("mp4", "hls", "dash")
+SEGMENT_SECONDS = 2
+_BLOCK = os.urandom(1 << 20)
+_TS_PACKET = 188
+
+
+def _scaled(size: int, height: int) -> int:
+    # Lower renditions are proportionally smaller, like real ladders
+    return max(size * height // HEIGHTS[-1], _TS_PACKET)
+
+
+def _seed(video_id: str) -> int:
+    # Distinct bytes per id, so the content store cannot dedupe jobs
+    return zlib.crc32(video_id.encode())
+
+
+def _encode_clip(seconds: int, folder: str) -> Optional[str]:
+    """Encode a test-pattern clip with audio, or None without ffmpeg"""
+    if shutil.which("ffmpeg") is None:
+        return None
+    path = os.path.join(folder, "clip.mp4")
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y",
+         "-f", "lavfi", "-i", f"testsrc=duration={seconds}:size=640x360:rate=25",
+         "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+         "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac",
+         "-shortest", "-movflags", "+faststart", path],
+        check=True)
+    return path
+
+
+class _OriginHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "MediaOrigin"
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        for pattern, handler in self._ROUTES:
+            match = re.fullmatch(pattern, path)
+            if match:
+                return handler(self, *match.groups())
+        self._send(404, b"not found", "text/plain")
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, size: int, content_type: str, head: bytes = b"", seed: int = 0) -> None:
+        """Send ``size`` bytes of ``head`` followed by filler, honouring Range"""
+        start, end = 0, size - 1
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if match and match.group(1):
+            start = int(match.group(1))
+            end = min(int(match.group(2) or end), end)
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        position = start
+        while position <= end:
+            if position < len(head):
+                chunk = head[position:end + 1]
+            else:
+                offset = (position - len(head) + seed) % len(_BLOCK)
+                chunk = _BLOCK[offset:offset + end + 1 - position]
+            self.wfile.write(chunk)
+            position += len(chunk)
+
+    def _page(self, kind, video_id):
+        body = (f"<html><head><title>{video_id}</title></head>"
+                f"<body data-kind=\"{kind}\"></body></html>").encode()
+        self._send(200, body, "text/html")
+
+    def _metadata(self, video_id):
+        body = json.dumps({
+            "id": video_id,
+            "title": f"Benchmark clip {video_id}",
+            "uploader": "bench",
+            "duration": self.server.segments * SEGMENT_SECONDS,
+        }).encode()
+        self._send(200, body, "application/json")
+
+    def _progressive(self, video_id, height):
+        clip = self.server.clip
+        if clip is not None:
+            return self._stream(len(clip), "video/mp4", clip)
+        # ftyp box so sniffers see an MP4, then filler
+        head = b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2"
+        self._stream(_scaled(self.server.size, int(height)), "video/mp4", head,
+                     _seed(video_id))
+
+    def _hls_master(self, video_id):
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+        for height in HEIGHTS:
+            bandwidth = _scaled(self.server.size, height) * 8 // (
+                self.server.segments * SEGMENT_SECONDS)
+            lines += [
+                f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},"
+                f"RESOLUTION={height * 16 // 9}x{height},"
+                "CODECS=\"avc1.64001f,mp4a.40.2\"",
+                f"{height}/index.m3u8",
+            ]
+        self._send(200, "\n".join(lines + [""]).encode(),
+                   "application/vnd.apple.mpegurl")
+
+    def _hls_media(self, video_id, height):
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3",
+                 f"#EXT-X-TARGETDURATION:{SEGMENT_SECONDS}",
+                 "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:VOD"]
+        for n in range(self.server.segments):
+            lines += [f"#EXTINF:{SEGMENT_SECONDS:.1f},", f"{n}.ts"]
+        lines.append("#EXT-X-ENDLIST")
+        self._send(200, "\n".join(lines + [""]).encode(),
+                   "application/vnd.apple.mpegurl")
+
+    def _hls_segment(self, video_id, height, n):
+        size = _scaled(self.server.size, int(height)) // self.server.segments
+        # Whole TS packets, each starting with the 0x47 sync byte
+        packets = max(size // _TS_PACKET, 1)
+        offset = (_seed(video_id) + int(n) * _TS_PACKET) % (len(_BLOCK) - _TS_PACKET)
+        packet = b"\x47" + _BLOCK[offset:offset + _TS_PACKET - 1]
+        self._send(200, packet * packets, "video/mp2t")
+
+    def _dash_manifest(self, video_id):
+        duration = self.server.segments * SEGMENT_SECONDS
+        representations = "".join(
+            f'<Representation id="{height}" width="{height * 16 // 9}" '
+            f'height="{height}" bandwidth="{_scaled(self.server.size, height) * 8 // duration}" '
+            f'codecs="avc1.64001f,mp4a.40.2">'
+            f'<SegmentTemplate timescale="1" duration="{SEGMENT_SECONDS}" '
+            f'startNumber="1" initialization="{height}/0.m4s" media="{height}/$Number$.m4s"/>'
+            f'</Representation>'
+            for height in HEIGHTS)
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" '
+            f'mediaPresentationDuration="PT{duration}S" minBufferTime="PT2S" '
+            'profiles="urn:mpeg:dash:profile:isoff-on-demand:2011">'
+            f'<Period duration="PT{duration}S">'
+            '<AdaptationSet mimeType="video/mp4" segmentAlignment="true">'
+            f'{representations}</AdaptationSet></Period></MPD>')
+        self._send(200, body.encode(), "application/dash+xml")
+
+    def _dash_segment(self, video_id, height, n):
+        if n == "0":
+            return self._send(200, b"\x00\x00\x00\x18ftypiso6" + _BLOCK[:1024],
+                              "video/mp4")
+        size = _scaled(self.server.size, int(height)) // self.server.segments
+        self._stream(size, "video/iso.segment", seed=_seed(video_id) + int(n) * size)
+
+    _ROUTES = (
+        (r"/bench/(mp4|hls|dash)/([\w-]+)", _page),
+        (r"/api/([\w-]+)\.json", _metadata),
+        (r"/media/([\w-]+)_(\d+)\.mp4", _progressive),
+        (r"/hls/([\w-]+)/master\.m3u8", _hls_master),
+        (r"/hls/([\w-]+)/(\d+)/index\.m3u8", _hls_media),
+        (r"/hls/([\w-]+)/(\d+)/(\d+)\.ts", _hls_segment),
+        (r"/dash/([\w-]+)/manifest\.mpd", _dash_manifest),
+        (r"/dash/([\w-]+)/(\d+)/(\d+)\.m4s", _dash_segment),
+    )
+
+
+class MediaOrigin(ThreadingHTTPServer):
+    """
+    Serve synthetic media on 127.0.0.1 from a daemon thread.
+
+    ``size`` is the byte size of the 1080p rendition; HLS and DASH split
+    it into ``segments`` pieces. Use as a context manager.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, size: int = 4 << 20, segments: int = 8, real_media: bool = True):
+        super().__init__(("127.0.0.1", 0), _OriginHandler)
+        self.size = size
+        self.segments = segments
+        self.clip: Optional[bytes] = None
+        if real_media:
+            with tempfile.TemporaryDirectory() as folder:
+                path = _encode_clip(segments * SEGMENT_SECONDS, folder)
+                if path is not None:
+                    with open(path, "rb") as file:
+                        self.clip = file.read()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def url(self, kind: str, video_id: str) -> str:
+        """Watch-page URL the test extractor resolves"""
+        return f"{self.base_url}/bench/{kind}/{video_id}"
+
+    def __enter__(self) -> "MediaOrigin":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def serve(conn: Connection, size: int, segments: int, real_media: bool = True) -> None:
+    """
+    Process target: run an origin until terminated.
+
+    Sends ``(base_url, has_real_media)`` on ``conn`` once listening, so
+    a benchmark can keep the origin's CPU and memory out of its numbers.
+    """
+    origin = MediaOrigin(size, segments, real_media)
+    conn.send((origin.base_url, origin.clip is not None))
+    conn.close()
+    origin.serve_forever()
@@ -0,0 +1,66 @@
+"""
+yt-dlp extractors for the benchmark media origin.
+
+yt-dlp discovers them through the ``yt_dlp_plugins`` namespace package
+once ``benchmarks/`` is on ``sys.path`` (``bench_pipeline`` does this),
+and plugin extractors are tried before the built-in ones.
+"""
+import os
+
+from yt_dlp.extractor.common import InfoExtractor
+
+HEIGHTS = (480, 720, 1080)
+
+
+class BenchOriginIE(InfoExtractor):
+    IE_NAME = 'bench:origin'
+    _VALID_URL = r'(?P<base>https?://(?:127\.0\.0\.1|localhost)(?::\d+)?)/bench/(?P<kind>mp4|hls|dash)/(?P<id>[\w-]+)'
+
+    def _real_extract(self, url):
+        base, kind, video_id = self._match_valid_url(url).group('base', 'kind', 'id')
+        return self._extract_from_origin(base, kind, video_id)
+
+    def _extract_from_origin(self, base, kind, video_id):
+        # A page and an API call, like the real platform extractors
+        self._download_webpage(f'{base}/bench/{kind}/{video_id}', video_id)
+        metadata = self._download_json(f'{base}/api/{video_id}.json', video_id)
+
+        if kind == 'hls':
+            formats = self._extract_m3u8_formats(
+                f'{base}/hls/{video_id}/master.m3u8', video_id, 'mp4',
+                entry_protocol='m3u8_native')
+        elif kind == 'dash':
+            formats = self._extract_mpd_formats(
+                f'{base}/dash/{video_id}/manifest.mpd', video_id)
+        else:
+            formats = [{
+                'format_id': f'{height}p',
+                'url': f'{base}/media/{video_id}_{height}.mp4',
+                'ext': 'mp4',
+                'width': height * 16 // 9,
+                'height': height,
+                'vcodec': 'avc1.64001f',
+                'acodec': 'mp4a.40.2',
+            } for height in HEIGHTS]
+
+        return {
+            'id': video_id,
+            'title': metadata['title'],
+            'uploader': metadata['uploader'],
+            'duration': metadata['duration'],
+            'formats': formats,
+        }
+
+
+class BenchInstagramIE(BenchOriginIE):
+    """
+    Instagram-shaped URLs with a ``bench-<kind>-`` id, for code that
+    validates the platform URL before calling yt-dlp. The origin is
+    taken from ``BENCH_ORIGIN_URL``.
+    """
+    IE_NAME = 'bench:instagram'
+    _VALID_URL = r'https?://(?:www\.)?instagram\.com/(?:p|reel)/bench-(?P<kind>mp4|hls|dash)-(?P<id>[\w-]+)'
+
+    def _real_extract(self, url):
+        kind, video_id = self._match_valid_url(url).group('kind', 'id')
+        return self._extract_from_origin(os.environ['BENCH_ORIGIN_URL'], kind, video_id)
@@ -0,0 +1,112 @@
+import functools
+import json
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from app.services.batch_engine import (
+    DONE,
+    FAILED,
+    SKIPPED,
+    BatchDownloader,
+    url_archive_key
+)
+
+
+class Handler(SimpleHTTPRequestHandler):
+    requests = []
+    delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        Handler.requests.append(self.path)
+        super().do_GET()
+
+    def copyfile(self, source, outputfile):
+        # Trickle the body out when a test needs a download in progress
+        while True:
+            chunk = source.read(64 * 1024)
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            time.sleep(self.delay)
+
+
+@pytest.fixture
+def origin(tmp_path):
+    """A local server of three videos; yields its base URL"""
+    media = tmp_path / "media"
+    media.mkdir()
+    for name in ("a", "b", "c"):
+        (media / f"{name}.mp4").write_bytes(bytes(256 * 1024))
+    Handler.requests, Handler.delay = [], 0.0
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(Handler, directory=str(media)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def _engine(tmp_path, checkpoint="urls.progress.jsonl", **kwargs):
+    return BatchDownloader(
+        {}, output_dir=str(tmp_path / "out"), workers=4,
+        archive=str(tmp_path / "out" / "archive.txt"),
+        checkpoint=str(tmp_path / checkpoint), **kwargs)
+
+
+def test_rerun_skips_what_is_already_downloaded(origin, tmp_path):
+    urls = [f"{origin}/{name}.mp4" for name in ("a", "b", "c", "missing")]
+    results = []
+    progress = _engine(tmp_path, on_result=results.append).run(urls + urls[:1])
+
+    assert (progress.total, progress.done, progress.failed) == (4, 3, 1)
+    assert progress.bytes_downloaded == 3 * 256 * 1024
+    assert sorted((tmp_path / "out" / "archive.txt").read_text().split("\n")) == [
+        "", "generic a", "generic b", "generic c"]
+    statuses = {r.url: r.status for r in results}
+    assert statuses == {**dict.fromkeys(urls[:3], DONE), urls[3]: FAILED}
+    assert all(r.info["id"] for r in results if r.status == DONE)
+
+    # Same list: finished URLs are skipped without a request, failures retried
+    Handler.requests, results = [], []
+    progress = _engine(tmp_path, on_result=results.append).run(urls)
+    assert (progress.skipped, progress.failed) == (3, 1)
+    statuses = {r.url: r.status for r in results}
+    assert statuses == {**dict.fromkeys(urls[:3], SKIPPED), urls[3]: FAILED}
+    assert Handler.requests == ["/missing.mp4"]
+    lines = (tmp_path / "urls.progress.jsonl").read_text().splitlines()
+    assert [json.loads(line)["status"] for line in lines].count(FAILED) == 2
+
+    # Another list: the archive still skips the videos after extraction
+    progress = _engine(tmp_path, checkpoint="other.progress.jsonl").run(urls[:3])
+    assert (progress.skipped, progress.bytes_downloaded) == (3, 0)
+
+
+def test_stop_aborts_downloads_for_the_next_run(origin, tmp_path):
+    Handler.delay = 0.2
+    engine = _engine(tmp_path)
+    urls = [f"{origin}/{name}.mp4" for name in ("a", "b", "c")]
+    runner = threading.Thread(target=engine.run, args=(urls,))
+    runner.start()
+    while not engine.progress().bytes_downloaded:
+        time.sleep(0.01)
+    engine.stop()
+    runner.join(timeout=5)
+
+    assert not runner.is_alive()
+    assert engine.progress().finished == 0
+    assert list((tmp_path / "out").glob("*.part"))
+    assert not (tmp_path / "urls.progress.jsonl").read_text()
+
+    Handler.delay = 0.0
+    assert _engine(tmp_path).run(urls).done == 3
+
+
+def test_archive_key_read_from_url():
+    assert url_archive_key(
+        "https://www.tiktok.com/@user/video/7234567890123456789"
+    ) == "tiktok 7234567890123456789"
+    assert url_archive_key("https://www.instagram.com/reel/Cabc123/") == "instagram Cabc123"
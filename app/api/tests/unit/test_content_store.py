@@ -0,0 +1,167 @@
+import os
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+from app.services.storage import ContentStore, hash_file
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ContentStore(
+        root=str(tmp_path), default_ttl=60,
+        staging_folder=str(tmp_path / ".staging"))
+    yield store
+    store.close()
+
+
+def _write(store: ContentStore, filename: str, data: bytes) -> str:
+    relative_path = store.allocate(filename)
+    with open(store.path(relative_path), "wb") as file:
+        file.write(data)
+    return relative_path
+
+
+def test_allocate_shards_files(store: ContentStore):
+    relative_path = store.allocate("tiktok_1.mp4")
+    shard_a, shard_b, name = relative_path.split("/")
+    assert len(shard_a) == len(shard_b) == 2
+    assert name == "tiktok_1.mp4"
+    assert os.path.isdir(os.path.dirname(store.path(relative_path)))
+
+
+def test_identical_files_share_one_blob(store: ContentStore):
+    first = _write(store, "tiktok_1.mp4", b"same bytes")
+    second = _write(store, "youtube_2.mp4", b"same bytes")
+
+    digest = store.publish(first)
+    assert store.publish(second) == digest
+    assert digest == hash_file(store.path(first))
+
+    assert os.path.samefile(store.path(first), store.path(second))
+    assert os.path.samefile(store.path(first), store.blob_path(digest, ".mp4"))
+    assert store.refcount(digest) == 2
+    assert store.usage() == len(b"same bytes")
+
+
+def test_different_content_gets_own_blob(store: ContentStore):
+    first = _write(store, "a.mp4", b"one")
+    second = _write(store, "b.mp4", b"two")
+    assert store.publish(first) != store.publish(second)
+    assert store.usage() == 6
+
+
+def test_release_drops_blob_with_last_link(store: ContentStore):
+    first = _write(store, "a.mp4", b"data")
+    second = _write(store, "b.mp4", b"data")
+    digest = store.publish(first)
+    store.publish(second)
+
+    store.release(first)
+    assert not os.path.exists(store.path(first))
+    assert store.refcount(digest) == 1
+
+    store.release(second)
+    assert not os.path.exists(store.blob_path(digest, ".mp4"))
+    assert store.usage() == 0
+
+
+def test_expire_uses_index(store: ContentStore):
+    old = _write(store, "old.mp4", b"old")
+    new = _write(store, "new.mp4", b"new")
+    store.publish(old, session_id="s1", expires_at=time.time() - 1)
+    store.publish(new, session_id="s2")
+
+    assert store.expire() == [(old, "s1")]
+    assert not os.path.exists(store.path(old))
+    assert os.path.exists(store.path(new))
+
+
+def test_claim_updates_session_and_expiry(store: ContentStore):
+    relative_path = _write(store, "a.mp4", b"data")
+    store.publish(relative_path)
+    store.claim(relative_path, "session", time.time() - 1)
+    assert store.index.files_for_session("session") == [relative_path]
+    assert store.expire() == [(relative_path, "session")]
+
+
+def test_publish_is_idempotent(store: ContentStore):
+    relative_path = _write(store, "a.mp4", b"data")
+    digest = store.publish(relative_path)
+    assert store.publish(relative_path) == digest
+    assert store.refcount(digest) == 1
+
+
+def test_recover_after_restart(store: ContentStore):
+    """Missing files are dropped, flat legacy files indexed, orphans collected."""
+    gone = _write(store, "gone.mp4", b"gone")
+    digest = store.publish(gone)
+    store.close()
+    os.remove(store.path(gone))
+    with open(store.path("legacy.mp4"), "wb") as file:
+        file.write(b"legacy")
+
+    restarted = ContentStore(
+        root=store.root, default_ttl=60, staging_folder=store.staging.folder)
+    stats = restarted.recover()
+    assert stats == {
+        "missing": 1, "imported": 1, "collected": 1,
+        "resumable": 0, "purged": 0}
+    assert not os.path.exists(restarted.blob_path(digest, ".mp4"))
+    assert restarted.index.get_file("legacy.mp4") is not None
+    restarted.close()
+
+
+def _evicted_bytes(reason: str) -> float:
+    return REGISTRY.get_sample_value(
+        "storage_bytes_evicted_total", {"reason": reason}) or 0
+
+
+def test_budget_evicts_least_recently_used(tmp_path):
+    store = ContentStore(root=str(tmp_path), default_ttl=60, max_bytes=250)
+    before = _evicted_bytes("quota")
+    first = _write(store, "first.mp4", b"1" * 100)
+    second = _write(store, "second.mp4", b"2" * 100)
+    store.publish(first)
+    store.publish(second)
+    store.touch(first)
+
+    third = _write(store, "third.mp4", b"3" * 100)
+    store.publish(third)
+
+    assert not os.path.exists(store.path(second))
+    assert os.path.exists(store.path(first))
+    assert os.path.exists(store.path(third))
+    assert store.usage() == 200
+    assert REGISTRY.get_sample_value("storage_bytes_used") == 200
+    assert _evicted_bytes("quota") - before == 100
+    store.close()
+
+
+def test_size_policy_prefers_large_idle_files(tmp_path):
+    store = ContentStore(
+        root=str(tmp_path), default_ttl=60, max_bytes=1000, policy="size")
+    small = _write(store, "small.mp4", b"s" * 100)
+    large = _write(store, "large.mp4", b"l" * 700)
+    store.publish(small)
+    store.publish(large)
+    # Same idle time for both, so size decides
+    store.index._execute("UPDATE files SET last_access = ?", (time.time() - 10,))
+
+    store.publish(_write(store, "new.mp4", b"n" * 300))
+    assert os.path.exists(store.path(small))
+    assert not os.path.exists(store.path(large))
+    store.close()
+
+
+def test_touch_extends_expiry_up_to_max_lifetime(tmp_path):
+    store = ContentStore(root=str(tmp_path), default_ttl=60, max_lifetime=100)
+    relative_path = _write(store, "hot.mp4", b"data")
+    store.publish(relative_path, expires_at=time.time() + 5)
+    created_at = store.index.get_file(relative_path)[4]
+
+    assert store.touch(relative_path, 30) == pytest.approx(time.time() + 30, abs=1)
+    assert store.touch(relative_path, 500) == pytest.approx(created_at + 100)
+    # Never moves the expiry earlier
+    assert store.touch(relative_path, 1) == pytest.approx(created_at + 100)
+    store.close()
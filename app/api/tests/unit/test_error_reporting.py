@@ -0,0 +1,85 @@
+import logging
+
+import pytest
+from prometheus_client import REGISTRY
+from app.core import error_reporting
+from app.core.error_reporting import ErrorAggregator, ErrorReporter
+from app.core.exceptions import NetworkError
+
+
+def _errors(platform: str, error_type: str) -> float:
+    return REGISTRY.get_sample_value(
+        "download_errors_total",
+        {"platform": platform, "error_type": error_type}) or 0.0
+
+
+@pytest.fixture
+def aggregator(monkeypatch):
+    """A fresh aggregator keeping 2 samples per group"""
+    aggregator = ErrorAggregator(window=60, samples=2)
+    monkeypatch.setattr(error_reporting, "error_aggregator", aggregator)
+    return aggregator
+
+
+@pytest.fixture
+def caplog(caplog):
+    # With logging set up, "app" does not propagate to the root logger
+    logger = logging.getLogger("app")
+    propagate, logger.propagate = logger.propagate, True
+    yield caplog
+    logger.propagate = propagate
+
+
+def test_failure_reported_at_every_layer_counts_once(aggregator, caplog):
+    before = _errors("test-layers", "NetworkError")
+    error = NetworkError("https://example.com/v", "connection reset")
+
+    # Stage handler, job handler and route all see the same exception
+    for stage in ("video_download", "unknown"):
+        ErrorReporter.report_download_error(
+            error, "test-layers", "https://example.com/v", "session-1",
+            context={"stage": stage})
+    ErrorReporter.report_error(
+        "NetworkError", str(error), context={"endpoint": "/download"},
+        platform="test-layers", error=error)
+
+    assert _errors("test-layers", "NetworkError") == before + 1
+    assert len(caplog.records) == 1
+
+
+def test_storm_is_sampled_and_summarized(aggregator, caplog):
+    before = _errors("test-storm", "RuntimeError")
+    for i in range(50):
+        ErrorReporter.report_download_error(
+            RuntimeError(f"HTTP Error 503 #{i}"), "test-storm",
+            f"https://example.com/{i}", f"session-{i}",
+            context={"stage": "video_download"})
+    # Another stage is a separate group with its own samples
+    ErrorReporter.report_download_error(
+        RuntimeError("bad"), "test-storm", "https://example.com/x", "session-x",
+        context={"stage": "quality_check"})
+
+    # Counters stay exact even though most reports were not logged
+    assert _errors("test-storm", "RuntimeError") == before + 51
+    assert len(caplog.records) == 3
+    # Outside a request there is no request ID to report, not the session ID
+    assert [r.error_data["request_id"] for r in caplog.records] == [None] * 3
+
+    aggregator.flush()
+    [summary] = caplog.records[3:]
+    assert summary.levelno == logging.WARNING
+    assert summary.error_summary == {
+        "platform": "test-storm",
+        "error_type": "RuntimeError",
+        "stage": "video_download",
+        "count": 50,
+        "suppressed": 48,
+        "window_seconds": summary.error_summary["window_seconds"],
+        "latest_message": "HTTP Error 503 #49",
+    }
+
+    # A new window logs samples again
+    ErrorReporter.report_download_error(
+        RuntimeError("HTTP Error 503"), "test-storm", "https://example.com/y",
+        "session-y", context={"stage": "video_download"})
+    assert len(caplog.records) == 5
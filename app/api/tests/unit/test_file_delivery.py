@@ -0,0 +1,164 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core import file_delivery
+from app.core.file_delivery import (
+    DeliveryStaticFiles,
+    RangeNotSatisfiable,
+    deliver_file,
+    parse_range,
+)
+
+CONTENT = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def client(tmp_path) -> TestClient:
+    """App serving one file through deliver_file and the static mount."""
+    (tmp_path / "video.mp4").write_bytes(CONTENT)
+    app = FastAPI()
+
+    @app.api_route("/file/{name}", methods=["GET", "HEAD"])
+    async def download(name: str):
+        return deliver_file(str(tmp_path), name, media_type="video/mp4")
+
+    app.mount("/downloads", DeliveryStaticFiles(directory=str(tmp_path)))
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-10", (990, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=5-1", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=abc", None),
+])
+def test_parse_range(header, expected):
+    """Single ranges are clamped; anything else serves the whole file."""
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 1000)
+
+
+def test_full_download(client: TestClient):
+    response = client.get("/file/video.mp4")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-type"] == "video/mp4"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(CONTENT))
+    assert "video.mp4" in response.headers["content-disposition"]
+
+
+def test_range_request(client: TestClient):
+    response = client.get("/file/video.mp4", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+    assert response.headers["content-length"] == "10"
+
+
+def test_range_not_satisfiable(client: TestClient):
+    response = client.get("/file/video.mp4", headers={"Range": "bytes=99999-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_none_match(client: TestClient):
+    etag = client.get("/file/video.mp4").headers["etag"]
+    response = client.get("/file/video.mp4", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_if_modified_since(client: TestClient):
+    last_modified = client.get("/file/video.mp4").headers["last-modified"]
+    response = client.get(
+        "/downloads/video.mp4", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    old = "Mon, 01 Jan 2001 00:00:00 GMT"
+    response = client.get("/downloads/video.mp4", headers={"If-Modified-Since": old})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+    # If-None-Match takes precedence over the date
+    response = client.get(
+        "/downloads/video.mp4",
+        headers={"If-Modified-Since": last_modified, "If-None-Match": '"stale"'},
+    )
+    assert response.status_code == 200
+
+
+def test_stale_if_range_serves_full_file(client: TestClient):
+    response = client.get(
+        "/file/video.mp4",
+        headers={"Range": "bytes=0-9", "If-Range": '"stale"'},
+    )
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_head_request(client: TestClient):
+    response = client.head("/file/video.mp4", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.headers["content-length"] == "10"
+    assert response.content == b""
+
+
+def test_static_mount_supports_ranges(client: TestClient):
+    response = client.get("/downloads/video.mp4", headers={"Range": "bytes=-4"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-4:]
+
+
+def test_accel_redirect_offload(client: TestClient, monkeypatch):
+    """With a redirect prefix the worker sends headers only."""
+    monkeypatch.setattr(
+        file_delivery.settings, "FILE_ACCEL_REDIRECT_PREFIX", "/_protected/")
+    response = client.get("/file/video.mp4")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == "/_protected/video.mp4"
+    assert response.headers["content-type"] == "video/mp4"
+
+
+@pytest.mark.asyncio
+async def test_zerocopy_extension(tmp_path):
+    """Servers advertising zero-copy send receive the open file."""
+    path = tmp_path / "video.mp4"
+    path.write_bytes(CONTENT)
+    response = file_delivery.FileDeliveryResponse(str(path))
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [(b"range", b"bytes=5-")],
+        "extensions": {file_delivery.ZEROCOPY_EXTENSION: {}},
+    }
+    messages = []
+
+    async def send(message):
+        if message["type"] == file_delivery.ZEROCOPY_EXTENSION:
+            message["data"] = message["file"].read()
+        messages.append(message)
+
+    await response(scope, None, send)
+    assert messages[0]["status"] == 206
+    assert messages[1]["offset"] == 5
+    assert messages[1]["count"] == len(CONTENT) - 5
+    assert messages[1]["data"] == CONTENT
+
+
+def test_static_mount_hides_dot_entries(client: TestClient, tmp_path):
+    (tmp_path / ".blobs").mkdir()
+    (tmp_path / ".blobs" / "abc.mp4").write_bytes(b"blob")
+    assert client.get("/downloads/.blobs/abc.mp4").status_code == 404
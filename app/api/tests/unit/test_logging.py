@@ -0,0 +1,90 @@
+import json
+import logging
+import queue
+from app.core.logging_config import JSONFormatter, NonBlockingQueueHandler, MAX_CONTEXT_ITEMS
+from app.core.metrics import LOG_RECORDS_DROPPED
+from app.models.download import DownloadRequest, Platform
+
+
+def test_full_queue_drops_and_counts():
+    """A full queue drops records instead of blocking the caller."""
+    test_logger = logging.getLogger("app.tests.queue")
+    test_logger.propagate = False
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    test_logger.addHandler(handler)
+    try:
+        before = LOG_RECORDS_DROPPED.labels(logger=test_logger.name)._value.get()
+        for i in range(5):
+            test_logger.warning("record %s", i)
+        after = LOG_RECORDS_DROPPED.labels(logger=test_logger.name)._value.get()
+    finally:
+        test_logger.removeHandler(handler)
+
+    assert handler.queue.qsize() == 2
+    assert after - before == 3
+    assert handler.queue.get_nowait().msg == "record 0"
+
+
+def test_queued_context_is_copied_at_log_time():
+    """Context mutated after the call is logged as it was when logged."""
+    test_logger = logging.getLogger("app.tests.snapshot")
+    test_logger.propagate = False
+    handler = NonBlockingQueueHandler(queue.Queue())
+    test_logger.addHandler(handler)
+    download = {"status": "processing", "files": ["a.mp4"]}
+    try:
+        test_logger.error("failed", extra={"error_data": {"context": {"download": download}}})
+    finally:
+        test_logger.removeHandler(handler)
+    download["status"] = "completed"
+    download["files"].append("b.mp4")
+    download["progress"] = 100
+
+    data = json.loads(JSONFormatter().format(handler.queue.get_nowait()))
+    assert data["error_data"]["context"]["download"] == {
+        "status": "processing", "files": ["a.mp4"]}
+
+
+def test_each_queue_gets_its_own_record():
+    """A record propagating to a parent logger is queued as two objects."""
+    parent = logging.getLogger("app.tests.parent")
+    child = logging.getLogger("app.tests.parent.child")
+    parent.propagate = False
+    parent_handler = NonBlockingQueueHandler(queue.Queue())
+    child_handler = NonBlockingQueueHandler(queue.Queue())
+    parent.addHandler(parent_handler)
+    child.addHandler(child_handler)
+    try:
+        child.info("fetched %s", "a.mp4")
+    finally:
+        parent.removeHandler(parent_handler)
+        child.removeHandler(child_handler)
+
+    first = child_handler.queue.get_nowait()
+    second = parent_handler.queue.get_nowait()
+    assert first is not second
+    assert first.msg == second.msg == "fetched a.mp4"
+
+
+def test_json_formatter_serializes_extra_context_lazily():
+    """Extra context is serialized and truncated by the formatter."""
+    request = DownloadRequest(
+        url="https://www.tiktok.com/@user/video/1", platform=Platform.TIKTOK)
+    record = logging.makeLogRecord({
+        "msg": "Error occurred: %s",
+        "args": ("boom",),
+        "levelname": "ERROR",
+        "error_data": {
+            "context": {
+                "request_data": request,
+                "available_formats": list(range(100)),
+            }
+        },
+    })
+
+    data = json.loads(JSONFormatter().format(record))
+    context = data["error_data"]["context"]
+
+    assert data["message"] == "Error occurred: boom"
+    assert context["request_data"]["platform"] == "tiktok"
+    assert len(context["available_formats"]) == MAX_CONTEXT_ITEMS + 1
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import threading
+import time
+
+from prometheus_client import REGISTRY
+from app.core.executors import InstrumentedExecutor
+from app.core.loop_monitor import LoopMonitor
+
+
+def _value(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_executor_reports_queue_and_busy_threads():
+    release = threading.Event()
+    executor = InstrumentedExecutor("test-saturated", max_workers=1)
+    running = executor.submit(release.wait)
+    queued = executor.submit(lambda: "done")
+    cancelled = executor.submit(lambda: None)
+    time.sleep(0.05)
+
+    assert _value("executor_active_threads", executor="test-saturated") == 1
+    assert _value("executor_queue_length", executor="test-saturated") == 2
+    assert cancelled.cancel()
+    assert _value("executor_queue_length", executor="test-saturated") == 1
+
+    release.set()
+    assert queued.result(timeout=1) == "done"
+    assert running.result(timeout=1)
+    executor.shutdown()
+
+    assert _value("executor_active_threads", executor="test-saturated") == 0
+    assert _value("executor_queue_length", executor="test-saturated") == 0
+    assert _value("executor_task_wait_seconds_count", executor="test-saturated") == 2
+    # The second task waited for the first to release its thread
+    assert _value("executor_task_wait_seconds_sum", executor="test-saturated") >= 0.05
+
+
+def blocking_handler():
+    time.sleep(0.3)
+
+
+def test_blocked_loop_is_logged_with_its_stack(caplog):
+    blocked_before = _value("event_loop_blocked_total")
+
+    async def main():
+        monitor = LoopMonitor(interval=0.02, threshold=0.1)
+        monitor.start()
+        await asyncio.sleep(0.05)
+
+        async def request():
+            blocking_handler()
+
+        await asyncio.create_task(request(), name="slow-request")
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    # The "app" logger does not propagate to the root logger caplog watches
+    logger = logging.getLogger("app.core.loop_monitor")
+    logger.addHandler(caplog.handler)
+    try:
+        asyncio.run(main())
+    finally:
+        logger.removeHandler(caplog.handler)
+
+    assert _value("event_loop_blocked_total") == blocked_before + 1
+    [record] = caplog.records
+    assert "request" in record.task
+    assert "blocking_handler" in record.getMessage()
+    assert _value("event_loop_lag_seconds_count") > 0
+
+
+def test_blocked_callback_is_not_attributed_to_a_task(caplog):
+    async def main():
+        monitor = LoopMonitor(interval=0.02, threshold=0.1)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        asyncio.get_running_loop().call_soon(blocking_handler)
+        await asyncio.sleep(0.4)
+        await monitor.stop()
+
+    logger = logging.getLogger("app.core.loop_monitor")
+    logger.addHandler(caplog.handler)
+    try:
+        asyncio.run(main())
+    finally:
+        logger.removeHandler(caplog.handler)
+
+    [record] = caplog.records
+    assert record.task == "a callback"
+    assert "blocking_handler" in record.getMessage()
@@ -0,0 +1,84 @@
+import csv
+import json
+import threading
+
+import pytest
+from app.services import metadata_sink
+from app.services.metadata_sink import MetadataSink
+
+
+def _row(n: int, day: str = "2026-03-01") -> dict:
+    return {"title": f"video {n}", "url": f"https://example.com/{n}",
+            "timestamp": f"{day} 12:00:00"}
+
+
+def test_concurrent_rows_reach_one_csv_per_day(tmp_path):
+    path = tmp_path / "tiktok_downloads"
+    # An existing file keeps its own column order
+    existing = path / "date=2026-03-02" / "tiktok_downloads.csv"
+    existing.parent.mkdir(parents=True)
+    existing.write_text("url,timestamp,title\r\nhttps://example.com/old,2026-03-02 09:00:00,old\r\n")
+
+    with MetadataSink(str(path), flush_interval=0.01, max_rows=10) as sink:
+        def writer(start: int) -> None:
+            for n in range(start, start + 100):
+                sink.write(_row(n, "2026-03-01" if n % 2 else "2026-03-02"))
+
+        threads = [threading.Thread(target=writer, args=(i * 100,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    with open(path / "date=2026-03-01" / "tiktok_downloads.csv", newline="") as f:
+        odd = list(csv.DictReader(f))
+    with open(existing, newline="") as f:
+        reader = csv.DictReader(f)
+        even = list(reader)
+    assert reader.fieldnames == ["url", "timestamp", "title"]
+    assert sorted(int(row["title"].split()[1]) for row in odd) == list(range(1, 800, 2))
+    assert len(even) == 401
+    assert all(row["url"] == f"https://example.com/{row['title'].split()[-1]}"
+               for row in even)
+
+
+def test_jsonl_rows_keep_fixed_columns(tmp_path):
+    sink = MetadataSink(str(tmp_path / "instagram_downloads"), format="jsonl",
+                        fields=["title", "carousel_index", "timestamp"])
+    sink.write({**_row(1), "carousel_index": 2, "extra": "dropped"})
+    sink.write({"title": "no date"})
+    sink.close()
+
+    [dated] = (tmp_path / "instagram_downloads" / "date=2026-03-01").glob("*.jsonl")
+    assert json.loads(dated.read_text()) == {
+        "title": "video 1", "carousel_index": 2, "timestamp": "2026-03-01 12:00:00"}
+    # Rows without a timestamp go to today's partition
+    assert len(list((tmp_path / "instagram_downloads").glob("date=*/*.jsonl"))) == 2
+
+
+def test_parquet_part_per_flush(tmp_path):
+    pytest.importorskip("pyarrow")
+    from pyarrow import parquet
+
+    path = tmp_path / "tiktok_downloads"
+    sink = MetadataSink(str(path), format="parquet", fields=["title", "views", "timestamp"])
+    sink.write({**_row(1), "views": 10})
+    sink.flush()
+    sink.write({**_row(2), "views": None})
+    sink.write({**_row(3, "2026-03-02"), "views": 30})
+    sink.close()
+
+    parts = sorted(path.glob("date=*/*"))
+    assert [p.suffix for p in parts] == [".parquet"] * 3
+    day = parquet.read_table(path / "date=2026-03-01")
+    assert day.schema.field("views").type == "int64"
+    assert sorted(day.to_pydict()["title"]) == ["video 1", "video 2"]
+    assert parquet.read_table(path / "date=2026-03-02").to_pydict()["views"] == [30]
+
+
+def test_parquet_needs_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(metadata_sink, "pyarrow", None)
+    with pytest.raises(RuntimeError, match="pyarrow"):
+        MetadataSink(str(tmp_path / "x"), format="parquet")
+    with pytest.raises(ValueError):
+        MetadataSink(str(tmp_path / "x"), format="xlsx")
@@ -0,0 +1,87 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+from starlette.middleware.sessions import SessionMiddleware
+from app.core.middleware import RequestContextMiddleware
+
+
+@pytest.fixture
+def client() -> TestClient:
+    """App guarded by RequestContextMiddleware with two valid keys."""
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health(request: Request):
+        return {"request_id": request.state.request_id}
+
+    @app.get("/protected")
+    async def protected(request: Request):
+        return {"request_id": request.state.request_id}
+
+    app.add_middleware(
+        RequestContextMiddleware,
+        api_keys=("admin-key", "website-key", None),
+    )
+    app.add_middleware(SessionMiddleware, secret_key="test")
+    return TestClient(app)
+
+
+def test_request_id_generated_once(client: TestClient):
+    """The request ID on request.state matches the response header."""
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == response.json()["request_id"]
+    assert float(response.headers["X-Process-Time"]) >= 0
+
+
+def test_response_headers_not_mutated():
+    """Headers are added to the message, not to the response object."""
+    app = FastAPI()
+    shared = PlainTextResponse("ok")
+
+    @app.get("/health")
+    async def health():
+        return shared
+
+    app.add_middleware(RequestContextMiddleware, api_keys=())
+    client = TestClient(app)
+    first = client.get("/health")
+    second = client.get("/health")
+
+    assert second.headers.get_list("X-Request-ID") == [second.headers["X-Request-ID"]]
+    assert first.headers["X-Request-ID"] != second.headers["X-Request-ID"]
+    assert b"x-request-id" not in dict(shared.raw_headers)
+
+
+def test_missing_api_key(client: TestClient):
+    """Protected paths require an API key."""
+    response = client.get("/protected")
+    assert response.status_code == 401
+    assert response.json() == {"detail": "API key is missing"}
+    assert "X-Request-ID" in response.headers
+
+
+def test_invalid_api_key(client: TestClient):
+    """Unknown API keys are rejected."""
+    response = client.get("/protected", headers={"X-API-Key": "nope"})
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("key", ["admin-key", "website-key"])
+def test_valid_api_key(client: TestClient, key: str):
+    """Either configured key grants access."""
+    response = client.get("/protected", headers={"X-API-Key": key})
+    assert response.status_code == 200
+
+
+def test_api_key_not_required():
+    """All paths are open when API keys are not required."""
+    app = FastAPI()
+
+    @app.get("/protected")
+    async def protected():
+        return {}
+
+    app.add_middleware(RequestContextMiddleware, require_api_key=False)
+    assert TestClient(app).get("/protected").status_code == 200
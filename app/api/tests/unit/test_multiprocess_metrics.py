@@ -0,0 +1,75 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+from prometheus_client import REGISTRY
+from app.models.download import Platform, VideoQuality
+from app.services.download_manager import DownloadManager
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKER = """
+import os
+from app.core.metrics import ACTIVE_DOWNLOADS, DOWNLOAD_REQUESTS, WORKER_OPEN_FDS, mark_worker_dead
+ACTIVE_DOWNLOADS.labels(platform="tiktok").inc({active})
+DOWNLOAD_REQUESTS.labels(platform="tiktok", quality="high").inc({requests})
+WORKER_OPEN_FDS.set({fds})
+if {exits}:
+    mark_worker_dead(os.getpid())
+"""
+
+
+def _python(code: str, folder: str) -> str:
+    # prometheus_client reads PROMETHEUS_MULTIPROC_DIR when first imported
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=folder)
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=API_DIR, env=env,
+        check=True, capture_output=True, text=True).stdout
+
+
+def test_scrape_merges_every_worker(tmp_path):
+    folder = str(tmp_path)
+    _python(WORKER.format(active=2, requests=3, fds=10, exits=False), folder)
+    _python(WORKER.format(active=5, requests=4, fds=20, exits=True), folder)
+
+    exposition = _python(
+        "from app.core.metrics import generate_metrics;"
+        "print(generate_metrics().decode())", folder)
+    samples = dict(
+        line.rsplit(" ", 1) for line in exposition.splitlines()
+        if line and not line.startswith("#"))
+
+    # Counters add up across workers, including ones that have exited
+    assert float(samples['download_requests_total{platform="tiktok",quality="high"}']) == 7
+    # In-flight gauges only count workers that are still running
+    assert float(samples['active_downloads{platform="tiktok"}']) == 2
+    # Per-worker gauges keep one series per live worker, labelled by pid;
+    # the scraping process is a worker too and has not set its own
+    fds = sorted(float(value) for key, value in samples.items()
+                 if key.startswith("worker_open_fds{pid="))
+    assert fds == [0, 10]
+
+
+def _active(platform: str) -> float:
+    return REGISTRY.get_sample_value("active_downloads", {"platform": platform}) or 0.0
+
+
+@pytest.mark.parametrize("process", ["process_download", "process_batch_download"])
+def test_active_downloads_released_when_job_fails(process):
+    manager = DownloadManager.__new__(DownloadManager)
+    manager.active_downloads = {}
+    before = _active(Platform.FACEBOOK.value)
+
+    if process == "process_download":
+        job = manager.process_download(
+            "missing", "https://facebook.com/v", Platform.FACEBOOK,
+            VideoQuality.HIGH, start_time=0)
+    else:
+        job = manager.process_batch_download(
+            "missing", ["https://facebook.com/v"], Platform.FACEBOOK, VideoQuality.HIGH)
+    with pytest.raises(ValueError):
+        asyncio.run(job)
+
+    assert _active(Platform.FACEBOOK.value) == before
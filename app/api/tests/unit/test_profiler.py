@@ -0,0 +1,50 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app.core.profiler import ProfilerBusy, SamplingProfiler
+
+
+def busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_covers_executor_threads():
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="yt-dlp")
+    executor.submit(busy_loop, stop)
+    try:
+        collapsed, samples = SamplingProfiler().start(0.3, 0.005).result()
+    finally:
+        stop.set()
+        executor.shutdown()
+
+    assert samples >= 10
+    stacks = dict(line.rsplit(" ", 1) for line in collapsed.splitlines())
+    busy = [stack for stack in stacks if "busy_loop (test_profiler.py:" in stack]
+    assert busy and all(stack.startswith("yt-dlp;") for stack in busy)
+    assert all(int(count) > 0 for count in stacks.values())
+    # Waiting threads are dropped, and the profiler never samples itself
+    assert not any(stack.split(";")[-1].startswith("_worker ") for stack in stacks)
+    assert "sampling-profiler" not in collapsed
+
+
+def test_idle_threads_included_on_request():
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="idle-pool")
+    executor.submit(lambda: None).result()
+    try:
+        collapsed, _ = SamplingProfiler().start(0.05, 0.005, idle=True).result()
+    finally:
+        executor.shutdown()
+    assert any(line.startswith("idle-pool;") for line in collapsed.splitlines())
+
+
+def test_one_profile_at_a_time():
+    profiler = SamplingProfiler()
+    running = profiler.start(0.2, 0.01)
+    with pytest.raises(ProfilerBusy):
+        profiler.start(0.1)
+    running.result()
+    # Released once the first profile finishes
+    profiler.start(0.01).result()
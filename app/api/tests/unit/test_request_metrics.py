@@ -0,0 +1,120 @@
+import asyncio
+import tempfile
+import uuid
+import pytest
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+from app.core.metrics import REQUEST_COUNT
+from app.core.middleware import (
+    RequestContextMiddleware,
+    UNMATCHED_ENDPOINT,
+    OVERFLOW_ENDPOINT,
+    OTHER_METHOD
+)
+
+
+def build_app(**options) -> FastAPI:
+    """App with the templated routes that used to explode label cardinality."""
+    app = FastAPI()
+
+    @app.get("/api/v1/status/{session_id}")
+    async def get_status(session_id: str):
+        return {"session_id": session_id}
+
+    @app.get("/api/v1/file/{session_id}")
+    async def get_file(session_id: str):
+        return {"session_id": session_id}
+
+    app.mount("/downloads", StaticFiles(directory=tempfile.mkdtemp()))
+    app.add_middleware(RequestContextMiddleware, require_api_key=False, **options)
+    return app
+
+
+async def call(app: FastAPI, path: str, method: str = "GET") -> None:
+    """Drive a single HTTP request straight through the ASGI interface."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+def endpoint_labels() -> set:
+    """Distinct endpoint labels currently exported for request_count."""
+    return {
+        sample.labels["endpoint"]
+        for metric in REQUEST_COUNT.collect()
+        for sample in metric.samples
+    }
+
+
+def test_series_count_flat_for_distinct_session_ids():
+    """100k distinct session IDs produce a fixed number of time series."""
+    app = build_app()
+
+    async def run():
+        for i in range(100_000):
+            session_id = uuid.uuid4().hex
+            await call(app, f"/api/v1/status/{session_id}")
+            if i % 100 == 0:
+                await call(app, f"/downloads/{session_id}.mp4")
+                await call(app, f"/not-a-route/{session_id}")
+
+    before = len(endpoint_labels())
+    asyncio.run(run())
+    labels = endpoint_labels()
+
+    assert "/api/v1/status/{session_id}" in labels
+    assert "/downloads/{path}" in labels
+    assert UNMATCHED_ENDPOINT in labels
+    assert len(labels) - before <= 3
+
+
+def method_counts() -> dict:
+    counts = {}
+    for metric in REQUEST_COUNT.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_total"):
+                method = sample.labels["method"]
+                counts[method] = counts.get(method, 0) + sample.value
+    return counts
+
+
+@pytest.mark.parametrize("method,label", [("GET", "GET"), ("BREW", OTHER_METHOD)])
+def test_method_label_bounded(method: str, label: str):
+    """Known HTTP methods keep their label; unknown ones collapse into one."""
+    before = method_counts()
+    asyncio.run(call(build_app(), "/api/v1/status/abc", method=method))
+    after = method_counts()
+    assert after[label] - before.get(label, 0) == 1
+    if method != label:
+        assert method not in after
+
+
+def test_endpoint_label_cap():
+    """Templates beyond the cap share the overflow bucket."""
+    app = build_app(max_endpoint_labels=1)
+
+    async def run():
+        await call(app, "/api/v1/status/abc")
+        await call(app, "/api/v1/file/abc")
+
+    asyncio.run(run())
+    assert OVERFLOW_ENDPOINT in endpoint_labels()
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import REGISTRY
+from app.core.stage_timer import (
+    EXTRACT_INFO,
+    POSTPROCESS,
+    QUEUE_WAIT,
+    RESOLVE,
+    TRANSFER,
+    StageTimer
+)
+
+
+def _count(platform: str, stage: str) -> float:
+    return REGISTRY.get_sample_value(
+        "download_stage_duration_seconds_count",
+        {"platform": platform, "stage": stage}) or 0
+
+
+def test_run_separates_queue_wait_from_work():
+    executor = ThreadPoolExecutor(max_workers=1)
+    # Occupy the only worker so the timed call has to queue
+    executor.submit(time.sleep, 0.2)
+    timer = StageTimer("test")
+
+    result = asyncio.run(
+        timer.run(EXTRACT_INFO, executor, lambda: time.sleep(0.1) or 42))
+    assert result == 42
+    assert timer.durations[QUEUE_WAIT] >= 0.15
+    assert 0.1 <= timer.durations[EXTRACT_INFO] < 0.2
+    executor.shutdown()
+
+
+def test_hooks_time_transfer_and_postprocessing():
+    timer = StageTimer("test")
+    opts = timer.hook({"progress_hooks": [lambda d: None]})
+    assert len(opts["progress_hooks"]) == 2
+    progress, = opts["progress_hooks"][1:]
+    postprocess, = opts["postprocessor_hooks"]
+
+    # Video and audio streams, then a merge
+    for name in ("v.mp4", "a.m4a"):
+        progress({"status": "downloading", "filename": name})
+        progress({"status": "downloading", "filename": name})
+        time.sleep(0.05)
+        progress({"status": "finished", "filename": name})
+    postprocess({"status": "started", "postprocessor": "Merger"})
+    time.sleep(0.05)
+    postprocess({"status": "finished", "postprocessor": "Merger"})
+
+    assert 0.1 <= timer.durations[TRANSFER] < 0.2
+    assert 0.05 <= timer.durations[POSTPROCESS] < 0.1
+
+
+def test_observe_records_each_stage_once():
+    timer = StageTimer("observe-test")
+    timer.lap(RESOLVE)
+    timer.add(TRANSFER, 90.0)
+    timer.observe()
+    timer.observe()
+
+    assert _count("observe-test", RESOLVE) == 1
+    assert _count("observe-test", TRANSFER) == 1
+    # Buckets reach past a minute so long downloads are not lumped into +Inf
+    assert REGISTRY.get_sample_value(
+        "download_stage_duration_seconds_bucket",
+        {"platform": "observe-test", "stage": TRANSFER, "le": "120.0"}) == 1
@@ -0,0 +1,143 @@
+import asyncio
+import errno
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app.services.download_manager import DownloadManager
+from app.services.storage import ContentStore, StagingArea, hash_file
+from app.services.storage.staging import default_staging_folder
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ContentStore(
+        root=str(tmp_path / "downloads"), default_ttl=60,
+        staging_folder=str(tmp_path / "staging"))
+    yield store
+    store.close()
+
+
+def _age(path: str, seconds: float) -> None:
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_same_key_reuses_path_for_resume(tmp_path):
+    area = StagingArea(str(tmp_path), max_age=60)
+    with area.stage("a.mp4", key="https://x/1|high") as first:
+        first_path = first.path
+        # A concurrent writer for the same key gets its own file
+        with area.stage("b.mp4", key="https://x/1|high") as second:
+            assert second.path != first.path
+    with area.stage("c.mp4", key="https://x/1|high") as retry:
+        assert retry.path == first_path
+        assert retry.path.endswith(".mp4")
+
+
+def test_publish_staged_renames_into_store(store: ContentStore):
+    relative_path = store.allocate("tiktok_1.mp4")
+    with store.staging.stage("tiktok_1.mp4", key="k") as staged:
+        with open(staged.path, "wb") as file:
+            file.write(b"video")
+        assert not os.path.exists(store.path(relative_path))
+        digest = store.publish_staged(staged.path, relative_path, "s1")
+
+    assert not os.path.exists(staged.path)
+    assert digest == hash_file(store.path(relative_path))
+    assert store.index.files_for_session("s1") == [relative_path]
+    assert os.listdir(store.staging.folder) == []
+
+
+def test_publish_staged_copies_across_filesystems(store: ContentStore, monkeypatch):
+    real_replace = os.replace
+
+    def replace(source, target):
+        if source.startswith(store.staging.folder):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        real_replace(source, target)
+
+    monkeypatch.setattr(os, "replace", replace)
+    relative_path = store.allocate("youtube_1.mp4")
+    with store.staging.stage("youtube_1.mp4") as staged:
+        with open(staged.path, "wb") as file:
+            file.write(b"x" * 3000)
+        digest = store.publish_staged(staged.path, relative_path)
+
+    assert digest == hash_file(store.path(relative_path))
+    assert not os.path.exists(staged.path)
+    assert os.listdir(store.path(".incoming")) == []
+
+
+def test_recover_keeps_fresh_partials_and_purges_old(store: ContentStore):
+    area = store.staging
+    with area.stage("a.mp4", key="fresh") as fresh:
+        pass
+    with area.stage("a.mp4", key="old") as old:
+        pass
+    with open(fresh.path + ".part", "wb") as file:
+        file.write(b"half")
+    with open(old.path + ".part", "wb") as file:
+        file.write(b"half")
+    _age(old.path + ".part", area.max_age + 1)
+
+    stats = area.recover()
+    assert stats == {"resumable": 1, "purged": 1}
+    assert os.path.exists(fresh.path + ".part")
+    assert not os.path.exists(old.path + ".part")
+
+
+def test_recover_skips_files_of_live_writers(store: ContentStore):
+    area = store.staging
+    with area.stage("a.mp4", key="live") as live:
+        with open(live.path + ".part", "wb") as file:
+            file.write(b"half")
+        _age(live.path + ".part", area.max_age + 1)
+        assert area.recover() == {"resumable": 0, "purged": 0}
+        assert os.path.exists(live.path + ".part")
+
+
+def test_cleanup_loop_purges_aged_partials(store: ContentStore):
+    """A long-running worker doesn't wait for a restart to free staging."""
+    with store.staging.stage("a.mp4", key="failed") as failed:
+        pass
+    with open(failed.path + ".part", "wb") as file:
+        file.write(b"half")
+    _age(failed.path + ".part", store.staging.max_age + 1)
+
+    manager = DownloadManager.__new__(DownloadManager)
+    manager.active_downloads = {}
+    manager.store = store
+    manager.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def one_pass():
+        task = asyncio.create_task(manager._cleanup_loop())
+        for _ in range(100):
+            if not os.path.exists(failed.path + ".part"):
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(one_pass())
+    manager.executor.shutdown()
+    assert not os.path.exists(failed.path + ".part")
+
+
+def test_store_recover_purges_interrupted_copies(store: ContentStore):
+    incoming = store.path(".incoming")
+    os.makedirs(incoming)
+    stale = os.path.join(incoming, "abc.mp4")
+    with open(stale, "wb") as file:
+        file.write(b"partial copy")
+    _age(stale, store.staging.max_age + 1)
+
+    assert store.recover()["purged"] == 1
+    assert not os.path.exists(stale)
+
+
+def test_default_folder_falls_back_to_store_root(tmp_path):
+    assert default_staging_folder(str(tmp_path), 0) == \
+        os.path.join(str(tmp_path), ".staging")
+    assert default_staging_folder(str(tmp_path), 1 << 62) == \
+        os.path.join(str(tmp_path), ".staging")
@@ -0,0 +1,51 @@
+import importlib
+import os
+import pkgutil
+import subprocess
+import sys
+
+import pytest
+import app.core
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _python(code: str, cwd: str) -> str:
+    """Last line ``code`` prints in a fresh interpreter"""
+    # Run outside the API folder so its log files land in ``cwd``
+    env = dict(os.environ, PYTHONPATH=API_DIR)
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, env=env,
+        check=True, capture_output=True, text=True).stdout.splitlines()[-1]
+
+
+def test_importing_the_app_leaves_yt_dlp_unloaded(tmp_path):
+    assert _python("import sys, app.main; print('yt_dlp' in sys.modules)", tmp_path) == "False"
+
+
+def test_worker_startup_builds_no_download_services(tmp_path):
+    code = """
+import asyncio, sys
+from app.main import app
+from app.services.download_manager import DownloadManager
+from app.services.registry import registry
+
+async def main():
+    async with app.router.lifespan_context(app):
+        print(registry.peek(DownloadManager) is None and 'yt_dlp' not in sys.modules)
+
+asyncio.run(main())
+"""
+    assert _python(code, tmp_path) == "True"
+
+
+@pytest.mark.parametrize("module", sorted(
+    name for _, name, _ in pkgutil.iter_modules(app.core.__path__, "app.core.")))
+def test_core_module_imports(module):
+    """Every core module loads next to the others, e.g. without metric clashes"""
+    try:
+        importlib.import_module(module)
+    except ModuleNotFoundError as e:
+        if e.name.split(".")[0] == "app":
+            raise
+        pytest.skip(f"{e.name} is not installed")
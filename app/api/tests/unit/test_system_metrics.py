@@ -0,0 +1,75 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import REGISTRY
+from app.core.system_metrics import SystemMetricsSampler
+
+
+def _value(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels)
+
+
+def test_sample_publishes_resource_gauges(tmp_path):
+    executor = ThreadPoolExecutor(max_workers=4)
+    list(executor.map(time.sleep, [0.01] * 3))
+    sampler = SystemMetricsSampler(
+        0,
+        volumes={"test-downloads": str(tmp_path), "test-missing": str(tmp_path / "nope")},
+        executors=lambda: {"test-pool": executor, "test-unused": None},
+        sessions=lambda: 7,
+    )
+
+    started = time.perf_counter()
+    sampler.sample()
+    # psutil.cpu_percent(interval=1) used to block the caller for a second
+    assert time.perf_counter() - started < 0.5
+
+    assert _value("worker_resident_memory_bytes") > 0
+    assert _value("worker_open_fds") > 0
+    assert _value("system_memory_usage_bytes") > 0
+    assert _value("download_volume_bytes", volume="test-downloads", kind="total") > 0
+    assert _value("download_volume_bytes", volume="test-missing", kind="total") is None
+    assert _value("executor_threads", executor="test-pool") == 3
+    assert _value("executor_threads", executor="test-unused") is None
+    assert _value("download_sessions_tracked") == 7
+    executor.shutdown()
+
+
+def test_background_thread_samples_until_stopped(tmp_path):
+    count = 0
+
+    def sessions() -> int:
+        nonlocal count
+        count += 1
+        return count
+
+    sampler = SystemMetricsSampler(0.02, volumes={}, sessions=sessions)
+    sampler.start()
+    time.sleep(0.15)
+    sampler.stop()
+    sampled = count
+    time.sleep(0.05)
+
+    assert sampled >= 3
+    assert count == sampled
+
+
+def test_zero_interval_disables_sampler():
+    sampler = SystemMetricsSampler(0, volumes={})
+    sampler.start()
+    assert sampler._thread is None
+
+
+def test_metrics_collector_samples_without_blocking(tmp_path, monkeypatch):
+    from app.core import monitoring
+
+    monkeypatch.setattr(monitoring.settings, "DOWNLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setattr(monitoring, "_sampler", None)
+
+    started = time.perf_counter()
+    monitoring.MetricsCollector.update_system_metrics()
+    monitoring.MetricsCollector.update_system_metrics()
+    assert time.perf_counter() - started < 0.5
+
+    assert _value("download_volume_bytes", volume="downloads", kind="total") > 0
+    assert _value("worker_resident_memory_bytes") > 0
@@ -0,0 +1,114 @@
+import json
+import time
+
+import pytest
+from fastapi import BackgroundTasks, FastAPI
+from fastapi.testclient import TestClient
+from app.core.middleware import RequestContextMiddleware
+from app.core.stage_timer import EXTRACT_INFO, QUEUE_WAIT, RESOLVE, StageTimer
+from app.core.tracing import (
+    FileSpanExporter,
+    SERVER,
+    Tracer,
+    current_request_id,
+    parse_traceparent,
+    tracer
+)
+
+
+class CollectingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, payload: dict) -> None:
+        for resource in payload["resourceSpans"]:
+            for scope in resource["scopeSpans"]:
+                self.spans.extend(scope["spans"])
+
+    def shutdown(self) -> None:
+        pass
+
+
+@pytest.fixture
+def exported():
+    previous = tracer.exporter, tracer.sample_ratio
+    exporter = CollectingExporter()
+    tracer.configure(exporter, 1.0)
+    tracer.start()
+    yield exporter
+    tracer.shutdown()
+    tracer.configure(*previous)
+
+
+def test_request_span_links_background_job_and_stages(exported):
+    """A BackgroundTasks job and its stages join the request's trace."""
+    seen = {}
+
+    async def job():
+        seen["request_id"] = current_request_id()
+        with tracer.span("download.job", session_id="s1"):
+            timer = StageTimer("test")
+            timer.lap(RESOLVE)
+            await timer.run(EXTRACT_INFO, None, time.sleep, 0.01)
+
+    app = FastAPI()
+
+    @app.post("/jobs/{name}")
+    async def create(name: str, background_tasks: BackgroundTasks):
+        background_tasks.add_task(job)
+        return {"name": name}
+
+    app.add_middleware(RequestContextMiddleware, require_api_key=False)
+    caller = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    response = TestClient(app).post("/jobs/a", headers={"traceparent": caller})
+    tracer.shutdown()
+
+    # The job still knows which request it runs for
+    assert seen["request_id"] == response.headers["X-Request-ID"]
+
+    spans = {span["name"]: span for span in exported.spans}
+    request = spans["POST /jobs/{name}"]
+    job, stage = spans["download.job"], spans["download.extract_info"]
+    assert request["kind"] == SERVER
+    assert request["parentSpanId"] == "b7ad6b7169203331"
+    assert {s["traceId"] for s in exported.spans} == {"0af7651916cd43dd8448eb211c80319c"}
+    assert response.headers["traceparent"] == (
+        f"00-{request['traceId']}-{request['spanId']}-01")
+    assert job["parentSpanId"] == request["spanId"]
+    assert spans[f"download.{RESOLVE}"]["parentSpanId"] == job["spanId"]
+    assert spans[f"download.{QUEUE_WAIT}"]["parentSpanId"] == job["spanId"]
+    assert stage["parentSpanId"] == job["spanId"]
+    assert int(stage["endTimeUnixNano"]) - int(stage["startTimeUnixNano"]) >= 10_000_000
+    # The request span ends with its response, before the job finishes
+    assert int(request["endTimeUnixNano"]) <= int(job["endTimeUnixNano"])
+
+
+def test_sampling_is_decided_per_trace(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    ratio = Tracer(FileSpanExporter(str(path)), sample_ratio=0.25)
+    roots = [ratio.start_span("root") for _ in range(4000)]
+    assert 800 < sum(root.sampled for root in roots) < 1200
+    # Children follow their trace, including a remote caller's decision
+    assert all(ratio.start_span("child", root).sampled == root.sampled
+               for root in roots[:100])
+    remote = parse_traceparent(
+        "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-00")
+    assert not Tracer(FileSpanExporter(str(path))).start_span("x", remote).sampled
+    # Nothing is sampled without an exporter
+    assert not Tracer(None, 1.0).start_span("root").sampled
+
+    ratio.start()
+    for root in roots:
+        root.end()
+    ratio.shutdown()
+    lines = path.read_text().splitlines()
+    exported = [span for line in lines
+                for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+    assert len(exported) == sum(root.sampled for root in roots)
+
+
+def test_malformed_traceparent_starts_a_new_trace():
+    assert parse_traceparent(None) is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(
+        "00-00000000000000000000000000000000-b7ad6b7169203331-01") is None
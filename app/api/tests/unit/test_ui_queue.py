@@ -0,0 +1,53 @@
+import threading
+
+from app.services.batch_engine import BatchProgress
+from app.services.ui_queue import UIQueue
+
+
+class Root:
+    """Stands in for Tk: records scheduled callbacks instead of running them"""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append((ms, callback))
+
+
+def test_frame_applies_newest_update_of_each_kind():
+    root, applied, shown = Root(), [], []
+    ui = UIQueue(root, {"status": lambda text: applied.append(("status", text)),
+                        "progress": lambda value: applied.append(("progress", value))},
+                 dialogs={"info": lambda *args: shown.append(args)})
+
+    threads = [threading.Thread(target=lambda: [ui.post("progress", n) for n in range(500)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ui.post("status", "Downloading")
+    ui.post("info", "Done", "first")
+    ui.post("info", "Done", "second")
+    ui.post("unknown", 1)
+    ui.drain()
+
+    assert applied == [("progress", 499), ("status", "Downloading")]
+    assert shown == [("Done", "first"), ("Done", "second")]
+    assert len(root.scheduled) == 2
+
+
+def test_running_engine_drives_status_and_progress():
+    class Engine:
+        def progress(self):
+            return BatchProgress(total=4, done=1, failed=1, active=2, bytes_downloaded=3 * 2 ** 20)
+
+    root, applied = Root(), {}
+    ui = UIQueue(root, {"status": lambda text: applied.__setitem__("status", text),
+                        "progress": lambda value: applied.__setitem__("progress", value)})
+    ui.post("progress", 10)
+    ui.engine = Engine()
+    ui.drain()
+
+    assert applied == {"progress": 50.0,
+                       "status": "Downloading 2/4: 2 active, 1 failed, 3.0 MB"}
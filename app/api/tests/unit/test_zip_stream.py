@@ -0,0 +1,156 @@
+import asyncio
+import io
+import zipfile
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.dependencies import check_rate_limit
+from app.api.routes import downloads
+from app.models.download import DownloadStatus, Platform, VideoQuality
+from app.services.download_manager import DownloadManager
+from app.services.registry import get_download_manager
+from app.services.storage import ContentStore
+from app.services.zip_stream import iter_zip
+
+
+def test_iter_zip_stored_entries(tmp_path):
+    """Archives are valid, uncompressed and streamed in bounded chunks."""
+    first = tmp_path / "a.mp4"
+    second = tmp_path / "b.mp4"
+    first.write_bytes(b"a" * 10_000)
+    second.write_bytes(b"")
+
+    chunks = list(iter_zip([
+        ("a.mp4", str(first)),
+        ("missing.mp4", str(tmp_path / "missing.mp4")),
+        ("b.mp4", str(second)),
+    ], chunk_size=1024))
+
+    assert max(len(chunk) for chunk in chunks) < 2048
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.namelist() == ["a.mp4", "b.mp4"]
+        assert archive.getinfo("a.mp4").compress_type == zipfile.ZIP_STORED
+        assert archive.read("a.mp4") == b"a" * 10_000
+        assert archive.read("b.mp4") == b""
+        assert archive.testzip() is None
+
+
+@pytest.fixture
+def manager(tmp_path) -> DownloadManager:
+    manager = DownloadManager.__new__(DownloadManager)
+    manager.active_downloads = {}
+    manager.store = ContentStore(
+        root=str(tmp_path), staging_folder=str(tmp_path / ".staging"))
+    manager.download_folder = manager.store.root
+    manager.file_expiry_seconds = 300
+    manager.cleanup_task = None
+    return manager
+
+
+@pytest.fixture
+def client(manager: DownloadManager) -> TestClient:
+    app = FastAPI()
+    app.include_router(downloads.router, prefix="/api/v1")
+    app.dependency_overrides[get_download_manager] = lambda: manager
+    app.dependency_overrides[check_rate_limit] = lambda: None
+    downloads.cleanup_task_started = True
+    return TestClient(app)
+
+
+def _batch(manager: DownloadManager, status: DownloadStatus, files) -> str:
+    manager.active_downloads["batch"] = {
+        "status": status,
+        "progress": 100,
+        "url": "https://example.com/video",
+        "platform": Platform.YOUTUBE,
+        "files": files,
+    }
+    return "batch"
+
+
+def test_batch_zip_endpoint(client: TestClient, manager: DownloadManager, tmp_path):
+    (tmp_path / "one.mp4").write_bytes(b"1" * 300)
+    (tmp_path / "two.mp4").write_bytes(b"2" * 500)
+    session_id = _batch(manager, DownloadStatus.FAILED, ["one.mp4", "two.mp4"])
+
+    response = client.get(f"/api/v1/batch/{session_id}/zip")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.read("one.mp4") == b"1" * 300
+        assert archive.read("two.mp4") == b"2" * 500
+
+
+def test_batch_zip_touches_index_off_the_event_loop(client, manager, tmp_path, monkeypatch):
+    (tmp_path / "one.mp4").write_bytes(b"1" * 300)
+    (tmp_path / "two.mp4").write_bytes(b"2" * 500)
+    for name in ("one.mp4", "two.mp4"):
+        manager.store.publish(name, session_id="batch", expires_at=1)
+    session_id = _batch(manager, DownloadStatus.COMPLETED, ["one.mp4", "two.mp4"])
+
+    on_loop = []
+    touch = manager.store.touch
+
+    def recording_touch(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return touch(*args)
+
+    monkeypatch.setattr(manager.store, "touch", recording_touch)
+    assert client.get(f"/api/v1/batch/{session_id}/zip").status_code == 200
+    assert on_loop == [False, False]
+    assert manager.active_downloads[session_id]["expires_at"] > 1
+
+
+@pytest.mark.parametrize("status,files,expected", [
+    (DownloadStatus.PROCESSING, ["one.mp4"], 400),
+    (DownloadStatus.EXPIRED, ["one.mp4"], 410),
+    (DownloadStatus.COMPLETED, [], 404),
+])
+def test_batch_zip_not_available(client, manager, status, files, expected):
+    session_id = _batch(manager, status, files)
+    assert client.get(f"/api/v1/batch/{session_id}/zip").status_code == expected
+
+
+def test_batch_zip_rejects_single_download(client, manager):
+    manager.active_downloads["single"] = {
+        "status": DownloadStatus.COMPLETED,
+        "progress": 100,
+        "url": "https://example.com/video",
+        "filename": "one.mp4",
+    }
+    assert client.get("/api/v1/batch/single/zip").status_code == 404
+
+
+def test_batch_records_completed_files(manager: DownloadManager):
+    """process_batch_download keeps the filenames the bundle is built from."""
+    manager._extract_video_info = AsyncMock(return_value={})
+    manager._download_video_async = AsyncMock(
+        side_effect=[None, RuntimeError("boom"), None])
+    manager._publish = AsyncMock()
+    urls = ["https://example.com/1", "https://example.com/2", "https://example.com/3"]
+
+    session_id = asyncio.run(manager.create_download(urls[0], Platform.YOUTUBE))
+    result = asyncio.run(manager.process_batch_download(
+        session_id, urls, Platform.YOUTUBE, VideoQuality.HIGH))
+
+    files = manager.get_batch_files(session_id)
+    assert len(files) == 2
+    assert all(name.split("/")[-1].startswith("youtube_batch_") for name in files)
+    assert result.status == DownloadStatus.FAILED
+    assert result.expires_at is not None
+
+
+def test_evicted_files_leave_batch_until_empty(manager: DownloadManager):
+    _batch(manager, DownloadStatus.COMPLETED, ["one.mp4", "two.mp4"])
+    manager.forget_file("batch", "one.mp4")
+    assert manager.get_batch_files("batch") == ["two.mp4"]
+    assert manager.active_downloads["batch"]["status"] == DownloadStatus.COMPLETED
+
+    manager.forget_file("batch", "two.mp4")
+    assert manager.active_downloads["batch"]["status"] == DownloadStatus.EXPIRED
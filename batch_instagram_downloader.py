@@ -1,6 +1,12 @@
 import os
+import sys
 import yt_dlp
 
+# The batch engine lives with the API services
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'api'))
+
+from app.services.batch_engine import batch_download as run_batch  # noqa: E402
+
 
 def read_urls_from_file(file_path):
     if not os.path.exists(file_path):
@@ -33,14 +39,9 @@ def download_instagram_video(url, output_dir="downloads/instagram"):
         print(f"❌ Failed to download {url} — Error: {e}")
 
 
-def batch_download(file_path="instagram_urls.txt"):
-    urls = read_urls_from_file(file_path)
-    if not urls:
-        print("⚠️ No URLs found.")
-        return
-
-    for url in urls:
-        download_instagram_video(url)
+def batch_download(file_path="instagram_urls.txt", workers=8):
+    """Download every URL in the file concurrently; reruns resume"""
+    return run_batch(file_path, "instagram", workers=workers)
 
 
 if __name__ == "__main__":
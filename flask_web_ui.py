@@ -6,6 +6,8 @@ import shutil
 import uuid
 import threading
 import time
+import math
+import queue
 from datetime import datetime, timedelta
 
 app = Flask(__name__)
@@ -15,13 +17,135 @@ app.config['DOWNLOAD_FOLDER'] = 'downloads'
 
 os.makedirs(app.config['DOWNLOAD_FOLDER'], exist_ok=True)
 
-# Store active downloads
-active_downloads = {}
-completed_downloads = []
-
 DOWNLOAD_LIFESPAN_MINUTES = 5
 CLEANUP_INTERVAL_SECONDS = 60
 
+# Downloads run on a fixed pool of threads; URLs beyond the queue are turned away
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', 4))
+MAX_QUEUED_URLS = int(os.getenv('MAX_QUEUED_URLS', 100))
+
+
+class JobTable:
+    """
+    Download sessions and the files they produced.
+
+    Request handlers, pool workers and the cleanup thread all share it,
+    so every access holds the lock and readers get copies.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._completed = []
+
+    def add(self, session_id, job_type, urls):
+        with self._lock:
+            self._sessions[session_id] = {
+                'type': job_type,
+                'urls': list(urls),
+                'status': 'queued',
+                'progress': 0,
+                'current_url': urls[0] if job_type == 'single' else '',
+                'results': []
+            }
+
+    def url_started(self, session_id, url):
+        with self._lock:
+            session = self._sessions[session_id]
+            session['status'] = 'processing'
+            session['current_url'] = url
+
+    def url_finished(self, session_id, result):
+        with self._lock:
+            session = self._sessions[session_id]
+            session['results'].append(result)
+            done, total = len(session['results']), len(session['urls'])
+            session['progress'] = int(done / total * 100)
+            if done == total:
+                session['status'] = 'completed'
+            if result['success']:
+                self._completed.append(result)
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return dict(session, results=list(session['results'])) if session else None
+
+    def snapshot(self):
+        """Copies of all sessions and of the completed downloads"""
+        with self._lock:
+            sessions = {session_id: dict(session, results=list(session['results']))
+                        for session_id, session in self._sessions.items()}
+            return sessions, list(self._completed)
+
+    def expire(self, cutoff):
+        """Remove and return the completed downloads finished before cutoff"""
+        with self._lock:
+            expired = [item for item in self._completed if item['timestamp'] < cutoff]
+            self._completed = [item for item in self._completed if item['timestamp'] >= cutoff]
+            return expired
+
+
+class DownloadPool:
+    """
+    A fixed number of worker threads fed by a bounded queue of URLs.
+
+    Every URL of a submission is its own task, so the URLs of one
+    uploaded file download in parallel. A submission that doesn't fit in
+    the queue is rejected as a whole, with an estimate of when it would.
+    """
+
+    def __init__(self, jobs, workers, max_queued):
+        self.jobs = jobs
+        self.workers = workers
+        self.max_queued = max_queued
+        self.tasks = queue.Queue(max_queued)
+        self._submit_lock = threading.Lock()
+        self._threads = []
+        # Running average of seconds per URL, for the retry hint
+        self._seconds_per_url = 30.0
+
+    def start(self):
+        with self._submit_lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._work, name=f"download-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def queued(self):
+        return self.tasks.qsize()
+
+    def submit(self, session_id, job_type, urls):
+        """Queue every URL; if they don't fit, return seconds to wait instead"""
+        self.start()
+        with self._submit_lock:
+            excess = self.tasks.qsize() + len(urls) - self.max_queued
+            if excess > 0:
+                return max(5, math.ceil(excess / self.workers * self._seconds_per_url))
+            self.jobs.add(session_id, job_type, urls)
+            # Only workers take from the queue, so this can't block
+            for url in urls:
+                self.tasks.put_nowait((session_id, url))
+        return None
+
+    def _work(self):
+        while True:
+            session_id, url = self.tasks.get()
+            started = time.monotonic()
+            self.jobs.url_started(session_id, url)
+            try:
+                result = download_tiktok_video(url, app.config['DOWNLOAD_FOLDER'])
+            except Exception as e:
+                result = {'url': url, 'error': str(e), 'success': False}
+            self.jobs.url_finished(session_id, result)
+            self._seconds_per_url += 0.2 * (time.monotonic() - started - self._seconds_per_url)
+
+
+jobs = JobTable()
+pool = DownloadPool(jobs, DOWNLOAD_WORKERS, MAX_QUEUED_URLS)
+
+
 def download_tiktok_video(url, output_dir):
     filename = f"tiktok_{uuid.uuid4().hex[:8]}.mp4"
     output_path = os.path.join(output_dir, filename)
@@ -51,47 +175,38 @@ def download_tiktok_video(url, output_dir):
         }
 
 
-def process_url_list(urls, session_id):
-    global active_downloads, completed_downloads
-    active_downloads[session_id]['status'] = 'processing'
-    results = []
-
-    for i, url_item in enumerate(urls):
-        active_downloads[session_id]['progress'] = int((i / len(urls)) * 100)
-        active_downloads[session_id]['current_url'] = url_item
+def cleanup_old_downloads():
+    while True:
+        cutoff = datetime.now() - timedelta(minutes=DOWNLOAD_LIFESPAN_MINUTES)
+        for download_info in jobs.expire(cutoff):
+            file_path = os.path.join(app.config['DOWNLOAD_FOLDER'], download_info['filename'])
+            try:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                    print(f"Deleted old file: {download_info['filename']}")
+            except Exception as e:
+                print(f"Error deleting file {download_info['filename']}: {e}")
 
-        result = download_tiktok_video(url_item, app.config['DOWNLOAD_FOLDER'])
-        results.append(result)
+        time.sleep(CLEANUP_INTERVAL_SECONDS)
 
-        if result['success']:
-            completed_downloads.append(result)
 
-    active_downloads[session_id]['status'] = 'completed'
-    active_downloads[session_id]['progress'] = 100
-    active_downloads[session_id]['results'] = results
+def render_index(status=200, headers=None):
+    active_downloads, completed_downloads = jobs.snapshot()
+    return render_template(
+        'index.html', active_downloads=active_downloads,
+        completed_downloads=completed_downloads), status, headers or {}
 
 
-def cleanup_old_downloads():
-    global completed_downloads
-    while True:
-        now = datetime.now()
-        for download_info in list(completed_downloads):
-            if now - download_info['timestamp'] > timedelta(minutes=DOWNLOAD_LIFESPAN_MINUTES):
-                file_path = os.path.join(app.config['DOWNLOAD_FOLDER'], download_info['filename'])
-                try:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                        print(f"Deleted old file: {download_info['filename']}")
-                    completed_downloads.remove(download_info)
-                except Exception as e:
-                    print(f"Error deleting file {download_info['filename']} or removing from list: {e}")
-        
-        time.sleep(CLEANUP_INTERVAL_SECONDS)
+def busy(retry_after):
+    """503 with a retry hint when the download queue is full"""
+    flash(f'The server is busy with {pool.queued()} queued downloads. '
+          f'Please try again in about {retry_after} seconds.', 'error')
+    return render_index(503, {'Retry-After': str(retry_after)})
 
 
 @app.route('/')
 def index():
-    return render_template('index.html', active_downloads=active_downloads, completed_downloads=completed_downloads)
+    return render_index()
 
 
 @app.route('/download', methods=['POST'])
@@ -99,20 +214,9 @@ def download():
     if 'url' in request.form and request.form['url'].strip():
         # Single URL download
         url_input = request.form['url'].strip()
-        session_id = str(uuid.uuid4())
-
-        active_downloads[session_id] = {
-            'type': 'single',
-            'urls': [url_input],
-            'status': 'starting',
-            'progress': 0,
-            'current_url': url_input
-        }
-
-        thread = threading.Thread(
-            target=process_url_list, args=([url_input], session_id))
-        thread.daemon = True
-        thread.start()
+        retry_after = pool.submit(str(uuid.uuid4()), 'single', [url_input])
+        if retry_after is not None:
+            return busy(retry_after)
 
         flash('Download started!', 'success')
 
@@ -125,20 +229,14 @@ def download():
         with open(temp_path, 'r') as f:
             urls_input = [line.strip() for line in f.readlines() if line.strip()]
 
+        if len(urls_input) > MAX_QUEUED_URLS:
+            flash(f'Too many URLs: split the file into lists of at most '
+                  f'{MAX_QUEUED_URLS} URLs.', 'error')
+            return render_index(413)
         if urls_input:
-            session_id = str(uuid.uuid4())
-            active_downloads[session_id] = {
-                'type': 'batch',
-                'urls': urls_input,
-                'status': 'starting',
-                'progress': 0,
-                'current_url': ''
-            }
-
-            thread = threading.Thread(
-                target=process_url_list, args=(urls_input, session_id))
-            thread.daemon = True
-            thread.start()
+            retry_after = pool.submit(str(uuid.uuid4()), 'batch', urls_input)
+            if retry_after is not None:
+                return busy(retry_after)
 
             flash(f'Batch download started with {len(urls_input)} URLs!', 'success')
         else:
@@ -151,8 +249,9 @@ def download():
 
 @app.route('/status/<session_id>')
 def status(session_id):
-    if session_id in active_downloads:
-        return active_downloads[session_id]
+    session = jobs.get(session_id)
+    if session is not None:
+        return session
     return {'error': 'Download session not found'}, 404
 
 
@@ -374,5 +473,6 @@ if __name__ == '__main__':
     cleanup_thread = threading.Thread(target=cleanup_old_downloads, daemon=True)
     cleanup_thread.start()
     print(f"🗑️  Auto-cleanup for files older than {DOWNLOAD_LIFESPAN_MINUTES} minutes started (checks every {CLEANUP_INTERVAL_SECONDS}s).")
+    print(f"⚙️  {DOWNLOAD_WORKERS} download workers, up to {MAX_QUEUED_URLS} queued URLs.")
 
     app.run(debug=True, host='0.0.0.0', port=5000)
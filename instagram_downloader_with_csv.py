@@ -1,10 +1,45 @@
 import os
-import csv
+import sys
 import datetime
 import yt_dlp
 
+# The batch engine lives with the API services
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'api'))
 
-def download_instagram_content(url, output_dir="downloads/instagram", csv_log=True):
+from app.services.batch_engine import DONE, batch_download as run_batch  # noqa: E402
+from app.services.metadata_sink import MetadataSink  # noqa: E402
+
+
+def content_info_from(info, url, carousel_index=None):
+    """The metadata row logged for a post, or for one item of a carousel"""
+    downloads = info.get('requested_downloads') or [{}]
+    filepath = downloads[0].get('filepath')
+    if carousel_index is None:
+        title = info.get('title', 'Instagram Post')
+        default_name = 'instagram_post'
+    else:
+        title = info.get('title', f'Instagram Post {carousel_index}')
+        default_name = f'instagram_post_{carousel_index}'
+    return {
+        'title': title,
+        'uploader': info.get('uploader', 'Unknown'),
+        'description': info.get('description', ''),
+        'upload_date': info.get('upload_date', ''),
+        'duration': info.get('duration', 0),
+        'like_count': info.get('like_count', 0),
+        'comment_count': info.get('comment_count', 0),
+        'view_count': info.get('view_count', 0),
+        'filename': os.path.basename(filepath) if filepath
+        else f"{info.get('title', default_name)}.{info.get('ext', 'mp4')}",
+        'url': url,
+        'type': 'single_post' if carousel_index is None else 'carousel_item',
+        'carousel_index': carousel_index,
+        'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+def download_instagram_content(url, output_dir="downloads/instagram", csv_log=True,
+                               metadata_format="csv"):
     os.makedirs(output_dir, exist_ok=True)
 
     video_info = {}
@@ -32,58 +67,33 @@ def download_instagram_content(url, output_dir="downloads/instagram", csv_log=Tr
                 all_info = []
 
                 for i, entry in enumerate(info['entries'], 1):
-                    entry_info = {
-                        'title': entry.get('title', f'Instagram Post {i}'),
-                        'uploader': entry.get('uploader', 'Unknown'),
-                        'description': entry.get('description', ''),
-                        'upload_date': entry.get('upload_date', ''),
-                        'duration': entry.get('duration', 0),
-                        'like_count': entry.get('like_count', 0),
-                        'comment_count': entry.get('comment_count', 0),
-                        'view_count': entry.get('view_count', 0),
-                        'filename': f"{entry.get('title', f'instagram_post_{i}')}.{entry.get('ext', 'mp4')}",
-                        'url': url,
-                        'type': 'carousel_item',
-                        'carousel_index': i,
-                        'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }
+                    entry_info = content_info_from(entry, url, i)
                     all_info.append(entry_info)
 
                 # Now download all items
                 ydl.download([url])
 
-                # Log each item to CSV
+                # Log each item's metadata
                 if csv_log:
-                    for entry_info in all_info:
-                        log_to_csv(entry_info, csv_file=os.path.join(
-                            output_dir, "instagram_downloads.csv"))
+                    with metadata_sink(output_dir, metadata_format) as sink:
+                        for entry_info in all_info:
+                            sink.write(entry_info)
+                    print(f"📊 Metadata logged to {sink.path}")
 
                 return all_info
 
             else:
                 # For single posts
-                video_info = {
-                    'title': info.get('title', 'Instagram Post'),
-                    'uploader': info.get('uploader', 'Unknown'),
-                    'description': info.get('description', ''),
-                    'upload_date': info.get('upload_date', ''),
-                    'duration': info.get('duration', 0),
-                    'like_count': info.get('like_count', 0),
-                    'comment_count': info.get('comment_count', 0),
-                    'view_count': info.get('view_count', 0),
-                    'filename': f"{info.get('title', 'instagram_post')}.{info.get('ext', 'mp4')}",
-                    'url': url,
-                    'type': 'single_post',
-                    'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
+                video_info = content_info_from(info, url)
 
                 # Download the video
                 ydl.download([url])
 
-                # Log to CSV if enabled
+                # Log metadata if enabled
                 if csv_log:
-                    log_to_csv(video_info, csv_file=os.path.join(
-                        output_dir, "instagram_downloads.csv"))
+                    with metadata_sink(output_dir, metadata_format) as sink:
+                        sink.write(video_info)
+                    print(f"📊 Metadata logged to {sink.path}")
 
                 return video_info
 
@@ -94,23 +104,9 @@ def download_instagram_content(url, output_dir="downloads/instagram", csv_log=Tr
         return None
 
 
-def log_to_csv(content_info, csv_file="downloads/instagram/instagram_downloads.csv"):
-    """Log content metadata to a CSV file"""
-    os.makedirs(os.path.dirname(csv_file), exist_ok=True)
-
-    # Check if file exists to determine if we need to write headers
-    file_exists = os.path.isfile(csv_file)
-
-    with open(csv_file, 'a', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=content_info.keys())
-
-        # Write header only if file is new
-        if not file_exists:
-            writer.writeheader()
-
-        writer.writerow(content_info)
-
-    print(f"📊 Metadata logged to {csv_file}")
+def metadata_sink(output_dir="downloads/instagram", metadata_format="csv"):
+    """Content metadata (csv, jsonl or parquet), partitioned by day under output_dir"""
+    return MetadataSink(os.path.join(output_dir, "instagram_downloads"), format=metadata_format)
 
 
 def read_urls_from_file(file_path):
@@ -122,14 +118,23 @@ def read_urls_from_file(file_path):
         return [line.strip() for line in file.readlines() if line.strip()]
 
 
-def batch_download(file_path="instagram_urls.txt"):
-    urls = read_urls_from_file(file_path)
-    if not urls:
-        print("⚠️ No URLs found.")
-        return
+def batch_download(file_path="instagram_urls.txt", output_dir="downloads/instagram",
+                   workers=8, csv_log=True, metadata_format="csv"):
+    """Download every URL in the file concurrently, logging each post"""
+    with metadata_sink(output_dir, metadata_format) as sink:
+        def log_result(result):
+            if not csv_log or result.status != DONE:
+                return
+            entries = result.info.get('entries')
+            if entries:
+                for i, entry in enumerate(entries, 1):
+                    if entry:
+                        sink.write(content_info_from(entry, result.url, i))
+            else:
+                sink.write(content_info_from(result.info, result.url))
 
-    for url in urls:
-        download_instagram_content(url)
+        return run_batch(file_path, "instagram", output_dir=output_dir,
+                         workers=workers, on_result=log_result)
 
 
 if __name__ == "__main__":
@@ -137,15 +142,17 @@ if __name__ == "__main__":
     print("1. Download single post/reel")
     print("2. Batch download from file")
     choice = input("Select an option (1/2): ").strip()
+    metadata_format = input(
+        "Metadata format - csv, jsonl or parquet (default: csv): ").strip() or "csv"
 
     if choice == "1":
         url = input("Paste the Instagram post/reel URL: ").strip()
-        download_instagram_content(url)
+        download_instagram_content(url, metadata_format=metadata_format)
     elif choice == "2":
         file_path = input(
             "Enter path to URL file (default: instagram_urls.txt): ").strip()
         if not file_path:
             file_path = "instagram_urls.txt"
-        batch_download(file_path)
+        batch_download(file_path, metadata_format=metadata_format)
     else:
         print("❌ Invalid choice!")
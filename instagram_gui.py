@@ -1,13 +1,21 @@
 import os
+import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
 import yt_dlp
 import datetime
 import csv
-from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 
+# The batch engine lives with the API services
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'api'))
+
+from app.services.batch_engine import DONE, FAILED, PRESETS, BatchDownloader  # noqa: E402
+from app.services.ui_queue import UIQueue  # noqa: E402
+
+BATCH_WORKERS = 4
+
 
 class InstagramDownloaderGUI:
     def __init__(self, root):
@@ -37,10 +45,20 @@ class InstagramDownloaderGUI:
         # Active download flag
         self.download_in_progress = False
 
+        # Download threads never touch widgets: they queue updates, and the
+        # Tk main loop applies the latest of them once per frame
+        self.ui = UIQueue(
+            self.root,
+            {
+                "status": self.status_var.set,
+                "carousel": self.carousel_status_var.set,
+                "progress": self.progress_var.set,
+            },
+            dialogs={"info": messagebox.showinfo, "error": messagebox.showerror}
+        )
+
         self.active_downloads: Dict[str, Dict[str, Any]] = {}
         self.download_folder = "downloads"
-        self.executor = ThreadPoolExecutor(
-            max_workers=5)  # Limit concurrent downloads
         self.file_expiry_seconds = 300  # 5 minutes
         self.cleanup_task = None
         try:
@@ -221,15 +239,16 @@ class InstagramDownloaderGUI:
             return
 
         thread = threading.Thread(
-            target=self._download_single_thread, args=(url,))
+            target=self._download_single_thread,
+            args=(url, self.csv_export_var.get()))
         thread.daemon = True
         thread.start()
 
-    def _download_single_thread(self, url):
+    def _download_single_thread(self, url, csv_export):
         self.download_in_progress = True
-        self.status_var.set(f"Processing: {url}")
-        self.carousel_status_var.set("")
-        self.progress_var.set(0)
+        self.ui.post("status", f"Processing: {url}")
+        self.ui.post("carousel", "")
+        self.ui.post("progress", 0)
 
         try:
             ydl_opts = {
@@ -250,8 +269,8 @@ class InstagramDownloaderGUI:
                 # Check if it's a carousel post
                 if 'entries' in info and info['entries']:
                     carousel_count = len(info['entries'])
-                    self.carousel_status_var.set(
-                        f"📱 Carousel post with {carousel_count} items")
+                    self.ui.post(
+                        "carousel", f"📱 Carousel post with {carousel_count} items")
 
                     # Prepare metadata for each item
                     all_info = []
@@ -270,29 +289,29 @@ class InstagramDownloaderGUI:
                         all_info.append(entry_info)
 
                     # Now download the entire carousel
-                    self.status_var.set(
-                        f"Downloading carousel: {info.get('title', 'Unknown')}")
+                    self.ui.post(
+                        "status", f"Downloading carousel: {info.get('title', 'Unknown')}")
                     ydl.download([url])
 
                     # Log each item to CSV if enabled
-                    if self.csv_export_var.get():
+                    if csv_export:
                         for entry_info in all_info:
                             self._log_to_csv(entry_info)
 
-                    self.status_var.set(
-                        f"Completed: {carousel_count} items from carousel")
+                    self.ui.post(
+                        "status", f"Completed: {carousel_count} items from carousel")
 
                 else:
                     # Single post
                     filename = ydl.prepare_filename(info)
-                    self.status_var.set(
-                        f"Downloading: {info.get('title', 'Unknown')}")
+                    self.ui.post(
+                        "status", f"Downloading: {info.get('title', 'Unknown')}")
 
                     # Download the content
                     ydl.download([url])
 
                     # Log to CSV if enabled
-                    if self.csv_export_var.get():
+                    if csv_export:
                         video_info = {
                             'title': info.get('title', 'Instagram Post'),
                             'uploader': info.get('uploader', 'Unknown'),
@@ -305,16 +324,16 @@ class InstagramDownloaderGUI:
                         }
                         self._log_to_csv(video_info)
 
-                    self.status_var.set(
-                        f"Download completed: {os.path.basename(filename)}")
+                    self.ui.post(
+                        "status", f"Download completed: {os.path.basename(filename)}")
 
-            self.progress_var.set(100)
-            messagebox.showinfo("Success", "Content downloaded successfully!")
+            self.ui.post("progress", 100)
+            self.ui.post("info", "Success", "Content downloaded successfully!")
 
         except Exception as e:
-            self.status_var.set(f"Error: {str(e)[:50]}...")
-            self.carousel_status_var.set("")
-            messagebox.showerror("Download Error", str(e))
+            self.ui.post("status", f"Error: {str(e)[:50]}...")
+            self.ui.post("carousel", "")
+            self.ui.post("error", "Download Error", str(e))
 
         finally:
             self.download_in_progress = False
@@ -340,107 +359,97 @@ class InstagramDownloaderGUI:
                 return
 
             thread = threading.Thread(
-                target=self._download_batch_thread, args=(urls,))
+                target=self._download_batch_thread,
+                args=(urls, self.csv_export_var.get()))
             thread.daemon = True
             thread.start()
 
         except Exception as e:
             messagebox.showerror("Error", f"Could not read the file: {str(e)}")
 
-    def _download_batch_thread(self, urls):
+    def _download_batch_thread(self, urls, csv_export):
         self.download_in_progress = True
-        total_urls = len(urls)
-        successful_downloads = 0
-
-        for i, url in enumerate(urls, 1):
-            try:
-                progress_percent = (i - 1) / total_urls * 100
-                self.progress_var.set(progress_percent)
-                self.status_var.set(f"Downloading {i}/{total_urls}: {url}")
-                self.carousel_status_var.set("")
-
-                ydl_opts = {
-                    'outtmpl': os.path.join(self.download_dir, '%(title)s.%(ext)s'),
-                    'format': 'best',
-                    'quiet': False,
-                    'noplaylist': False,
-                    'cookiefile': 'instagram_cookies.txt' if os.path.exists('instagram_cookies.txt') else None,
-                    'extract_flat': False,
-                    'ignoreerrors': True
-                }
-
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    # Check if it's a carousel post
-                    info = ydl.extract_info(url, download=False)
-
-                    if 'entries' in info and info['entries']:
-                        carousel_count = len(info['entries'])
-                        self.carousel_status_var.set(
-                            f"📱 Carousel post with {carousel_count} items")
-
-                        # Process carousel metadata
-                        all_info = []
-                        for j, entry in enumerate(info['entries'], 1):
-                            entry_info = {
-                                'title': entry.get('title', f'Instagram Post {j}'),
-                                'uploader': entry.get('uploader', 'Unknown'),
-                                'description': entry.get('description', ''),
-                                'upload_date': entry.get('upload_date', ''),
-                                'url': url,
-                                'type': 'carousel_item',
-                                'carousel_index': j,
-                                'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            }
-                            all_info.append(entry_info)
-
-                    # Download content
-                    ydl.download([url])
-                    successful_downloads += 1
+        self.ui.post("carousel", "")
+        engine = BatchDownloader(
+            {
+                **PRESETS['instagram'],
+                # Only when present: yt-dlp writes the cookie file back on close
+                'cookiefile': 'instagram_cookies.txt' if os.path.exists('instagram_cookies.txt') else None,
+            },
+            output_dir=self.download_dir,
+            workers=BATCH_WORKERS,
+            archive=os.path.join(self.download_dir, 'archive.txt'),
+            on_result=lambda result: self._batch_result(result, csv_export)
+        )
+        self.ui.engine = engine
+        try:
+            progress = engine.run(urls)
+        finally:
+            self.ui.engine = None
+            self.download_in_progress = False
 
-                    # Log to CSV if enabled
-                    if self.csv_export_var.get():
-                        if 'entries' in info and info['entries']:
-                            for entry_info in all_info:
-                                self._log_to_csv(entry_info)
-                        else:
-                            video_info = {
-                                'title': info.get('title', 'Instagram Post'),
-                                'uploader': info.get('uploader', 'Unknown'),
-                                'description': info.get('description', ''),
-                                'upload_date': info.get('upload_date', ''),
-                                'url': url,
-                                'type': 'single_post',
-                                'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            }
-                            self._log_to_csv(video_info)
-
-            except Exception as e:
-                print(f"Error downloading {url}: {str(e)}")
-
-        self.progress_var.set(100)
-        self.status_var.set(
-            f"Batch download completed: {successful_downloads}/{total_urls} items")
-        self.carousel_status_var.set("")
-        messagebox.showinfo(
-            "Success", f"Downloaded {successful_downloads} out of {total_urls} items.")
-        self.download_in_progress = False
+        self.ui.post("progress", 100)
+        self.ui.post(
+            "status", f"Batch download completed: {progress.done}/{progress.total} items")
+        self.ui.post("carousel", "")
+        self.ui.post(
+            "info", "Success",
+            f"Downloaded {progress.done} out of {progress.total} items "
+            f"({progress.skipped} already downloaded).")
+
+    def _batch_result(self, result, csv_export):
+        """Called by the engine for each URL, one at a time"""
+        if result.status == FAILED:
+            print(f"Error downloading {result.url}: {result.error}")
+        if result.status != DONE:
+            return
+
+        info = result.info
+        entries = [entry for entry in info.get('entries') or [] if entry]
+        if entries:
+            self.ui.post("carousel", f"📱 Carousel post with {len(entries)} items")
+        if not csv_export:
+            return
+
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if entries:
+            for j, entry in enumerate(entries, 1):
+                self._log_to_csv({
+                    'title': entry.get('title', f'Instagram Post {j}'),
+                    'uploader': entry.get('uploader', 'Unknown'),
+                    'description': entry.get('description', ''),
+                    'upload_date': entry.get('upload_date', ''),
+                    'url': result.url,
+                    'type': 'carousel_item',
+                    'carousel_index': j,
+                    'timestamp': timestamp
+                })
+        else:
+            self._log_to_csv({
+                'title': info.get('title', 'Instagram Post'),
+                'uploader': info.get('uploader', 'Unknown'),
+                'description': info.get('description', ''),
+                'upload_date': info.get('upload_date', ''),
+                'url': result.url,
+                'type': 'single_post',
+                'timestamp': timestamp
+            })
 
     def _progress_hook(self, d):
         if d['status'] == 'downloading':
             # Extract download percentage if available
             if 'total_bytes' in d and d['total_bytes'] > 0:
                 percent = d['downloaded_bytes'] / d['total_bytes'] * 100
-                self.progress_var.set(percent)
+                self.ui.post("progress", percent)
             elif 'downloaded_bytes' in d:
                 # If we don't have total_bytes, just show activity
-                current_val = self.progress_var.get()
-                self.progress_var.set((current_val + 1) % 100)
+                self.ui.post("progress", d['downloaded_bytes'] / 2 ** 20 % 100)
 
-            self.status_var.set(f"Downloading: {d.get('filename', 'Unknown')}")
+            self.ui.post("status", f"Downloading: {d.get('filename', 'Unknown')}")
 
         elif d['status'] == 'finished':
-            self.status_var.set(
-                f"Finished file: {os.path.basename(d.get('filename', 'Unknown'))}")
+            self.ui.post(
+                "status", f"Finished file: {os.path.basename(d.get('filename', 'Unknown'))}")
 
     def _log_to_csv(self, content_info, csv_file=None):
         """Log content metadata to a CSV file"""
@@ -1,10 +1,35 @@
 import os
-import csv
+import sys
 import datetime
 import yt_dlp
 
+# The batch engine lives with the API services
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'api'))
+
+from app.services.batch_engine import DONE, batch_download as run_batch  # noqa: E402
+from app.services.metadata_sink import MetadataSink  # noqa: E402
+
+METADATA_PATH = os.path.join("downloads", "tiktok_downloads")
+
+
+def video_info_from(info, url):
+    """The metadata row logged for a video"""
+    downloads = info.get('requested_downloads') or [{}]
+    filepath = downloads[0].get('filepath')
+    return {
+        'title': info.get('title', 'Unknown'),
+        'uploader': info.get('uploader', 'Unknown'),
+        'duration': info.get('duration', 0),
+        'view_count': info.get('view_count', 0),
+        'like_count': info.get('like_count', 0),
+        'filename': os.path.basename(filepath) if filepath
+        else f"{info.get('title', 'video')}.{info.get('ext', 'mp4')}",
+        'url': url,
+        'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
 
-def download_tiktok_video(url, output_dir="downloads", csv_log=True):
+def download_tiktok_video(url, output_dir="downloads", csv_log=True, metadata_format="csv"):
     os.makedirs(output_dir, exist_ok=True)
 
     video_info = {}
@@ -20,25 +45,18 @@ def download_tiktok_video(url, output_dir="downloads", csv_log=True):
         print(f"🔍 Downloading TikTok video from: {url}")
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=False)
-            video_info = {
-                'title': info.get('title', 'Unknown'),
-                'uploader': info.get('uploader', 'Unknown'),
-                'duration': info.get('duration', 0),
-                'view_count': info.get('view_count', 0),
-                'like_count': info.get('like_count', 0),
-                'filename': f"{info.get('title', 'video')}.{info.get('ext', 'mp4')}",
-                'url': url,
-                'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            video_info = video_info_from(info, url)
 
             # Now download the video
             ydl.download([url])
 
         print("✅ Download completed!")
 
-        # Log to CSV if enabled
+        # Log metadata if enabled
         if csv_log:
-            log_to_csv(video_info)
+            with metadata_sink(metadata_format) as sink:
+                sink.write(video_info)
+            print(f"📊 Metadata logged to {METADATA_PATH}")
 
         return video_info
 
@@ -47,23 +65,9 @@ def download_tiktok_video(url, output_dir="downloads", csv_log=True):
         return None
 
 
-def log_to_csv(video_info, csv_file="downloads/tiktok_downloads.csv"):
-    """Log video metadata to a CSV file"""
-    os.makedirs(os.path.dirname(csv_file), exist_ok=True)
-
-    # Check if file exists to determine if we need to write headers
-    file_exists = os.path.isfile(csv_file)
-
-    with open(csv_file, 'a', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=video_info.keys())
-
-        # Write header only if file is new
-        if not file_exists:
-            writer.writeheader()
-
-        writer.writerow(video_info)
-
-    print(f"📊 Metadata logged to {csv_file}")
+def metadata_sink(metadata_format="csv"):
+    """Video metadata (csv, jsonl or parquet), partitioned by day under METADATA_PATH"""
+    return MetadataSink(METADATA_PATH, format=metadata_format)
 
 
 def read_urls_from_file(file_path):
@@ -75,14 +79,14 @@ def read_urls_from_file(file_path):
         return [line.strip() for line in file.readlines() if line.strip()]
 
 
-def batch_download(file_path="tiktok_urls.txt"):
-    urls = read_urls_from_file(file_path)
-    if not urls:
-        print("⚠️ No URLs found.")
-        return
+def batch_download(file_path="tiktok_urls.txt", workers=8, csv_log=True, metadata_format="csv"):
+    """Download every URL in the file concurrently, logging each video"""
+    with metadata_sink(metadata_format) as sink:
+        def log_result(result):
+            if csv_log and result.status == DONE:
+                sink.write(video_info_from(result.info, result.url))
 
-    for url in urls:
-        download_tiktok_video(url)
+        return run_batch(file_path, "tiktok", workers=workers, on_result=log_result)
 
 
 if __name__ == "__main__":
@@ -90,15 +94,17 @@ if __name__ == "__main__":
     print("1. Download single video")
     print("2. Batch download from file")
     choice = input("Select an option (1/2): ").strip()
+    metadata_format = input(
+        "Metadata format - csv, jsonl or parquet (default: csv): ").strip() or "csv"
 
     if choice == "1":
         url = input("Paste the TikTok video URL: ").strip()
-        download_tiktok_video(url)
+        download_tiktok_video(url, metadata_format=metadata_format)
     elif choice == "2":
         file_path = input(
             "Enter path to URL file (default: tiktok_urls.txt): ").strip()
         if not file_path:
             file_path = "tiktok_urls.txt"
-        batch_download(file_path)
+        batch_download(file_path, metadata_format=metadata_format)
     else:
         print("❌ Invalid choice!")
@@ -1,9 +1,18 @@
 import os
+import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
 import yt_dlp
 
+# The batch engine lives with the API services
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'api'))
+
+from app.services.batch_engine import FAILED, PRESETS, BatchDownloader  # noqa: E402
+from app.services.ui_queue import UIQueue  # noqa: E402
+
+BATCH_WORKERS = 4
+
 
 class TikTokDownloaderGUI:
     def __init__(self, root):
@@ -31,6 +40,17 @@ class TikTokDownloaderGUI:
         # Active download flag
         self.download_in_progress = False
 
+        # Download threads never touch widgets: they queue updates, and the
+        # Tk main loop applies the latest of them once per frame
+        self.ui = UIQueue(
+            self.root,
+            {
+                "status": self.status_var.set,
+                "progress": self.progress_var.set,
+            },
+            dialogs={"info": messagebox.showinfo, "error": messagebox.showerror}
+        )
+
     def create_widgets(self):
         # Main frame
         main_frame = ttk.Frame(self.root, padding="10")
@@ -171,8 +191,8 @@ class TikTokDownloaderGUI:
 
     def _download_single_thread(self, url):
         self.download_in_progress = True
-        self.status_var.set(f"Downloading: {url}")
-        self.progress_var.set(0)
+        self.ui.post("status", f"Downloading: {url}")
+        self.ui.post("progress", 0)
 
         try:
             ydl_opts = {
@@ -186,20 +206,20 @@ class TikTokDownloaderGUI:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 info = ydl.extract_info(url, download=False)
                 filename = ydl.prepare_filename(info)
-                self.status_var.set(
-                    f"Downloading: {info.get('title', 'Unknown')}")
+                self.ui.post(
+                    "status", f"Downloading: {info.get('title', 'Unknown')}")
 
                 # Perform the download
                 ydl.download([url])
 
-            self.status_var.set(
-                f"Download completed: {os.path.basename(filename)}")
-            self.progress_var.set(100)
-            messagebox.showinfo("Success", "Video downloaded successfully!")
+            self.ui.post(
+                "status", f"Download completed: {os.path.basename(filename)}")
+            self.ui.post("progress", 100)
+            self.ui.post("info", "Success", "Video downloaded successfully!")
 
         except Exception as e:
-            self.status_var.set(f"Error: {str(e)[:50]}...")
-            messagebox.showerror("Download Error", str(e))
+            self.ui.post("status", f"Error: {str(e)[:50]}...")
+            self.ui.post("error", "Download Error", str(e))
 
         finally:
             self.download_in_progress = False
@@ -234,45 +254,44 @@ class TikTokDownloaderGUI:
 
     def _download_batch_thread(self, urls):
         self.download_in_progress = True
-        total_urls = len(urls)
-
-        for i, url in enumerate(urls, 1):
-            try:
-                progress_percent = (i - 1) / total_urls * 100
-                self.progress_var.set(progress_percent)
-                self.status_var.set(f"Downloading {i}/{total_urls}: {url}")
-
-                ydl_opts = {
-                    'outtmpl': os.path.join(self.download_dir, '%(title)s.%(ext)s'),
-                    'format': 'mp4',
-                    'quiet': False,
-                    'noplaylist': True
-                }
-
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([url])
-
-            except Exception as e:
-                print(f"Error downloading {url}: {str(e)}")
-
-        self.progress_var.set(100)
-        self.status_var.set(f"Batch download completed: {total_urls} videos")
-        messagebox.showinfo("Success", f"Downloaded {total_urls} videos.")
-        self.download_in_progress = False
+        engine = BatchDownloader(
+            PRESETS['tiktok'],
+            output_dir=self.download_dir,
+            workers=BATCH_WORKERS,
+            archive=os.path.join(self.download_dir, 'archive.txt'),
+            on_result=self._batch_result
+        )
+        self.ui.engine = engine
+        try:
+            progress = engine.run(urls)
+        finally:
+            self.ui.engine = None
+            self.download_in_progress = False
+
+        self.ui.post("progress", 100)
+        self.ui.post("status", f"Batch download completed: {progress.total} videos")
+        self.ui.post(
+            "info", "Success",
+            f"Downloaded {progress.done} videos, {progress.skipped} already downloaded, "
+            f"{progress.failed} failed.")
+
+    def _batch_result(self, result):
+        if result.status == FAILED:
+            print(f"Error downloading {result.url}: {result.error}")
 
     def _progress_hook(self, d):
         if d['status'] == 'downloading':
             # Extract download percentage
             if 'total_bytes' in d and d['total_bytes'] > 0:
                 percent = d['downloaded_bytes'] / d['total_bytes'] * 100
-                self.progress_var.set(percent)
+                self.ui.post("progress", percent)
 
-            self.status_var.set(f"Downloading: {d.get('filename', 'Unknown')}")
+            self.ui.post("status", f"Downloading: {d.get('filename', 'Unknown')}")
 
         elif d['status'] == 'finished':
-            self.status_var.set(
-                f"Download finished: {d.get('filename', 'Unknown')}")
-            self.progress_var.set(100)
+            self.ui.post(
+                "status", f"Download finished: {d.get('filename', 'Unknown')}")
+            self.ui.post("progress", 100)
 
 
 if __name__ == "__main__":